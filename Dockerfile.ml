@@ -12,9 +12,8 @@ RUN apt-get update && apt-get install -y \
 COPY requirements.txt .
 RUN pip install --no-cache-dir -r requirements.txt
 
-# Copy ML model files
-COPY ml_model.py .
-COPY ml_api.py .
+# Copy ML model and service modules
+COPY ml_*.py ./
 COPY final_synthetic_dropout_data_rajasthan.csv .
 
 # Train model if not exists
@@ -1,11 +1,14 @@
 import { NextRequest, NextResponse } from "next/server"
 import { dbService } from "../../../lib/database-service"
+import crypto from "crypto"
 
 // ML Risk Assessment and Prediction API
 export async function POST(request: NextRequest) {
   try {
     const body = await request.json()
     const { studentId, action } = body
+    // Correlates this request with the Python service's spans and trace log
+    const requestId = request.headers.get('x-request-id') || crypto.randomUUID()
 
     if (!studentId && action !== 'batch-assess') {
       return NextResponse.json(
@@ -30,8 +33,10 @@ export async function POST(request: NextRequest) {
       case 'assess-risk':
         // Try to use Python ML service first, fallback to JavaScript algorithm
         try {
-          const pythonResult = await callPythonMLService(student)
+          const pythonResult = await callPythonMLService(student, requestId)
           if (pythonResult.success) {
+            const dbStart = performance.now()
+
             // Update student record with Python ML results
             await dbService.updateStudentRisk(
               studentId, 
@@ -50,6 +55,8 @@ export async function POST(request: NextRequest) {
               pythonResult.data.feature_importance
             )
 
+            logRiskAssessmentTiming(requestId, pythonResult.timing, performance.now() - dbStart)
+
             return NextResponse.json({
               success: true,
               data: {
@@ -62,7 +69,7 @@ export async function POST(request: NextRequest) {
                 modelVersion: pythonResult.data.model_version,
                 source: 'python_ml_service'
               }
-            })
+            }, { headers: { 'X-Request-ID': requestId } })
           }
         } catch (error) {
           console.log("Python ML service unavailable, using JavaScript fallback")
@@ -149,12 +156,14 @@ export async function POST(request: NextRequest) {
 }
 
 // Call Python ML service
-async function callPythonMLService(student: any) {
+async function callPythonMLService(student: any, requestId: string) {
   try {
+    const started = performance.now()
     const response = await fetch('http://localhost:8001/predict', {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
+        'X-Request-ID': requestId,
       },
       body: JSON.stringify({
         student_data: {
@@ -190,13 +199,47 @@ async function callPythonMLService(student: any) {
     }
 
     const data = await response.json()
-    return { success: true, data }
+    const stages = parseServerTiming(response.headers.get('server-timing'))
+    const roundTripMs = performance.now() - started
+    const serviceMs = stages.total ?? 0
+    return {
+      success: true,
+      data,
+      timing: { roundTripMs, serviceMs, networkMs: Math.max(roundTripMs - serviceMs, 0), stages }
+    }
   } catch (error: any) {
-    console.error('Python ML service call failed:', error)
+    console.error(`[${requestId}] Python ML service call failed:`, error)
     return { success: false, error: error.message }
   }
 }
 
+// Stage durations (ms) from a Server-Timing header, e.g. "preprocess;dur=10.4, total;dur=26.2"
+function parseServerTiming(header: string | null): Record<string, number> {
+  const stages: Record<string, number> = {}
+  if (!header) return stages
+
+  for (const metric of header.split(',')) {
+    const [name, ...params] = metric.trim().split(';')
+    const duration = params.find((param) => param.trim().startsWith('dur='))
+    if (name && duration) {
+      stages[name] = Number(duration.trim().slice(4))
+    }
+  }
+  return stages
+}
+
+// Split a slow assessment into network, Python service and DB update time
+function logRiskAssessmentTiming(requestId: string, timing: any, dbMs: number) {
+  const stages = Object.entries(timing.stages)
+    .filter(([name]) => name !== 'total')
+    .map(([name, ms]) => `${name}=${(ms as number).toFixed(1)}ms`)
+    .join(' ')
+  console.log(
+    `[${requestId}] ML assessment: network=${timing.networkMs.toFixed(1)}ms ` +
+    `service=${timing.serviceMs.toFixed(1)}ms (${stages}) db=${dbMs.toFixed(1)}ms`
+  )
+}
+
 // Get top risk factors from feature importance
 function getTopRiskFactors(featureImportance: any): string[] {
   if (!featureImportance) return []
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Admission control for the EduAnalytics ML services
+Bounded per-priority queues in front of the scoring endpoints: interactive
+requests (single-student predictions) always go ahead of bulk work, bulk work
+is capped below the total concurrency, and requests that cannot be queued or
+wait too long are shed immediately with 503 + Retry-After.
+Standard library only, so ml_service_simple.py can use it too.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITIES = (INTERACTIVE, BULK)
+
+# Requests running at once, and how many of those may be bulk
+MAX_CONCURRENT = int(os.environ.get("ML_MAX_CONCURRENT", "4"))
+BULK_MAX_CONCURRENT = int(os.environ.get("ML_BULK_MAX_CONCURRENT", "1"))
+# Requests allowed to wait per priority before new ones are rejected
+QUEUE_LIMITS = {
+    INTERACTIVE: int(os.environ.get("ML_INTERACTIVE_QUEUE", "64")),
+    BULK: int(os.environ.get("ML_BULK_QUEUE", "4"))
+}
+# Seconds a queued request may wait for a slot
+QUEUE_TIMEOUTS = {
+    INTERACTIVE: float(os.environ.get("ML_INTERACTIVE_QUEUE_TIMEOUT", "2")),
+    BULK: float(os.environ.get("ML_BULK_QUEUE_TIMEOUT", "30"))
+}
+# Retry-After hint sent with 503s
+RETRY_AFTER_SECONDS = {INTERACTIVE: 1, BULK: 10}
+
+
+class Overloaded(Exception):
+    """A request was shed instead of queued"""
+
+    def __init__(self, priority: str, reason: str):
+        super().__init__(f"{priority} capacity exhausted ({reason})")
+        self.priority = priority
+        self.reason = reason
+        self.retry_after = RETRY_AFTER_SECONDS[priority]
+
+
+class _AdmissionState:
+    """Counters and the admission rule shared by the thread and asyncio controllers"""
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT,
+                 bulk_max_concurrent: int = BULK_MAX_CONCURRENT,
+                 queue_limits: Dict[str, int] = None, queue_timeouts: Dict[str, float] = None):
+        self.max_concurrent = max_concurrent
+        self.bulk_max_concurrent = min(bulk_max_concurrent, max_concurrent)
+        self.queue_limits = dict(queue_limits or QUEUE_LIMITS)
+        self.queue_timeouts = dict(queue_timeouts or QUEUE_TIMEOUTS)
+        self.in_flight = {p: 0 for p in PRIORITIES}
+        self.queued = {p: 0 for p in PRIORITIES}
+        self.admitted = {p: 0 for p in PRIORITIES}
+        self.rejected = {p: 0 for p in PRIORITIES}
+
+    def _can_run(self, priority: str) -> bool:
+        if sum(self.in_flight.values()) >= self.max_concurrent:
+            return False
+        if priority == BULK:
+            # Bulk never takes the last slots and never jumps waiting interactive requests
+            return self.in_flight[BULK] < self.bulk_max_concurrent and not self.queued[INTERACTIVE]
+        return True
+
+    def _admit(self, priority: str):
+        self.in_flight[priority] += 1
+        self.admitted[priority] += 1
+
+    def _reject(self, priority: str, reason: str):
+        self.rejected[priority] += 1
+        raise Overloaded(priority, reason)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "bulk_max_concurrent": self.bulk_max_concurrent,
+            "in_flight": dict(self.in_flight),
+            "queue_depth": dict(self.queued),
+            "queue_limits": dict(self.queue_limits),
+            "admitted": dict(self.admitted),
+            "rejected": dict(self.rejected)
+        }
+
+
+class AdmissionController(_AdmissionState):
+    """Admission for thread-per-request servers (ThreadingHTTPServer)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cond = threading.Condition()
+
+    def acquire(self, priority: str):
+        """Block until a slot is free; raises Overloaded when shed"""
+        with self._cond:
+            if not self._can_run(priority):
+                if self.queued[priority] >= self.queue_limits[priority]:
+                    self._reject(priority, "queue full")
+                self.queued[priority] += 1
+                deadline = time.monotonic() + self.queue_timeouts[priority]
+                try:
+                    while not self._can_run(priority):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._reject(priority, "queue timeout")
+                        self._cond.wait(remaining)
+                finally:
+                    self.queued[priority] -= 1
+                    # A departing interactive waiter may unblock bulk waiters
+                    self._cond.notify_all()
+            self._admit(priority)
+
+    def release(self, priority: str):
+        with self._cond:
+            self.in_flight[priority] -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def admit(self, priority: str):
+        self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+
+class AsyncAdmissionController(_AdmissionState):
+    """Admission for asyncio servers (FastAPI / uvicorn); use from the event loop only"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Created on first use so it binds to the server's running loop
+        self._cond = None
+
+    async def acquire(self, priority: str):
+        """Wait until a slot is free; raises Overloaded when shed"""
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        async with self._cond:
+            if not self._can_run(priority):
+                if self.queued[priority] >= self.queue_limits[priority]:
+                    self._reject(priority, "queue full")
+                self.queued[priority] += 1
+                deadline = time.monotonic() + self.queue_timeouts[priority]
+                try:
+                    while not self._can_run(priority):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._reject(priority, "queue timeout")
+                        try:
+                            await asyncio.wait_for(self._cond.wait(), remaining)
+                        except asyncio.TimeoutError:
+                            pass
+                finally:
+                    self.queued[priority] -= 1
+                    self._cond.notify_all()
+            self._admit(priority)
+
+    async def release(self, priority: str):
+        async with self._cond:
+            self.in_flight[priority] -= 1
+            self._cond.notify_all()
@@ -4,50 +4,115 @@ EduAnalytics ML API Service
 FastAPI service to integrate ML model with Next.js application
 """
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
 from typing import List, Dict, Any, Optional
 import pandas as pd
+import csv
+import io
 import json
+import os
 import uvicorn
 from ml_model import EduAnalyticsMLModel
+from ml_feature_store import FeatureStore, DEFAULT_STORE_PATH
+from ml_jobs import (
+    COMPLETED, JobManager, count_csv_rows, iter_csv_chunks, iter_frame_chunks, iter_id_chunks
+)
+from ml_forest_arrays import FlatForest, process_memory_usage
+from ml_risk_index import FILTER_COLUMNS, RiskIndex, segments_from_frame
+from ml_feature_pipeline import FeaturePipeline, read_events
+from ml_drift_monitor import drift_baseline_path_for, load_drift_baseline, load_drift_monitor
+from ml_admission import BULK, INTERACTIVE, AsyncAdmissionController, Overloaded
+from ml_batch_validation import StudentData, validate_students_json
+from ml_tracing import end_trace, request_id_from_headers, span, start_trace, trace_headers
+from ml_wire_formats import (
+    JSON_MEDIA_TYPE, NDJSON_MEDIA_TYPE, UnsupportedMediaType, available_media_types,
+    decode_students_frame, encode_prediction_columns, iter_ndjson_predictions,
+    negotiate_response_format, normalize_media_type
+)
+from ml_compression import (
+    IDENTITY, available_encodings, compress_body, compress_stream,
+    negotiate_encoding, should_compress
+)
 
 app = FastAPI(title="EduAnalytics ML API", version="1.0.0")
 
-# Initialize ML model
-ml_model = EduAnalyticsMLModel()
-
-class StudentData(BaseModel):
-    StudentID: str
-    Gender: str
-    AccommodationType: str
-    IsRural: str
-    CommuteTimeMinutes: float
-    AdmissionQuota: str
-    FamilyAnnualIncome: float
-    NumberOfSiblings: int
-    FatherEducation: str
-    IsFatherLiterate: str
-    MotherEducation: str
-    IsMotherLiterate: str
-    IsFirstGenerationLearner: str
-    AvgPastPerformance: float
-    MediumChanged: str
-    AvgMarks_LatestTerm: float
-    MarksTrend: float
-    FailureRate_LatestTerm: float
-    AvgAttendance_LatestTerm: float
-    WorksPartTime: str
-    IsPreparingCompetitiveExam: str
-    HasOwnLaptop: str
-    HasReliableInternet: str
+MODEL_PATH = os.environ.get("ML_MODEL_PATH", "eduanalytics_model.pkl")
+
+# Initialize ML model (loads the saved model when present; ML_MODEL_MMAP=r shares it across workers)
+ml_model = EduAnalyticsMLModel(MODEL_PATH)
+
+# Encoded feature vectors by StudentID (ML_FEATURE_STORE selects the SQLite file)
+feature_store = FeatureStore(ml_model, DEFAULT_STORE_PATH)
+
+# Term aggregates from raw attendance/marks events, written into the feature store
+feature_pipeline = FeaturePipeline(feature_store)
+
+# Background bulk-scoring jobs; csv_path inputs must live under ML_JOBS_INPUT_DIR
+job_manager = JobManager()
+JOBS_INPUT_DIR = os.path.realpath(os.environ.get("ML_JOBS_INPUT_DIR", os.getcwd()))
+
+# Latest score per StudentID in ranked order, fed by every scoring path below
+risk_index = RiskIndex()
+
+# Bounded-memory comparison of incoming raw records with the training distribution
+drift_monitor = load_drift_monitor(MODEL_PATH, ml_model.feature_columns)
+
+# Bounded priority queues in front of the scoring endpoints (see ml_admission.py)
+admission = AsyncAdmissionController()
+ADMISSION_CLASSES = {
+    "/predict": INTERACTIVE,
+    "/predict/batch": BULK,
+    "/predict/by-id": BULK,
+    "/features/upsert": BULK,
+    "/features/events": BULK
+}
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    """Queue scoring requests by priority and shed them with 503 when saturated"""
+    priority = ADMISSION_CLASSES.get(request.url.path) if request.method == "POST" else None
+    if priority is None:
+        return await call_next(request)
+    
+    try:
+        with span("admission"):
+            await admission.acquire(priority)
+    except Overloaded as e:
+        # Drain the upload so the client reads the 503 instead of a reset connection
+        await request.body()
+        return JSONResponse(
+            status_code=503,
+            content={"detail": str(e)},
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    try:
+        return await call_next(request)
+    finally:
+        await admission.release(priority)
+
+@app.middleware("http")
+async def request_tracing(request: Request, call_next):
+    """
+    Trace each request under the caller's X-Request-ID (registered last, so it
+    also times admission); stage timings go back in Server-Timing and to
+    ML_TRACE_FILE when set
+    """
+    trace = start_trace(request_id_from_headers(request.headers), request.url.path)
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        response.headers.update(trace_headers(trace))
+        return response
+    finally:
+        end_trace(trace, status_code)
 
 class PredictionRequest(BaseModel):
     student_data: StudentData
 
-class BatchPredictionRequest(BaseModel):
-    students_data: List[StudentData]
-
 class PredictionResponse(BaseModel):
     student_id: str
     dropout_probability: float
@@ -57,10 +122,216 @@ class PredictionResponse(BaseModel):
     feature_importance: Dict[str, float]
     model_version: str
 
+class RowError(BaseModel):
+    field: str
+    message: str
+
+class RejectedRow(BaseModel):
+    row: int
+    student_id: Optional[str] = None
+    errors: List[RowError]
+
 class BatchPredictionResponse(BaseModel):
     predictions: List[PredictionResponse]
     total_students: int
     model_version: str
+    # students_data entries that failed validation, by position; the rest are still scored
+    rejected_rows: List[RejectedRow] = []
+
+class StudentIDPredictionRequest(BaseModel):
+    student_ids: List[str]
+
+class StudentIDPredictionResponse(BatchPredictionResponse):
+    missing_student_ids: List[str]
+
+class ScoringJobRequest(BaseModel):
+    csv_path: Optional[str] = None
+    student_ids: Optional[List[str]] = None
+
+class ModelUpdateRequest(BaseModel):
+    csv_path: str
+    mode: str = "add"
+    n_trees: int = 20
+    holdout_path: Optional[str] = None
+
+EMPTY_PREDICTION_COLUMNS = {
+    "student_id": [], "dropout_probability": [], "dropout_prediction": [],
+    "risk_level": [], "risk_score": [], "feature_importance": {},
+    "model_version": "v1.0"
+}
+
+def negotiated_response(request: Request, body: bytes, media_type: str) -> Response:
+    """Build a response, compressing the body when the client accepts it and it is large enough"""
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if should_compress(len(body), encoding):
+        body = compress_body(body, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=headers)
+
+def negotiated_stream(request: Request, chunks, media_type: str) -> StreamingResponse:
+    """Build a streaming response, compressing chunk by chunk when the client accepts it"""
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if encoding != IDENTITY:
+        chunks = compress_stream(chunks, encoding)
+        headers["Content-Encoding"] = encoding
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
+
+async def read_students_frame(request: Request):
+    """
+    Decode a students_data body (JSON, MessagePack or Arrow by Content-Type) into a dataframe
+    
+    JSON rows that fail validation are left out and returned as rejected rows;
+    a body that is not a students_data list at all still fails as a whole.
+    Raises HTTP 415/422/400 for unsupported, invalid or incomplete bodies.
+    
+    Returns:
+        Tuple of (dataframe of valid students, rejected rows)
+    """
+    content_type = normalize_media_type(request.headers.get("content-type"))
+    body = await request.body()
+    rejected_rows = []
+    
+    try:
+        if content_type == JSON_MEDIA_TYPE:
+            # One pydantic-core pass over the whole list (see ml_batch_validation.py)
+            students_frame, rejected_rows = await run_in_threadpool(validate_students_json, body)
+        else:
+            students_frame = decode_students_frame(body, content_type)
+    except UnsupportedMediaType as e:
+        raise HTTPException(
+            status_code=415,
+            detail=f"{e}. Supported: {', '.join(available_media_types())}"
+        )
+    except ValidationError as e:
+        # Without the raw input: for a malformed body it is bytes, which the error response cannot encode
+        raise HTTPException(status_code=422, detail=e.errors(include_input=False))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not decode request body: {e}")
+    
+    if len(students_frame):
+        check_student_columns(students_frame.columns)
+    return students_frame, rejected_rows
+
+def check_student_columns(columns):
+    """Reject student records lacking StudentID or a model feature column (HTTP 400)"""
+    missing_columns = [
+        col for col in ["StudentID"] + ml_model.feature_columns if col not in columns
+    ]
+    if missing_columns:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Missing student columns: {', '.join(missing_columns)}"
+        )
+
+def score_student_frame(students_frame: pd.DataFrame) -> Dict[str, Any]:
+    """Score raw student records column-wise (empty frames allowed)"""
+    if len(students_frame) == 0:
+        return dict(EMPTY_PREDICTION_COLUMNS)
+    columns = ml_model.batch_predict_columns(students_frame)
+    drift_monitor.observe_frame(students_frame)
+    risk_index.update_columns(columns, segments_from_frame(students_frame))
+    return columns
+
+def score_stored_students(student_ids: List[str]) -> Dict[str, Any]:
+    """
+    Score students from their stored feature vectors
+    
+    Returns:
+        Result columns plus missing_student_ids for IDs not in the feature store
+    """
+    found_ids, X, missing_ids = feature_store.get_matrix(student_ids)
+    columns = dict(EMPTY_PREDICTION_COLUMNS)
+    if found_ids:
+        columns.update(ml_model.predict_columns(X))
+        columns["student_id"] = found_ids
+        columns["feature_importance"] = dict(zip(
+            ml_model.feature_columns, ml_model.model.feature_importances_
+        ))
+        # Stored vectors are encoded, so students keep the segments they were indexed with
+        risk_index.update_columns(columns)
+    columns["missing_student_ids"] = missing_ids
+    return columns
+
+def risk_index_filters(IsRural: Optional[str], AdmissionQuota: Optional[str],
+                       AccommodationType: Optional[str]) -> Dict[str, str]:
+    return dict(zip(FILTER_COLUMNS, [IsRural, AdmissionQuota, AccommodationType]))
+
+def resolve_input_csv(path: str) -> str:
+    """Resolve a client-supplied CSV path, which must stay inside ML_JOBS_INPUT_DIR"""
+    csv_path = os.path.realpath(os.path.join(JOBS_INPUT_DIR, path))
+    if os.path.commonpath([csv_path, JOBS_INPUT_DIR]) != JOBS_INPUT_DIR:
+        raise HTTPException(status_code=400, detail="csv_path must be inside ML_JOBS_INPUT_DIR")
+    if not os.path.isfile(csv_path):
+        raise HTTPException(status_code=404, detail=f"CSV file not found: {path}")
+    return csv_path
+
+def get_job_or_404(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+def prediction_columns_response(request: Request, columns: Dict[str, Any],
+                                missing_student_ids: Optional[List[str]] = None,
+                                rejected_rows: Optional[List[Dict[str, Any]]] = None) -> Response:
+    """
+    Render batch result columns in the format negotiated from Accept / Accept-Encoding
+    
+    Args:
+        request: Incoming request (for Accept and Accept-Encoding)
+        columns: Result columns as returned by EduAnalyticsMLModel.batch_predict_columns
+        missing_student_ids: Requested IDs that could not be scored (by-ID scoring only)
+        rejected_rows: Request rows that failed validation (listed in JSON responses,
+            counted in X-Rejected-Rows for every format)
+    """
+    response_type = negotiate_response_format(request.headers.get("accept"))
+    
+    if response_type == NDJSON_MEDIA_TYPE:
+        response = negotiated_stream(request, iter_ndjson_predictions(columns), response_type)
+    elif response_type != JSON_MEDIA_TYPE:
+        response = negotiated_response(
+            request, encode_prediction_columns(columns, response_type), response_type
+        )
+    else:
+        # Convert to response format
+        feature_importance = columns["feature_importance"]
+        predictions = []
+        for i in range(len(columns["student_id"])):
+            predictions.append(PredictionResponse(
+                student_id=str(columns["student_id"][i]),
+                dropout_probability=float(columns["dropout_probability"][i]),
+                dropout_prediction=bool(columns["dropout_prediction"][i]),
+                risk_level=str(columns["risk_level"][i]),
+                risk_score=int(columns["risk_score"][i]),
+                feature_importance=feature_importance,
+                model_version=columns["model_version"]
+            ))
+        
+        if missing_student_ids is None:
+            batch_response = BatchPredictionResponse(
+                predictions=predictions,
+                total_students=len(predictions),
+                model_version="v1.0",
+                rejected_rows=rejected_rows or []
+            )
+        else:
+            batch_response = StudentIDPredictionResponse(
+                predictions=predictions,
+                total_students=len(predictions),
+                model_version="v1.0",
+                missing_student_ids=missing_student_ids
+            )
+        response = negotiated_response(
+            request, batch_response.model_dump_json().encode("utf-8"), JSON_MEDIA_TYPE
+        )
+    
+    if missing_student_ids is not None:
+        response.headers["X-Missing-Students"] = str(len(missing_student_ids))
+    if rejected_rows:
+        response.headers["X-Rejected-Rows"] = str(len(rejected_rows))
+    return response
 
 @app.get("/")
 async def root():
@@ -75,7 +346,14 @@ async def health_check():
     return {
         "status": "healthy",
         "model_loaded": ml_model.model is not None,
-        "feature_count": len(ml_model.feature_columns)
+        "feature_count": len(ml_model.feature_columns),
+        "model_memory_mapped": isinstance(ml_model.model, FlatForest),
+        "feature_store_students": feature_store.count(),
+        "risk_index_students": len(risk_index),
+        "feature_pipeline": feature_pipeline.stats(),
+        "drift_status": drift_monitor.report().get("status", "disabled"),
+        "admission": admission.stats(),
+        "memory": process_memory_usage()
     }
 
 @app.post("/predict", response_model=PredictionResponse)
@@ -93,6 +371,12 @@ async def predict_single_student(request: PredictionRequest):
         if "error" in result:
             raise HTTPException(status_code=400, detail=result["error"])
         
+        drift_monitor.observe_record(student_dict)
+        risk_index.update(
+            [student_dict["StudentID"]], [result["dropout_probability"]], [result["risk_level"]],
+            segments_from_frame(pd.DataFrame([student_dict])), result["model_version"]
+        )
+        
         return PredictionResponse(
             student_id=student_dict["StudentID"],
             dropout_probability=result["dropout_probability"],
@@ -107,40 +391,257 @@ async def predict_single_student(request: PredictionRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/predict/batch", response_model=BatchPredictionResponse)
-async def predict_batch_students(request: BatchPredictionRequest):
+async def predict_batch_students(request: Request):
     """
     Predict dropout risk for multiple students
+    
+    Request bodies may be JSON (default), MessagePack or an Arrow IPC stream,
+    selected by Content-Type. The response format is negotiated via Accept;
+    binary responses are encoded column-wise and NDJSON is streamed row by row.
+    Responses are compressed according to Accept-Encoding. JSON students that
+    fail validation are reported in rejected_rows (X-Rejected-Rows) and the
+    rest are still scored.
     """
+    students_frame, rejected_rows = await read_students_frame(request)
+    
     try:
-        # Convert Pydantic models to dicts
-        students_dicts = [student.dict() for student in request.students_data]
-        
-        # Make batch prediction
-        results = ml_model.batch_predict(students_dicts)
+        # Score off the event loop so interactive requests keep being served meanwhile
+        columns = await run_in_threadpool(score_student_frame, students_frame)
+        with span("serialize"):
+            return await run_in_threadpool(
+                prediction_columns_response, request, columns, None, rejected_rows
+            )
         
-        # Convert to response format
-        predictions = []
-        for result in results:
-            if "error" not in result:
-                predictions.append(PredictionResponse(
-                    student_id=result["student_id"],
-                    dropout_probability=result["dropout_probability"],
-                    dropout_prediction=result["dropout_prediction"],
-                    risk_level=result["risk_level"],
-                    risk_score=result["risk_score"],
-                    feature_importance=result["feature_importance"],
-                    model_version=result["model_version"]
-                ))
-        
-        return BatchPredictionResponse(
-            predictions=predictions,
-            total_students=len(predictions),
-            model_version="v1.0"
-        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/features/upsert")
+async def upsert_student_features(request: Request):
+    """
+    Encode and store feature vectors so students can later be scored by ID
+    
+    Accepts the same bodies as /predict/batch.
+    """
+    students_frame, rejected_rows = await read_students_frame(request)
+    
+    try:
+        upserted = await run_in_threadpool(feature_store.upsert_frame, students_frame)
+        return {
+            "upserted": upserted,
+            "rejected_rows": rejected_rows,
+            "stored_students": feature_store.count(),
+            "status": "success"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def apply_feature_events(events: List[Dict[str, Any]], score: bool) -> Dict[str, Any]:
+    """Apply parsed events, flush the updated vectors and optionally rescore those students"""
+    report = feature_pipeline.apply_events(events)
+    result = feature_pipeline.flush()
+    report.update({
+        "updated_students": len(result["updated_student_ids"]),
+        "pending_student_ids": result["pending_student_ids"]
+    })
+    if score and result["updated_student_ids"]:
+        columns = score_stored_students(result["updated_student_ids"])
+        report["rescored_students"] = len(columns["student_id"])
+    return report
+
+@app.post("/features/events")
+async def ingest_feature_events(request: Request, score: bool = False):
+    """
+    Apply raw attendance/marks events and update the affected stored vectors
+    
+    Body: NDJSON (default) or text/csv events, see FeaturePipeline for the fields.
+    With ?score=true the updated students are rescored (and re-ranked) right away.
+    """
+    content_type = (request.headers.get("content-type") or "").split(";")[0].strip().lower()
+    try:
+        # Parse everything first so a malformed body applies nothing
+        events = list(read_events(await request.body(), content_type))
+    except (UnicodeDecodeError, csv.Error, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse events: {e}")
+    
+    try:
+        # Encoding, the SQLite writes and rescoring all block, so keep them off the event loop
+        return await run_in_threadpool(apply_feature_events, events, score)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/predict/by-id", response_model=StudentIDPredictionResponse)
+async def predict_students_by_id(request: Request):
+    """
+    Predict dropout risk for stored students from their encoded feature vectors
+    
+    Body: {"student_ids": [...]}. IDs without stored features are listed in
+    missing_student_ids (JSON) or counted in the X-Missing-Students header.
+    """
+    try:
+        id_request = StudentIDPredictionRequest.model_validate_json(await request.body())
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_input=False))
+    
+    try:
+        columns = await run_in_threadpool(score_stored_students, id_request.student_ids)
+        with span("serialize"):
+            return await run_in_threadpool(
+                prediction_columns_response, request, columns, columns["missing_student_ids"]
+            )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/jobs", status_code=202)
+async def submit_scoring_job(request: Request):
+    """
+    Queue a bulk-scoring job and return its id immediately
+    
+    Body: {"csv_path": "..."} (a file under ML_JOBS_INPUT_DIR), {"student_ids": [...]}
+    (scored from the feature store) or a raw text/csv upload.
+    """
+    body = await request.body()
+    content_type = (request.headers.get("content-type") or "").split(";")[0].strip().lower()
+    
+    if content_type == "text/csv":
+        try:
+            students_frame = pd.read_csv(io.BytesIO(body)).drop(columns=["IsDropout"], errors="ignore")
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Could not parse CSV upload: {e}")
+        check_student_columns(students_frame.columns)
+        job = job_manager.submit(
+            len(students_frame), "csv_upload", iter_frame_chunks(students_frame), score_student_frame
+        )
+        return job.status_dict()
+    
+    try:
+        job_request = ScoringJobRequest.model_validate_json(body)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_input=False))
+    
+    if job_request.student_ids is not None:
+        job = job_manager.submit(
+            len(job_request.student_ids), "student_ids",
+            iter_id_chunks(job_request.student_ids), score_stored_students
+        )
+        return job.status_dict()
+    
+    if job_request.csv_path:
+        csv_path = resolve_input_csv(job_request.csv_path)
+        check_student_columns(pd.read_csv(csv_path, nrows=0).columns)
+        job = job_manager.submit(
+            count_csv_rows(csv_path), os.path.basename(csv_path),
+            iter_csv_chunks(csv_path), score_student_frame
+        )
+        return job.status_dict()
+    
+    raise HTTPException(status_code=400, detail="Provide csv_path, student_ids or a text/csv body")
+
+@app.get("/jobs")
+async def list_scoring_jobs():
+    return {"jobs": job_manager.list_jobs()}
+
+@app.get("/jobs/{job_id}")
+async def get_scoring_job(job_id: str):
+    """
+    Poll a job's status and progress
+    """
+    return get_job_or_404(job_id).status_dict()
+
+@app.get("/jobs/{job_id}/results")
+async def get_scoring_job_results(job_id: str, request: Request, offset: int = 0, limit: int = 1000):
+    """
+    Results scored so far (partial while the job runs), paged by offset/limit
+    
+    Rendered like /predict/batch according to Accept / Accept-Encoding.
+    """
+    job = get_job_or_404(job_id)
+    response = prediction_columns_response(request, job.result_columns(offset, limit))
+    response.headers["X-Job-Status"] = job.status
+    response.headers["X-Job-Processed"] = str(job.processed)
+    return response
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_scoring_job(job_id: str):
+    """
+    Stop a job after its current chunk; results scored so far stay available
+    """
+    get_job_or_404(job_id)
+    return job_manager.cancel(job_id).status_dict()
+
+@app.get("/jobs/{job_id}/download")
+async def download_scoring_job(job_id: str, request: Request, format: str = "csv"):
+    """
+    Download a completed job's results as CSV (default) or NDJSON
+    """
+    job = get_job_or_404(job_id)
+    if job.status != COMPLETED:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}, not completed")
+    
+    if format == "csv":
+        response = negotiated_stream(request, job.iter_csv(), "text/csv")
+    elif format == "ndjson":
+        response = negotiated_stream(request, job.iter_ndjson(), NDJSON_MEDIA_TYPE)
+    else:
+        raise HTTPException(status_code=400, detail="format must be csv or ndjson")
+    
+    response.headers["Content-Disposition"] = f'attachment; filename="scores_{job_id}.{format}"'
+    return response
+
+@app.get("/risk-index/top")
+async def get_top_at_risk(k: int = 50, IsRural: Optional[str] = None, AdmissionQuota: Optional[str] = None,
+                          AccommodationType: Optional[str] = None):
+    """
+    The k highest-risk students among everyone scored so far, optionally filtered
+    by IsRural / AdmissionQuota / AccommodationType
+    """
+    filters = risk_index_filters(IsRural, AdmissionQuota, AccommodationType)
+    return {"students": risk_index.top(k, filters), "indexed_students": len(risk_index)}
+
+@app.get("/risk-index/above")
+async def get_students_above_threshold(min_probability: float = 0.5, limit: int = 1000,
+                                       IsRural: Optional[str] = None, AdmissionQuota: Optional[str] = None,
+                                       AccommodationType: Optional[str] = None):
+    """
+    Students whose latest dropout probability is at least min_probability
+    """
+    filters = risk_index_filters(IsRural, AdmissionQuota, AccommodationType)
+    return risk_index.above(min_probability, filters, limit)
+
+@app.get("/risk-index/percentile")
+async def get_students_above_percentile(p: float = 90, limit: int = 1000,
+                                        IsRural: Optional[str] = None, AdmissionQuota: Optional[str] = None,
+                                        AccommodationType: Optional[str] = None):
+    """
+    Students at or above the p-th percentile of risk (p=90 is the riskiest 10%)
+    """
+    filters = risk_index_filters(IsRural, AdmissionQuota, AccommodationType)
+    try:
+        return risk_index.percentile(p, filters, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/risk-index/students/{student_id}")
+async def get_student_risk_rank(student_id: str):
+    """
+    A student's latest indexed score with their rank and percentile
+    """
+    row = risk_index.rank(student_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"Student not indexed: {student_id}")
+    return row
+
+@app.get("/risk-index/stats")
+async def get_risk_index_stats():
+    return risk_index.stats()
+
+@app.get("/drift")
+async def get_feature_drift():
+    """
+    Per-feature drift (PSI) of recent prediction traffic against the training baseline
+    """
+    return drift_monitor.report()
+
 @app.get("/model/info")
 async def get_model_info():
     """
@@ -151,6 +652,8 @@ async def get_model_info():
         "feature_count": len(ml_model.feature_columns),
         "features": ml_model.feature_columns,
         "model_loaded": ml_model.model is not None,
+        "batch_media_types": available_media_types(),
+        "response_encodings": available_encodings(),
         "version": "v1.0"
     }
 
@@ -160,7 +663,10 @@ async def retrain_model():
     Retrain the ML model with fresh data
     """
     try:
-        ml_model.train_model()
+        ml_model.train_model(model_path=MODEL_PATH)
+        # Scores from the previous model are no longer comparable
+        risk_index.clear()
+        drift_monitor.replace_baseline(load_drift_baseline(drift_baseline_path_for(MODEL_PATH)))
         return {
             "message": "Model retrained successfully",
             "status": "success"
@@ -168,14 +674,47 @@ async def retrain_model():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/model/update")
+async def update_model(request: ModelUpdateRequest):
+    """
+    Incrementally update the forest with a new term's labelled records
+    
+    Body: {"csv_path": "...", "mode": "add"|"replace", "n_trees": 20, "holdout_path": "..."}
+    (paths under ML_JOBS_INPUT_DIR). The updated model is only activated when it
+    passes the holdout accuracy gate; the report says whether it was.
+    """
+    csv_path = resolve_input_csv(request.csv_path)
+    holdout_path = resolve_input_csv(request.holdout_path) if request.holdout_path else None
+    
+    try:
+        # Growing trees and re-saving the model takes seconds; keep serving meanwhile
+        report = await run_in_threadpool(
+            ml_model.update_model, csv_path, mode=request.mode, n_trees=request.n_trees,
+            holdout_path=holdout_path, model_path=MODEL_PATH
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    if report["activated"]:
+        # Scores from the previous model are no longer comparable
+        risk_index.clear()
+    return report
+
 if __name__ == "__main__":
     print("🚀 Starting EduAnalytics ML API Server...")
     print("📊 Model Status:", "Loaded" if ml_model.model is not None else "Training...")
     print("🌐 API Documentation: http://localhost:8001/docs")
     
-    uvicorn.run(
-        app, 
-        host="0.0.0.0", 
-        port=8001,
-        reload=True
-    )
+    workers = int(os.environ.get("ML_API_WORKERS", "1"))
+    if workers > 1:
+        # Each worker imports this module; with ML_MODEL_MMAP=r they share the forest's pages
+        uvicorn.run("ml_api:app", host="0.0.0.0", port=8001, workers=workers)
+    else:
+        uvicorn.run(
+            app, 
+            host="0.0.0.0", 
+            port=8001,
+            reload=True
+        )
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Batch request validation for the EduAnalytics ML API
+Validates a whole students_data list in one pydantic-core call into plain
+dicts (no StudentData instance per student) and builds the scoring dataframe
+column by column. Invalid rows are reported with their position and errors
+while the valid rows are still scored. When msgspec is installed it decodes
+well-formed batches first; anything it rejects goes through the pydantic path,
+so errors are reported the same way either way.
+"""
+
+import json
+import os
+import sys
+import time
+from operator import attrgetter, itemgetter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from pydantic_core import from_json
+from typing_extensions import TypedDict
+
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
+
+class StudentData(BaseModel):
+    StudentID: str
+    Gender: str
+    AccommodationType: str
+    IsRural: str
+    CommuteTimeMinutes: float
+    AdmissionQuota: str
+    FamilyAnnualIncome: float
+    NumberOfSiblings: int
+    FatherEducation: str
+    IsFatherLiterate: str
+    MotherEducation: str
+    IsMotherLiterate: str
+    IsFirstGenerationLearner: str
+    AvgPastPerformance: float
+    MediumChanged: str
+    AvgMarks_LatestTerm: float
+    MarksTrend: float
+    FailureRate_LatestTerm: float
+    AvgAttendance_LatestTerm: float
+    WorksPartTime: str
+    IsPreparingCompetitiveExam: str
+    HasOwnLaptop: str
+    HasReliableInternet: str
+
+
+class BatchPredictionRequest(BaseModel):
+    students_data: List[StudentData]
+
+
+STUDENT_COLUMNS = list(StudentData.model_fields)
+# Numeric columns are built with their dtype; pandas only has to infer the string ones
+_COLUMN_DTYPES = {
+    name: {float: np.float64, int: np.int64}.get(field.annotation, object)
+    for name, field in StudentData.model_fields.items()
+}
+_record_values = itemgetter(*STUDENT_COLUMNS)
+
+# StudentData's fields as a TypedDict: validated into dicts instead of model instances
+StudentRecord = TypedDict("StudentRecord", {
+    name: field.annotation for name, field in StudentData.model_fields.items()
+})
+BatchRecords = TypedDict("BatchRecords", {"students_data": List[StudentRecord]})
+
+_batch_adapter = TypeAdapter(BatchRecords)
+_rows_adapter = TypeAdapter(List[StudentRecord])
+
+if MSGSPEC_AVAILABLE:
+    _StudentStruct = msgspec.defstruct("StudentStruct", [
+        (name, field.annotation) for name, field in StudentData.model_fields.items()
+    ])
+    _BatchStruct = msgspec.defstruct("BatchStruct", [("students_data", List[_StudentStruct])])
+    # Lax mode, like pydantic: numeric strings are accepted for numeric fields
+    _msgspec_decoder = msgspec.json.Decoder(_BatchStruct, strict=False)
+
+
+def _columns_frame(rows: List[Any], getter) -> pd.DataFrame:
+    """Transpose validated rows into typed columns"""
+    columns = zip(*map(getter, rows)) if rows else [()] * len(STUDENT_COLUMNS)
+    return pd.DataFrame(
+        {name: np.array(values, dtype=_COLUMN_DTYPES[name]) for name, values in zip(STUDENT_COLUMNS, columns)},
+        columns=STUDENT_COLUMNS
+    )
+
+
+def _row_errors(errors: List[Dict[str, Any]]) -> Dict[int, List[Dict[str, str]]]:
+    """
+    Group pydantic errors by students_data row
+
+    Returns:
+        Errors per row index, or {} when any error is outside the rows
+        (e.g. students_data missing), which fails the whole request
+    """
+    by_row: Dict[int, List[Dict[str, str]]] = {}
+    for error in errors:
+        loc = error["loc"]
+        if len(loc) < 2 or loc[0] != "students_data" or not isinstance(loc[1], int):
+            return {}
+        by_row.setdefault(loc[1], []).append({
+            "field": ".".join(str(part) for part in loc[2:]),
+            "message": error["msg"]
+        })
+    return by_row
+
+
+def _raw_student_id(row: Any) -> Optional[str]:
+    """StudentID of a rejected row as text, when it has a scalar one"""
+    value = row.get("StudentID") if isinstance(row, dict) else None
+    if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+        return str(value)
+    return None
+
+
+def validate_students_json(body: bytes) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+    """
+    Validate a {"students_data": [...]} JSON body into a dataframe
+
+    Args:
+        body: Raw request body
+
+    Returns:
+        Tuple of (dataframe of the valid students in request order, rejected rows as
+        {"row": index in students_data, "student_id": StudentID as text or None, "errors": [...]})
+
+    Raises:
+        ValidationError: The body is not JSON or has no students_data list
+    """
+    if MSGSPEC_AVAILABLE:
+        try:
+            batch = _msgspec_decoder.decode(body)
+            return _columns_frame(batch.students_data, attrgetter(*STUDENT_COLUMNS)), []
+        except (msgspec.ValidationError, msgspec.DecodeError):
+            pass
+
+    try:
+        batch = _batch_adapter.validate_json(body)
+        return _columns_frame(batch["students_data"], _record_values), []
+    except ValidationError as e:
+        by_row = _row_errors(e.errors())
+        if not by_row:
+            raise
+
+    rows = from_json(body)["students_data"]
+    valid = _rows_adapter.validate_python([row for i, row in enumerate(rows) if i not in by_row])
+    rejected = [
+        {
+            "row": i,
+            "student_id": _raw_student_id(rows[i]),
+            "errors": errors
+        }
+        for i, errors in sorted(by_row.items())
+    ]
+    return _columns_frame(valid, _record_values), rejected
+
+
+def validate_students_models(body: bytes) -> pd.DataFrame:
+    """The per-student model path validate_students_json replaces (kept for benchmarking)"""
+    batch_request = BatchPredictionRequest.model_validate_json(body)
+    return pd.DataFrame(
+        [student.model_dump() for student in batch_request.students_data],
+        columns=STUDENT_COLUMNS
+    )
+
+
+def _best_time(fn, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    """Benchmark batch validation against the per-student model path"""
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else "final_synthetic_dropout_data_rajasthan.csv"
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+
+    print("🚀 EduAnalytics Batch Validation Benchmark")
+    print("=" * 50)
+
+    if not os.path.exists(csv_path):
+        print(f"❌ CSV file not found: {csv_path}")
+        return
+
+    df = pd.read_csv(csv_path, nrows=rows).drop(columns=["IsDropout"], errors="ignore")
+    for column in df.select_dtypes(include="bool").columns:
+        df[column] = df[column].map({True: "TRUE", False: "FALSE"})
+    body = json.dumps({"students_data": df.to_dict(orient="records")}).encode()
+
+    models = _best_time(lambda: validate_students_models(body), 5)
+    batch = _best_time(lambda: validate_students_json(body), 5)
+    print(f"📊 {len(df)} students, {len(body) / 1024:.0f} KB body"
+          f"{' (msgspec)' if MSGSPEC_AVAILABLE else ''}")
+    print(f"   Per-student models: {models * 1000:.1f} ms")
+    print(f"   Batch validation:   {batch * 1000:.1f} ms ({models / batch:.1f}x faster)")
+
+    # Bad rows in the middle are reported (numeric StudentIDs as text); the rest still come through
+    records = df.to_dict(orient="records")
+    records[len(records) // 2]["NumberOfSiblings"] = "many"
+    records[len(records) // 2 + 1]["StudentID"] = 123
+    frame, rejected = validate_students_json(json.dumps({"students_data": records}).encode())
+    if [row["student_id"] for row in rejected][-1:] != ["123"]:
+        print(f"❌ Unexpected rejected rows: {rejected}")
+        return
+    print(f"✅ With {len(rejected)} invalid rows: {len(frame)} valid, rejected {rejected}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Two-stage cascade scoring for EduAnalytics
+Scores a whole cohort with the vectorized heuristic from ml_api_simple.py and
+sends only students in an uncertainty band to the full model + explainer
+"""
+
+import os
+import sys
+from datetime import datetime
+from typing import Dict, List, Any, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Heuristic dropout probabilities inside [low, high] are escalated to the full model
+DEFAULT_BAND = (
+    float(os.environ.get("ML_CASCADE_LOW", "0.15")),
+    float(os.environ.get("ML_CASCADE_HIGH", "0.60"))
+)
+
+# Same static weights ml_api_simple.py reports for its heuristic
+HEURISTIC_FEATURE_IMPORTANCE = {
+    "attendance": 0.25,
+    "performance": 0.20,
+    "family_income": 0.15,
+    "rural_status": 0.10,
+    "first_generation": 0.10,
+    "siblings": 0.08,
+    "part_time_work": 0.07,
+    "technology_access": 0.05
+}
+
+
+def _numeric(df: pd.DataFrame, column: str, default: float) -> np.ndarray:
+    if column not in df.columns:
+        return np.full(len(df), default, dtype=np.float64)
+    return pd.to_numeric(df[column], errors="coerce").fillna(default).to_numpy(dtype=np.float64)
+
+
+def _flag(df: pd.DataFrame, column: str, default: str = "FALSE") -> np.ndarray:
+    """TRUE/FALSE column as a string array (bools and lowercase accepted)"""
+    if column not in df.columns:
+        return np.full(len(df), default)
+    return df[column].fillna(default).astype(str).str.upper().to_numpy()
+
+
+def heuristic_scores(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized calculate_risk_score + calculate_dropout_probability from ml_api_simple.py
+
+    Args:
+        df: Raw student records (one row per student)
+
+    Returns:
+        Tuple of (risk_score int array, dropout_probability float array)
+    """
+    attendance = _numeric(df, "AvgAttendance_LatestTerm", 75)
+    performance = _numeric(df, "AvgMarks_LatestTerm", 60)
+    siblings = _numeric(df, "NumberOfSiblings", 2)
+    income = _numeric(df, "FamilyAnnualIncome", 50000)
+    failure_rate = _numeric(df, "FailureRate_LatestTerm", 0.1)
+
+    # Attendance factor (0-30 points)
+    score = np.select([attendance < 60, attendance < 70, attendance < 80], [30, 20, 10], default=0)
+
+    # Performance factor (0-25 points)
+    score += np.select(
+        [performance < 40, performance < 50, performance < 60, performance < 70],
+        [25, 20, 15, 10], default=0
+    )
+
+    # Socioeconomic factors (0-20 points)
+    score += np.where(_flag(df, "IsRural") == "TRUE", 5, 0)
+    score += np.where(_flag(df, "IsFirstGenerationLearner") == "TRUE", 8, 0)
+    score += np.where(siblings > 3, 4, 0)
+    score += np.where(income < 50000, 8, 0)
+
+    # Academic factors (0-15 points)
+    score += np.where(_flag(df, "MediumChanged") == "TRUE", 5, 0)
+    score += np.where(_flag(df, "WorksPartTime") == "TRUE", 7, 0)
+    score += np.where(failure_rate > 0.3, 10, 0)
+
+    # Technology access (0-10 points)
+    score += np.where(_flag(df, "HasOwnLaptop") == "FALSE", 3, 0)
+    score += np.where(_flag(df, "HasReliableInternet") == "FALSE", 4, 0)
+
+    risk_score = np.minimum(score, 100).astype(int)
+
+    base_probability = risk_score * 0.6
+    base_probability = base_probability + np.where(attendance < 50, 15, 0) + np.where(performance < 30, 10, 0)
+    dropout_probability = np.minimum(base_probability / 100, 0.95)
+
+    return risk_score, dropout_probability
+
+
+class CascadeScorer:
+    """Heuristic prefilter in front of RealMLService.predict_batch"""
+
+    def __init__(self, ml_service, band: Tuple[float, float] = DEFAULT_BAND):
+        """
+        Args:
+            ml_service: RealMLService (anything with predict_batch and _determine_risk_level)
+            band: Heuristic dropout probability range escalated to the full model
+        """
+        self.ml_service = ml_service
+        self.band = band
+
+    def score(self, students_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Score a cohort through the cascade
+
+        Returns:
+            Dictionary with per-student predictions (input order) and stage counts
+        """
+        if not students_data:
+            return {"predictions": [], "stages": self._stages(0, 0)}
+
+        frame = pd.DataFrame(students_data)
+        _, heuristic_probability = heuristic_scores(frame)
+
+        low, high = self.band
+        escalate = (heuristic_probability >= low) & (heuristic_probability <= high)
+        escalated_rows = np.flatnonzero(escalate)
+
+        predictions: List[Dict[str, Any]] = [None] * len(students_data)
+
+        if len(escalated_rows):
+            model_results = self.ml_service.predict_batch([students_data[i] for i in escalated_rows])
+            for i, result in zip(escalated_rows, model_results):
+                result["cascade_stage"] = "model"
+                predictions[i] = result
+
+        timestamp = datetime.now().isoformat()
+        for i in np.flatnonzero(~escalate):
+            probability = float(heuristic_probability[i])
+            predictions[i] = {
+                "student_id": students_data[i].get("StudentID", "unknown"),
+                "dropout_probability": probability,
+                "risk_level": self.ml_service._determine_risk_level(probability),
+                "risk_score": int(probability * 100),
+                "dropout_prediction": probability > 0.5,
+                "feature_importance": dict(HEURISTIC_FEATURE_IMPORTANCE),
+                "risk_explanation": [],
+                "model_version": "cascade_heuristic_v1.0",
+                "shap_available": False,
+                "prediction_timestamp": timestamp,
+                "data_source": "CASCADE_HEURISTIC",
+                "cascade_stage": "heuristic"
+            }
+
+        return {
+            "predictions": predictions,
+            "stages": self._stages(len(students_data) - len(escalated_rows), len(escalated_rows))
+        }
+
+    def _stages(self, heuristic_rows: int, model_rows: int) -> Dict[str, Any]:
+        total = heuristic_rows + model_rows
+        return {
+            "band": list(self.band),
+            "heuristic_rows": int(heuristic_rows),
+            "model_rows": int(model_rows),
+            "model_fraction": round(model_rows / total, 4) if total else 0.0
+        }
+
+    def evaluate(self, students_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Compare the cascade with scoring everyone through the full model
+
+        Args:
+            students_data: Validation cohort
+
+        Returns:
+            Stage counts plus risk-level and dropout-prediction agreement rates
+        """
+        full = self.ml_service.predict_batch(students_data)
+        cascade = self.score(students_data)
+
+        total = len(full)
+        level_matches = sum(f["risk_level"] == c["risk_level"] for f, c in zip(full, cascade["predictions"]))
+        prediction_matches = sum(
+            bool(f["dropout_prediction"]) == bool(c["dropout_prediction"])
+            for f, c in zip(full, cascade["predictions"])
+        )
+        return {
+            "rows": total,
+            "stages": cascade["stages"],
+            "risk_level_agreement": round(level_matches / total, 4) if total else 1.0,
+            "dropout_prediction_agreement": round(prediction_matches / total, 4) if total else 1.0
+        }
+
+
+def main():
+    """Report stage counts and agreement for a few bands on a validation CSV"""
+    from ml_service_real import RealMLService
+
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else "final_synthetic_dropout_data_rajasthan.csv"
+    if not os.path.exists(csv_path):
+        print(f"❌ CSV file not found: {csv_path}")
+        return
+
+    print("🚀 EduAnalytics cascade scoring evaluation")
+    print("=" * 50)
+
+    validation = pd.read_csv(csv_path).drop(columns=["IsDropout"], errors="ignore")
+    students = validation.to_dict(orient="records")
+    service = RealMLService()
+
+    for band in [DEFAULT_BAND, (0.10, 0.70), (0.20, 0.50)]:
+        report = CascadeScorer(service, band).evaluate(students)
+        stages = report["stages"]
+        print(f"\n📊 Band {band}: model rows {stages['model_rows']}/{report['rows']} "
+              f"({stages['model_fraction']:.1%})")
+        print(f"   Risk level agreement: {report['risk_level_agreement']:.1%}")
+        print(f"   Dropout prediction agreement: {report['dropout_prediction_agreement']:.1%}")
+
+if __name__ == "__main__":
+    main()
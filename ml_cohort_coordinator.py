@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+EduAnalytics Cohort Scoring Coordinator
+Shards a cohort by StudentID hash, scores the shards on a pool of worker
+processes (and optionally other ML API instances over HTTP), retries failed
+shards and merges the results in input order
+"""
+
+import json
+import os
+import sys
+import time
+import urllib.request
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+RESULT_COLUMNS = ["student_id", "dropout_probability", "dropout_prediction", "risk_level", "risk_score"]
+
+DEFAULT_MODEL_PATH = os.environ.get("ML_MODEL_PATH", "eduanalytics_model.pkl")
+
+# Per-process state set up once by _init_worker
+_worker_model = None
+_worker_store = None
+
+
+def shard_assignments(student_ids, n_shards: int) -> np.ndarray:
+    """
+    Stable shard index per student (CRC32 of the StudentID)
+
+    The same student always lands in the same shard, across runs and machines.
+    """
+    return np.array(
+        [zlib.crc32(str(student_id).encode()) % n_shards for student_id in student_ids],
+        dtype=np.int64
+    )
+
+
+def _init_worker(model_path: str, store_path: Optional[str]):
+    """Load the model (and open the feature store) once per worker process"""
+    global _worker_model, _worker_store
+    from ml_model import EduAnalyticsMLModel
+    _worker_model = EduAnalyticsMLModel(model_path)
+    if store_path:
+        from ml_feature_store import FeatureStore
+        _worker_store = FeatureStore(_worker_model, store_path)
+
+
+def _score_shard_local(shard: Dict[str, Any]) -> Dict[str, Any]:
+    """Score one shard inside a worker process"""
+    start_time = time.perf_counter()
+
+    if _worker_store is not None:
+        student_ids, X, missing = _worker_store.get_matrix(shard["student_ids"])
+        if missing:
+            raise KeyError(f"No stored features for {len(missing)} students, e.g. {missing[0]}")
+        columns = _worker_model.predict_columns(X)
+        columns["student_id"] = np.asarray(student_ids, dtype=object)
+    else:
+        columns = _worker_model.batch_predict_columns(shard["frame"])
+
+    return {
+        "columns": {name: np.asarray(columns[name]).tolist() for name in RESULT_COLUMNS},
+        "seconds": time.perf_counter() - start_time,
+        "target": f"process-{os.getpid()}"
+    }
+
+
+def _score_shard_http(endpoint: str, shard: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+    """Score one shard on another ML API instance"""
+    start_time = time.perf_counter()
+
+    if "frame" in shard:
+        frame = shard["frame"]
+        # The API validates TRUE/FALSE flags as strings
+        bool_columns = [c for c in frame.columns if frame[c].dtype == bool]
+        frame = frame.astype({c: str for c in bool_columns})
+        frame = frame.replace({c: {"True": "TRUE", "False": "FALSE"} for c in bool_columns})
+        url = endpoint.rstrip("/") + "/predict/batch"
+        payload = {"students_data": json.loads(frame.to_json(orient="records"))}
+    else:
+        url = endpoint.rstrip("/") + "/predict/by-id"
+        payload = {"student_ids": shard["student_ids"]}
+
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json", "Accept": "application/json"}
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        result = json.loads(response.read().decode("utf-8"))
+
+    if result.get("missing_student_ids"):
+        raise KeyError(f"{endpoint} has no stored features for {len(result['missing_student_ids'])} students")
+    # /predict/batch scores the valid rows and lists the rest; a partial shard is retried locally
+    if result.get("rejected_rows"):
+        raise ValueError(f"{endpoint} rejected {len(result['rejected_rows'])} rows, "
+                         f"e.g. row {result['rejected_rows'][0]['row']}")
+
+    predictions = result["predictions"]
+    expected_rows = len(shard["frame"]) if "frame" in shard else len(shard["student_ids"])
+    if len(predictions) != expected_rows:
+        raise ValueError(f"{endpoint} returned {len(predictions)} predictions for {expected_rows} rows")
+    return {
+        "columns": {name: [p[name] for p in predictions] for name in RESULT_COLUMNS},
+        "seconds": time.perf_counter() - start_time,
+        "target": endpoint
+    }
+
+
+class CohortCoordinator:
+    """Partition, dispatch, retry and merge cohort scoring shards"""
+
+    def __init__(self, model_path: str = DEFAULT_MODEL_PATH, workers: int = None,
+                 endpoints: List[str] = None, store_path: str = None,
+                 max_retries: int = 2, http_timeout: float = 300.0):
+        """
+        Args:
+            model_path: Model loaded by every worker process
+            workers: Worker processes (defaults to the CPU count)
+            endpoints: Base URLs of extra ml_api.py instances to share the load
+            store_path: Feature store to read vectors from instead of raw records
+            max_retries: Extra attempts per failed shard (retries run locally)
+            http_timeout: Seconds to wait for a remote shard
+        """
+        self.model_path = model_path
+        self.workers = workers or os.cpu_count() or 1
+        self.endpoints = endpoints or []
+        self.store_path = store_path
+        self.max_retries = max_retries
+        self.http_timeout = http_timeout
+
+    def score_csv(self, csv_path: str, n_shards: int = None) -> Dict[str, Any]:
+        """Score a cohort CSV"""
+        df = pd.read_csv(csv_path).drop(columns=["IsDropout"], errors="ignore")
+        return self.score_frame(df, n_shards)
+
+    def score_frame(self, df: pd.DataFrame, n_shards: int = None) -> Dict[str, Any]:
+        """Score raw student records (needs a StudentID column)"""
+        return self._run(df["StudentID"].astype(str).to_numpy(), df, n_shards)
+
+    def score_ids(self, student_ids: List[str], n_shards: int = None) -> Dict[str, Any]:
+        """Score students from the feature store by ID"""
+        if not self.store_path:
+            raise ValueError("Scoring by ID needs store_path")
+        return self._run(np.asarray(student_ids, dtype=object), None, n_shards)
+
+    def _run(self, student_ids: np.ndarray, df: Optional[pd.DataFrame],
+             n_shards: Optional[int]) -> Dict[str, Any]:
+        start_time = time.perf_counter()
+        # Workers would otherwise each retrain a model from scratch in _init_worker
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(f"Model file not found: {self.model_path}")
+        n_targets = self.workers + len(self.endpoints)
+        n_shards = n_shards or n_targets * 4
+
+        assignments = shard_assignments(student_ids, n_shards)
+        shards = {}
+        for shard_id in range(n_shards):
+            rows = np.flatnonzero(assignments == shard_id)
+            if not len(rows):
+                continue
+            shard = {"rows": rows}
+            if df is not None:
+                shard["frame"] = df.iloc[rows].reset_index(drop=True)
+            else:
+                shard["student_ids"] = [str(s) for s in student_ids[rows]]
+            shards[shard_id] = shard
+
+        results = {}
+        failures = {}
+        attempts = {shard_id: 0 for shard_id in shards}
+        # Workers only need the feature store when scoring by ID
+        store_path = self.store_path if df is None else None
+
+        with ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker,
+            initargs=(self.model_path, store_path)
+        ) as pool, ThreadPoolExecutor(max_workers=max(len(self.endpoints), 1)) as http_pool:
+
+            def submit(shard_id: int):
+                attempts[shard_id] += 1
+                # Spread first attempts across processes and endpoints; retries stay local
+                slot = shard_id % n_targets
+                payload = {k: v for k, v in shards[shard_id].items() if k != "rows"}
+                if attempts[shard_id] == 1 and slot >= self.workers:
+                    endpoint = self.endpoints[slot - self.workers]
+                    return http_pool.submit(_score_shard_http, endpoint, payload, self.http_timeout)
+                return pool.submit(_score_shard_local, payload)
+
+            pending = {submit(shard_id): shard_id for shard_id in shards}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    shard_id = pending.pop(future)
+                    try:
+                        results[shard_id] = future.result()
+                        failures.pop(shard_id, None)
+                    except Exception as e:
+                        failures[shard_id] = str(e)
+                        if attempts[shard_id] <= self.max_retries:
+                            print(f"⚠️  Shard {shard_id} failed ({e}); retrying")
+                            pending[submit(shard_id)] = shard_id
+
+        return self._merge(student_ids, shards, results, failures, attempts,
+                           time.perf_counter() - start_time)
+
+    @staticmethod
+    def _merge(student_ids, shards, results, failures, attempts, elapsed) -> Dict[str, Any]:
+        """Put shard results back in input order and build the per-shard report"""
+        merged = pd.DataFrame({"student_id": student_ids})
+        for name in RESULT_COLUMNS[1:]:
+            merged[name] = None
+
+        shard_report = []
+        for shard_id, shard in sorted(shards.items()):
+            rows = shard["rows"]
+            result = results.get(shard_id)
+            report = {"shard": shard_id, "rows": len(rows), "attempts": attempts[shard_id]}
+            if result is None:
+                report["error"] = failures.get(shard_id)
+            else:
+                for name in RESULT_COLUMNS[1:]:
+                    merged.iloc[rows, merged.columns.get_loc(name)] = result["columns"][name]
+                report.update({
+                    "target": result["target"],
+                    "seconds": round(result["seconds"], 4),
+                    "rows_per_second": round(len(rows) / result["seconds"], 1) if result["seconds"] else None
+                })
+            shard_report.append(report)
+
+        scored = sum(len(shards[s]["rows"]) for s in results)
+        return {
+            "predictions": merged,
+            "total_students": len(student_ids),
+            "scored_students": scored,
+            "failed_shards": sorted(set(shards) - set(results)),
+            "shards": shard_report,
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round(scored / elapsed, 1) if elapsed else None
+        }
+
+
+def main():
+    """Score a cohort CSV across worker processes and print per-shard throughput"""
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else "final_synthetic_dropout_data_rajasthan.csv"
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    endpoints = [e for e in os.environ.get("ML_COORDINATOR_ENDPOINTS", "").split(",") if e]
+
+    print("🚀 EduAnalytics Cohort Scoring Coordinator")
+    print("=" * 50)
+
+    if not os.path.exists(csv_path):
+        print(f"❌ CSV file not found: {csv_path}")
+        return
+    if not os.path.exists(DEFAULT_MODEL_PATH):
+        print(f"❌ Model file not found: {DEFAULT_MODEL_PATH}")
+        return
+
+    coordinator = CohortCoordinator(workers=workers, endpoints=endpoints)
+    report = coordinator.score_csv(csv_path)
+
+    print(f"📊 Scored {report['scored_students']}/{report['total_students']} students "
+          f"in {report['seconds']}s ({report['rows_per_second']} rows/s)")
+    print(f"⚙️  Workers: {coordinator.workers}, endpoints: {len(endpoints)}, shards: {len(report['shards'])}")
+    for shard in report["shards"]:
+        if "error" in shard:
+            print(f"   ❌ shard {shard['shard']}: {shard['rows']} rows failed after "
+                  f"{shard['attempts']} attempts: {shard['error']}")
+        else:
+            print(f"   ✅ shard {shard['shard']}: {shard['rows']} rows on {shard['target']} "
+                  f"({shard['rows_per_second']} rows/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Response compression for EduAnalytics ML services
+Accept-Encoding negotiation with gzip (stdlib) and optional zstd/brotli
+"""
+
+import os
+import zlib
+from typing import Iterable, Iterator, Optional
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+IDENTITY = "identity"
+
+# Bodies smaller than this are sent uncompressed; the CPU cost is not worth it
+MIN_COMPRESS_SIZE = int(os.environ.get("ML_COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.environ.get("ML_COMPRESSION_GZIP_LEVEL", "6"))
+ZSTD_LEVEL = int(os.environ.get("ML_COMPRESSION_ZSTD_LEVEL", "3"))
+BROTLI_QUALITY = int(os.environ.get("ML_COMPRESSION_BROTLI_QUALITY", "4"))
+
+# Server-side preference when the client rates several encodings equally
+ENCODING_PREFERENCE = ["zstd", "br", "gzip"]
+
+
+def available_encodings() -> list:
+    """List the content codings usable in this environment, in ENCODING_PREFERENCE order"""
+    usable = {"zstd": ZSTD_AVAILABLE, "br": BROTLI_AVAILABLE, "gzip": True}
+    return [coding for coding in ENCODING_PREFERENCE if usable[coding]]
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> str:
+    """
+    Pick a content coding from an Accept-Encoding header
+
+    Args:
+        accept_encoding: Raw Accept-Encoding header value
+
+    Returns:
+        One of available_encodings(), or "identity"
+    """
+    if not accept_encoding:
+        return IDENTITY
+
+    qualities = {}
+    for part in accept_encoding.split(","):
+        pieces = part.split(";")
+        coding = pieces[0].strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in pieces[1:]:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+
+    # Strictly higher quality wins, so equally rated codings go by ENCODING_PREFERENCE
+    best, best_quality = IDENTITY, 0.0
+    for coding in available_encodings():
+        quality = qualities.get(coding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def should_compress(body_size: int, encoding: str) -> bool:
+    """Compress only when a coding was negotiated and the body is large enough"""
+    return encoding != IDENTITY and body_size >= MIN_COMPRESS_SIZE
+
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    """Compress a complete response body with the negotiated coding"""
+    if encoding == "gzip":
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress(body) + compressor.flush()
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return body
+
+
+class StreamingCompressor:
+    """Incremental compressor for chunked (e.g. NDJSON) responses"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        elif encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        elif encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = None
+
+    def compress(self, chunk: bytes) -> bytes:
+        """
+        Compress one chunk and flush it so the client can decode it immediately
+
+        Each chunk is a batch of complete NDJSON lines, so a sync flush per chunk
+        keeps the stream incremental without flushing per line.
+        """
+        if self._compressor is None:
+            return chunk
+        if self.encoding == "gzip":
+            return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        if self.encoding == "zstd":
+            return self._compressor.compress(chunk) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        if self.encoding == "br":
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return chunk
+
+    def finish(self) -> bytes:
+        """Emit the end-of-stream trailer"""
+        if self._compressor is None:
+            return b""
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def compress_stream(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    """Compress an iterable of body chunks with the negotiated coding"""
+    compressor = StreamingCompressor(encoding)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    trailer = compressor.finish()
+    if trailer:
+        yield trailer
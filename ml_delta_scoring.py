@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+EduAnalytics Delta Rescoring
+Keeps a per-student feature fingerprint and last result so cohort runs only
+rescore students whose features changed since the previous run
+"""
+
+import hashlib
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Any
+
+import numpy as np
+import pandas as pd
+
+from ml_model import EduAnalyticsMLModel
+
+DEFAULT_DB_PATH = os.environ.get("ML_SCORES_DB", "eduanalytics_scores.db")
+DEFAULT_MODEL_PATH = "eduanalytics_model.pkl"
+
+# SQLite's default limit on bound parameters per statement
+SQLITE_MAX_VARIABLES = 900
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS student_scores (
+    student_id TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    dropout_probability REAL NOT NULL,
+    risk_level TEXT NOT NULL,
+    risk_score INTEGER NOT NULL,
+    model_version TEXT NOT NULL,
+    scored_at TEXT NOT NULL
+)
+"""
+
+
+def feature_fingerprints(X: pd.DataFrame, model_version: str) -> List[str]:
+    """
+    Hash each encoded feature row together with the model version
+
+    Args:
+        X: Feature matrix as returned by EduAnalyticsMLModel.build_feature_matrix
+
+    Returns:
+        One hex digest per row
+    """
+    rows = np.ascontiguousarray(X.to_numpy(dtype=np.float32))
+    prefix = model_version.encode()
+    return [hashlib.blake2b(prefix + row.tobytes(), digest_size=16).hexdigest() for row in rows]
+
+
+def model_fingerprint(model_path: str) -> str:
+    """Short content hash of a model artifact, so a retrained model gets fresh scores and explanation stores"""
+    digest = hashlib.blake2b(digest_size=8)
+    with open(model_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DeltaScoringJob:
+    """Cohort scoring job that only rescores changed students"""
+
+    def __init__(self, ml_model: EduAnalyticsMLModel, model_version: str,
+                 db_path: str = DEFAULT_DB_PATH):
+        """
+        Args:
+            ml_model: Loaded EduAnalyticsMLModel
+            model_version: Stored with every result; a new version rescores everyone.
+                Use model_fingerprint() of the model file so retraining changes it
+            db_path: SQLite database holding the last result per student
+        """
+        self.ml_model = ml_model
+        self.model_version = model_version
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute(SCHEMA)
+        self.conn.commit()
+
+    def _previous_results(self, student_ids: List[str]) -> Dict[str, tuple]:
+        """Fetch (fingerprint, risk_level) for the given students"""
+        previous = {}
+        for start in range(0, len(student_ids), SQLITE_MAX_VARIABLES):
+            chunk = student_ids[start:start + SQLITE_MAX_VARIABLES]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT student_id, fingerprint, risk_level FROM student_scores "
+                f"WHERE student_id IN ({placeholders})",
+                chunk
+            )
+            for student_id, fingerprint, risk_level in rows:
+                previous[student_id] = (fingerprint, risk_level)
+        return previous
+
+    def run(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Score a cohort, rescoring only new or changed students in one batch
+
+        Args:
+            df: Raw student records with a StudentID column
+
+        Returns:
+            Run summary with row counts and the students whose risk level changed
+        """
+        start_time = time.perf_counter()
+
+        if "StudentID" not in df.columns:
+            raise ValueError("Delta rescoring needs a StudentID column")
+
+        # A student listed twice keeps its latest record
+        df = df.drop_duplicates(subset="StudentID", keep="last").reset_index(drop=True)
+        student_ids = df["StudentID"].astype(str).tolist()
+
+        X = self.ml_model.build_feature_matrix(df)
+        fingerprints = feature_fingerprints(X, self.model_version)
+        previous = self._previous_results(student_ids)
+
+        changed = np.array([
+            previous.get(student_id, (None,))[0] != fingerprint
+            for student_id, fingerprint in zip(student_ids, fingerprints)
+        ], dtype=bool)
+        changed_rows = np.flatnonzero(changed)
+
+        risk_changes = []
+        if len(changed_rows):
+            columns = self.ml_model.predict_columns(X.iloc[changed_rows])
+            scored_at = datetime.now().isoformat()
+
+            records = []
+            for j, i in enumerate(changed_rows):
+                student_id = student_ids[i]
+                risk_level = str(columns["risk_level"][j])
+                probability = float(columns["dropout_probability"][j])
+                records.append((
+                    student_id, fingerprints[i], probability, risk_level,
+                    int(columns["risk_score"][j]), self.model_version, scored_at
+                ))
+
+                previous_level = previous.get(student_id, (None, None))[1]
+                if previous_level != risk_level:
+                    risk_changes.append({
+                        "student_id": student_id,
+                        "previous_risk_level": previous_level,
+                        "risk_level": risk_level,
+                        "dropout_probability": probability
+                    })
+
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO student_scores VALUES (?, ?, ?, ?, ?, ?, ?)", records
+            )
+            self.conn.commit()
+
+        new_students = sum(1 for student_id in student_ids if student_id not in previous)
+        return {
+            "total_students": len(student_ids),
+            "unchanged": int(len(student_ids) - len(changed_rows)),
+            "rescored": int(len(changed_rows)),
+            "new_students": new_students,
+            "risk_changes": risk_changes,
+            "model_version": self.model_version,
+            "duration_seconds": round(time.perf_counter() - start_time, 3)
+        }
+
+    def close(self):
+        self.conn.close()
+
+
+def main():
+    """Run a delta scoring pass over a cohort CSV"""
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else "final_synthetic_dropout_data_rajasthan.csv"
+    db_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_DB_PATH
+    model_path = sys.argv[3] if len(sys.argv) > 3 else DEFAULT_MODEL_PATH
+
+    print("🚀 EduAnalytics Delta Rescoring")
+    print("=" * 50)
+
+    if not os.path.exists(csv_path):
+        print(f"❌ CSV file not found: {csv_path}")
+        return
+    if not os.path.exists(model_path):
+        print(f"❌ Model file not found: {model_path}")
+        return
+
+    df = pd.read_csv(csv_path).drop(columns=["IsDropout"], errors="ignore")
+    job = DeltaScoringJob(EduAnalyticsMLModel(model_path), model_fingerprint(model_path), db_path)
+    summary = job.run(df)
+    job.close()
+
+    print(f"📊 Students: {summary['total_students']}")
+    print(f"✅ Unchanged: {summary['unchanged']}")
+    print(f"🔄 Rescored: {summary['rescored']} ({summary['new_students']} new, model {summary['model_version']})")
+    print(f"⚠️  Risk level changes: {len(summary['risk_changes'])}")
+    for change in summary["risk_changes"][:10]:
+        print(f"   - {change['student_id']}: {change['previous_risk_level']} → {change['risk_level']}")
+    print(f"⏱️  {summary['duration_seconds']}s")
+
+if __name__ == "__main__":
+    main()
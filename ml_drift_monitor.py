@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+EduAnalytics Feature Drift Monitor
+Compares live prediction traffic with the training distribution using
+fixed-size per-feature sketches: numeric features are counted into bins cut at
+the training quantiles, categorical features into per-category counters.
+Memory is constant and each observed row costs O(1) per feature.
+"""
+
+import bisect
+import json
+import math
+import os
+import sys
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Rows per drift window; scores cover the last full window plus the current one
+DRIFT_WINDOW_ROWS = int(os.environ.get("ML_DRIFT_WINDOW_ROWS", "5000"))
+# Rows the window must cover before PSI is banded; fewer report "insufficient_data"
+DRIFT_MIN_ROWS = int(os.environ.get("ML_DRIFT_MIN_ROWS", "500"))
+QUANTILE_BINS = 10
+MAX_CATEGORIES = 50
+# Conventional PSI bands: < 0.1 stable, 0.1-0.25 moderate shift, > 0.25 significant shift
+PSI_WARNING = 0.1
+PSI_ALERT = 0.25
+# Floor for empty buckets so PSI stays finite
+PSI_EPSILON = 1e-4
+
+
+def drift_baseline_path_for(model_path: str) -> str:
+    """Training baseline stored next to a pickled model"""
+    stem, _ = os.path.splitext(model_path)
+    return f"{stem}_drift_baseline.json"
+
+
+def _category(value) -> str:
+    """Categorical values as the CSVs spell them (booleans as TRUE/FALSE)"""
+    if isinstance(value, (bool, np.bool_)):
+        return "TRUE" if value else "FALSE"
+    value = str(value)
+    return value.upper() if value.lower() in ("true", "false") else value
+
+
+def _is_numeric(series: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+
+def build_drift_baseline(df: pd.DataFrame, feature_columns: List[str]) -> Dict[str, Any]:
+    """
+    Summarise the training records into per-feature bucket proportions
+
+    Numeric features get (up to) QUANTILE_BINS bins cut at the training deciles
+    plus a missing-value bucket; categorical features get their most common
+    categories plus an "other" bucket.
+    """
+    features = {}
+    for column in feature_columns:
+        values = df[column]
+        if _is_numeric(values):
+            numeric = pd.to_numeric(values, errors="coerce")
+            present = numeric.dropna().to_numpy()
+            edges = np.unique(np.quantile(present, np.linspace(0, 1, QUANTILE_BINS + 1)[1:-1]))
+            counts = np.bincount(np.searchsorted(edges, present, side="right"), minlength=len(edges) + 1)
+            counts = np.append(counts, numeric.isna().sum())
+            features[column] = {
+                "type": "numeric",
+                "edges": edges.tolist(),
+                "proportions": (counts / len(values)).tolist()
+            }
+        else:
+            counts = values.map(_category).value_counts()
+            categories = counts.index[:MAX_CATEGORIES].tolist()
+            proportions = (counts.to_numpy()[:MAX_CATEGORIES] / len(values)).tolist()
+            features[column] = {
+                "type": "categorical",
+                "categories": categories,
+                "proportions": proportions + [float(counts.to_numpy()[MAX_CATEGORIES:].sum() / len(values))]
+            }
+    return {"rows": int(len(df)), "created_at": datetime.now().isoformat(), "features": features}
+
+
+def save_drift_baseline(baseline: Dict[str, Any], path: str):
+    with open(path, "w") as f:
+        json.dump(baseline, f)
+
+
+def load_drift_baseline(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def population_stability_index(expected: np.ndarray, actual_counts: np.ndarray) -> float:
+    """PSI between baseline proportions and observed bucket counts"""
+    total = actual_counts.sum()
+    if not total:
+        return 0.0
+    expected = np.maximum(expected, PSI_EPSILON)
+    actual = np.maximum(actual_counts / total, PSI_EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def _status(psi: float, enough_rows: bool = True) -> str:
+    if not enough_rows:
+        return "insufficient_data"
+    if psi >= PSI_ALERT:
+        return "alert"
+    if psi >= PSI_WARNING:
+        return "warning"
+    return "ok"
+
+
+class DriftMonitor:
+    """Per-feature bucket counters for live traffic, scored against a training baseline"""
+
+    def __init__(self, baseline: Optional[Dict[str, Any]], window_rows: int = DRIFT_WINDOW_ROWS,
+                 min_rows: int = DRIFT_MIN_ROWS):
+        """
+        Args:
+            baseline: Output of build_drift_baseline; None disables monitoring
+            window_rows: Rows per window before the counters rotate
+            min_rows: Rows needed before PSI is classified; small samples give
+                large PSI values by chance (capped at window_rows so it is reachable)
+        """
+        self.window_rows = window_rows
+        self.min_rows = min(min_rows, window_rows)
+        self._lock = threading.Lock()
+        self.replace_baseline(baseline)
+
+    @property
+    def enabled(self) -> bool:
+        return self.baseline is not None
+
+    def replace_baseline(self, baseline: Optional[Dict[str, Any]]):
+        """Switch to a new baseline (e.g. after retraining) and clear the counters"""
+        with self._lock:
+            self.baseline = baseline
+            self._specs = {}
+            for column, spec in (baseline or {}).get("features", {}).items():
+                if spec["type"] == "numeric":
+                    self._specs[column] = ("numeric", spec["edges"], np.asarray(spec["edges"]))
+                else:
+                    lookup = {category: i for i, category in enumerate(spec["categories"])}
+                    self._specs[column] = ("categorical", lookup, None)
+            self._expected = {
+                column: np.asarray(spec["proportions"])
+                for column, spec in (baseline or {}).get("features", {}).items()
+            }
+            self._current = {column: np.zeros(len(p), dtype=np.int64) for column, p in self._expected.items()}
+            self._previous = {column: np.zeros(len(p), dtype=np.int64) for column, p in self._expected.items()}
+            self._current_rows = 0
+            self._previous_rows = 0
+            self.total_rows = 0
+
+    def _bucket(self, column: str, value) -> int:
+        kind, lookup, _ = self._specs[column]
+        if kind == "numeric":
+            try:
+                number = float(value)
+            except (TypeError, ValueError):
+                number = math.nan
+            if math.isnan(number):
+                return len(lookup) + 1
+            return bisect.bisect_right(lookup, number)
+        return lookup.get(_category(value), len(lookup))
+
+    def observe_record(self, record: Dict[str, Any]):
+        """Count one raw student record (single predictions)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            for column, counts in self._current.items():
+                counts[self._bucket(column, record.get(column))] += 1
+            self._advance(1)
+
+    def observe_frame(self, df: pd.DataFrame):
+        """Count a batch of raw student records column by column"""
+        if not self.enabled or len(df) == 0:
+            return
+        with self._lock:
+            for column, (kind, lookup, edges) in self._specs.items():
+                if column not in df.columns:
+                    continue
+                if kind == "numeric":
+                    values = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=float)
+                    index = np.searchsorted(edges, values, side="right")
+                    index[np.isnan(values)] = len(edges) + 1
+                else:
+                    index = df[column].map(_category).map(lookup).fillna(len(lookup)).to_numpy(dtype=np.int64)
+                self._current[column] += np.bincount(index, minlength=len(self._current[column]))
+            self._advance(len(df))
+
+    def _advance(self, rows: int):
+        self._current_rows += rows
+        self.total_rows += rows
+        if self._current_rows >= self.window_rows:
+            self._previous, self._previous_rows = self._current, self._current_rows
+            self._current = {column: np.zeros_like(counts) for column, counts in self._previous.items()}
+            self._current_rows = 0
+
+    def report(self) -> Dict[str, Any]:
+        """
+        PSI per feature over the recent window(s), worst first
+
+        Returns:
+            Overall status, rows covered and per-feature scores. Until the window
+            covers min_rows rows every status is "insufficient_data"
+        """
+        if not self.enabled:
+            return {"enabled": False, "reason": "No training baseline stored with the model"}
+        with self._lock:
+            window_rows = self._current_rows + self._previous_rows
+            enough_rows = window_rows >= self.min_rows
+            features = []
+            for column, expected in self._expected.items():
+                observed = self._current[column] + self._previous[column]
+                psi = population_stability_index(expected, observed)
+                features.append({
+                    "feature": column,
+                    "psi": round(psi, 4),
+                    "status": _status(psi, enough_rows),
+                    # Share of values outside the baseline (missing numbers / unseen categories)
+                    "unexpected_share": round(float(observed[-1] / observed.sum()), 4) if observed.sum() else 0.0
+                })
+        features.sort(key=lambda f: f["psi"], reverse=True)
+        worst = features[0]["psi"] if features else 0.0
+        return {
+            "enabled": True,
+            "status": _status(worst, enough_rows) if window_rows else "no_data",
+            "max_psi": worst,
+            "window_rows": window_rows,
+            "min_rows": self.min_rows,
+            "total_rows": self.total_rows,
+            "baseline_rows": self.baseline["rows"],
+            "baseline_created_at": self.baseline["created_at"],
+            "features": features
+        }
+
+
+def load_drift_monitor(model_path: str, feature_columns: List[str],
+                       training_csv: str = "final_synthetic_dropout_data_rajasthan.csv") -> DriftMonitor:
+    """
+    Monitor for the model at model_path, building its baseline from the
+    training CSV when the model was saved before baselines existed
+    """
+    path = drift_baseline_path_for(model_path)
+    baseline = load_drift_baseline(path)
+    if baseline is None and os.path.exists(training_csv):
+        baseline = build_drift_baseline(pd.read_csv(training_csv), feature_columns)
+        save_drift_baseline(baseline, path)
+        print(f"✅ Drift baseline built from {training_csv}")
+    elif baseline is None:
+        print(f"⚠️  No drift baseline at {path}; drift monitoring disabled")
+    return DriftMonitor(baseline)
+
+
+def main():
+    """Score a CSV as if it were live traffic and print its drift report"""
+    from ml_model import EduAnalyticsMLModel
+
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else "final_synthetic_dropout_data_rajasthan.csv"
+
+    print("🚀 EduAnalytics Drift Monitor")
+    print("=" * 50)
+
+    if not os.path.exists(csv_path):
+        print(f"❌ CSV file not found: {csv_path}")
+        return
+
+    model = EduAnalyticsMLModel("eduanalytics_model.pkl")
+    monitor = load_drift_monitor("eduanalytics_model.pkl", model.feature_columns)
+    monitor.observe_frame(pd.read_csv(csv_path))
+    report = monitor.report()
+
+    print(f"📊 Status: {report.get('status')} (max PSI {report.get('max_psi')}, {report.get('window_rows')} rows)")
+    for feature in report.get("features", [])[:5]:
+        print(f"   {feature['feature']}: PSI {feature['psi']} ({feature['status']})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+EduAnalytics Explanation Store
+Precomputed per-student contributions (SHAP / pred_contribs) for a whole cohort,
+memory-mapped and looked up by StudentID plus feature hash
+"""
+
+import json
+import os
+import shutil
+import sys
+import threading
+from datetime import datetime
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ml_delta_scoring import feature_fingerprints
+
+STORE_FORMAT_VERSION = 1
+STORE_ARRAYS = ["student_ids", "feature_keys", "probabilities", "contributions"]
+
+EXPLANATION_STORE_DIR = os.environ.get("ML_EXPLANATION_STORE_DIR", "eduanalytics_explanations")
+# Cohort CSV to precompute automatically when a model without a store is activated
+EXPLANATION_COHORT_CSV = os.environ.get("ML_EXPLANATION_COHORT")
+BUILD_CHUNK_ROWS = 5000
+
+
+def store_dir_for(model_version: str, explanation_method: str, fingerprint: str,
+                  base_dir: str = EXPLANATION_STORE_DIR) -> str:
+    return os.path.join(base_dir, f"{model_version}-{explanation_method}-{fingerprint}")
+
+
+class ExplanationStore:
+    """Read side of a precomputed explanation store"""
+
+    def __init__(self, arrays, meta):
+        self.student_ids = arrays["student_ids"]
+        self.feature_keys = arrays["feature_keys"]
+        self.probabilities = arrays["probabilities"]
+        self.contributions = arrays["contributions"]
+        self.meta = meta
+        self.feature_names = meta["feature_names"]
+        # Later rows win when a StudentID appears twice
+        self.rows = {str(student_id): i for i, student_id in enumerate(self.student_ids)}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: Optional[str] = "r") -> "ExplanationStore":
+        """Open a store written by build_explanation_store (contributions memory-mapped)"""
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("format_version") != STORE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported explanation store format: {meta.get('format_version')}")
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in STORE_ARRAYS
+        }
+        return cls(arrays, meta)
+
+    def lookup(self, student_id: str, feature_key: str) -> Optional[Tuple[float, np.ndarray]]:
+        """
+        Stored (probability, contribution row) when the student's features are unchanged
+
+        Returns:
+            None on a miss (unknown student or different feature hash)
+        """
+        row = self.rows.get(str(student_id))
+        if row is None or self.feature_keys[row] != feature_key:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return float(self.probabilities[row]), np.asarray(self.contributions[row])
+
+    def stats(self):
+        return {
+            "rows": len(self.rows),
+            "model_version": self.meta["model_version"],
+            "created_at": self.meta["created_at"],
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+def build_explanation_store(ml_service, df: pd.DataFrame, directory: str,
+                            chunk_rows: int = BUILD_CHUNK_ROWS) -> ExplanationStore:
+    """
+    Compute contributions for a whole cohort in batches and write the store
+
+    Args:
+        ml_service: RealMLService with a loaded model and explainer
+        df: Raw student records with a StudentID column
+        directory: Target directory (replaced atomically once complete)
+        chunk_rows: Students encoded and explained per batch
+    """
+    if "StudentID" not in df.columns:
+        raise ValueError("The explanation store needs a StudentID column")
+
+    model_version = ml_service.model_version
+    student_ids, feature_keys, probabilities, contributions = [], [], [], []
+    feature_names = None
+
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        X = ml_service._encode_students(chunk.to_dict(orient="records"))
+        chunk_probabilities, matrix, names = ml_service._contribution_matrix(X)
+        if matrix is None:
+            raise RuntimeError("The active model has no explainer to precompute contributions with")
+        feature_names = names
+        student_ids.append(chunk["StudentID"].astype(str).to_numpy())
+        feature_keys.extend(feature_fingerprints(X, model_version))
+        probabilities.append(np.asarray(chunk_probabilities, dtype=np.float64))
+        contributions.append(np.asarray(matrix, dtype=np.float32))
+
+    arrays = {
+        "student_ids": np.concatenate(student_ids).astype(str),
+        "feature_keys": np.array(feature_keys, dtype=str),
+        "probabilities": np.concatenate(probabilities),
+        "contributions": np.ascontiguousarray(np.concatenate(contributions))
+    }
+    meta = {
+        "format_version": STORE_FORMAT_VERSION,
+        "model_version": model_version,
+        "explanation_method": ml_service.explanation_method,
+        "feature_names": list(feature_names),
+        "rows": int(len(arrays["student_ids"])),
+        "created_at": datetime.now().isoformat()
+    }
+
+    # Write next to the target and swap it in, so readers never see a partial store
+    tmp_dir = f"{directory}.tmp-{os.getpid()}-{threading.get_ident()}"
+    os.makedirs(tmp_dir)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), array)
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    if os.path.exists(directory):
+        shutil.rmtree(directory)
+    os.replace(tmp_dir, directory)
+
+    return ExplanationStore.load(directory)
+
+
+def main():
+    """Precompute the explanation store for the service's active model"""
+    from ml_service_real import RealMLService
+
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else (
+        EXPLANATION_COHORT_CSV or "final_synthetic_dropout_data_rajasthan.csv"
+    )
+
+    print("🚀 EduAnalytics Explanation Store Build")
+    print("=" * 50)
+
+    if not os.path.exists(csv_path):
+        print(f"❌ CSV file not found: {csv_path}")
+        return
+
+    service = RealMLService()
+    if service.model is None or service.model_path is None:
+        print("❌ No model loaded")
+        return
+
+    directory = store_dir_for(service.model_version, service.explanation_method, service.model_fingerprint)
+    df = pd.read_csv(csv_path).drop(columns=["IsDropout"], errors="ignore")
+    store = build_explanation_store(service, df, directory)
+    print(f"✅ Stored explanations for {len(store.rows)} students in {directory}")
+
+if __name__ == "__main__":
+    main()
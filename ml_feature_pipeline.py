@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+EduAnalytics Feature Pipeline
+Consumes raw attendance and marks events, keeps running per-student term
+aggregates (O(1) per event) and writes the derived term features into the
+feature store's encoded vectors, so students can be rescored by ID
+"""
+
+import csv
+import io
+import json
+import os
+import sys
+import threading
+from typing import Any, Dict, Iterable, Iterator, List
+
+import numpy as np
+
+from ml_feature_store import FeatureStore, DEFAULT_STORE_PATH
+
+# Mark percentage below which an assessment counts as failed
+PASS_PERCENTAGE = float(os.environ.get("ML_PASS_PERCENTAGE", "40"))
+
+AGGREGATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS student_term_aggregates (
+    student_id TEXT NOT NULL,
+    term TEXT NOT NULL,
+    sessions INTEGER NOT NULL,
+    present INTEGER NOT NULL,
+    marks_count INTEGER NOT NULL,
+    marks_sum REAL NOT NULL,
+    failures INTEGER NOT NULL,
+    PRIMARY KEY (student_id, term)
+);
+"""
+
+# Running totals per (student, term); positions in the aggregate lists
+SESSIONS, PRESENT, MARKS_COUNT, MARKS_SUM, FAILURES = range(5)
+
+DERIVED_FEATURES = [
+    "AvgAttendance_LatestTerm", "AvgMarks_LatestTerm", "FailureRate_LatestTerm", "MarksTrend"
+]
+
+
+def _parse_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().upper() in ("TRUE", "1", "PRESENT", "P", "YES")
+    return bool(value)
+
+
+def _number(event: Dict[str, Any], field: str, default: float) -> float:
+    """Optional numeric field (CSV rows leave absent values empty)"""
+    value = event.get(field)
+    return default if value is None or value == "" else float(value)
+
+
+def iter_ndjson_events(lines: Iterable) -> Iterator[Dict[str, Any]]:
+    """Events from NDJSON lines (str or bytes); blank lines are skipped"""
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_csv_events(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Events from CSV lines with a header row"""
+    yield from csv.DictReader(lines)
+
+
+def read_events(body: bytes, content_type: str) -> Iterator[Dict[str, Any]]:
+    """Parse an NDJSON (default) or text/csv request body into events"""
+    text = body.decode("utf-8")
+    if content_type == "text/csv":
+        return iter_csv_events(io.StringIO(text))
+    return iter_ndjson_events(text.splitlines())
+
+
+class FeaturePipeline:
+    """
+    Term aggregates per student, updated event by event
+
+    Event formats (NDJSON objects or CSV rows):
+        {"StudentID": "STU1", "event": "attendance", "term": "2024-T2", "present": true}
+        {"StudentID": "STU1", "event": "attendance", "term": "2024-T2", "sessions": 5, "present": 4}
+        {"StudentID": "STU1", "event": "marks", "term": "2024-T2", "score": 34, "max_score": 50}
+
+    Term labels must sort chronologically; only each student's latest two terms
+    are kept, since the derived features never look further back.
+    """
+
+    def __init__(self, store: FeatureStore):
+        self.store = store
+        self.conn = store.conn
+        self.conn.executescript(AGGREGATE_SCHEMA)
+        self._lock = threading.Lock()
+        self._aggregates: Dict[str, Dict[str, List[float]]] = {}
+        self._dirty = set()
+        self.events_applied = 0
+        self.events_rejected = 0
+        for student_id, term, *totals in self.conn.execute("SELECT * FROM student_term_aggregates"):
+            self._aggregates.setdefault(student_id, {})[term] = list(totals)
+
+    def apply_event(self, event: Dict[str, Any]):
+        """Fold one event into its student's term totals"""
+        student_id = str(event["StudentID"])
+        term = str(event["term"])
+        kind = event.get("event")
+
+        # Validate before touching the totals so a rejected event changes nothing
+        delta = [0, 0, 0, 0.0, 0]
+        if kind == "attendance":
+            sessions = int(_number(event, "sessions", 1))
+            present = int(event["present"]) if sessions > 1 else int(_parse_bool(event["present"]))
+            if sessions < 1 or not 0 <= present <= sessions:
+                raise ValueError(f"present must be between 0 and sessions ({sessions})")
+            delta[SESSIONS], delta[PRESENT] = sessions, present
+        elif kind == "marks":
+            max_score = _number(event, "max_score", 100)
+            if max_score <= 0:
+                raise ValueError("max_score must be positive")
+            percentage = 100 * float(event["score"]) / max_score
+            delta[MARKS_COUNT], delta[MARKS_SUM] = 1, percentage
+            delta[FAILURES] = int(percentage < PASS_PERCENTAGE)
+        else:
+            raise ValueError(f"Unknown event type: {kind}")
+
+        terms = self._aggregates.setdefault(student_id, {})
+        if term not in terms:
+            if len(terms) >= 2 and term < min(terms):
+                # Older than both tracked terms; it cannot affect the derived features
+                return
+            terms[term] = [0, 0, 0, 0.0, 0]
+            if len(terms) > 2:
+                del terms[min(terms)]
+        totals = terms[term]
+        for i, value in enumerate(delta):
+            totals[i] += value
+        self._dirty.add(student_id)
+
+    def apply_events(self, events: Iterable[Dict[str, Any]], max_errors: int = 10) -> Dict[str, Any]:
+        """
+        Apply a stream of events; malformed events are counted and skipped
+
+        Returns:
+            Applied/rejected counts and the first few rejection reasons
+        """
+        applied = rejected = 0
+        errors = []
+        with self._lock:
+            for line, event in enumerate(events, start=1):
+                try:
+                    self.apply_event(event)
+                    applied += 1
+                except (KeyError, TypeError, ValueError) as e:
+                    rejected += 1
+                    if len(errors) < max_errors:
+                        errors.append(f"event {line}: {type(e).__name__}: {e}")
+            self.events_applied += applied
+            self.events_rejected += rejected
+        return {"applied": applied, "rejected": rejected, "errors": errors}
+
+    def derived_features(self, student_ids: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Latest-term features per student; NaN where the events do not determine one
+        (the stored value is then kept)
+        """
+        columns = {name: np.full(len(student_ids), np.nan) for name in DERIVED_FEATURES}
+        for i, student_id in enumerate(student_ids):
+            terms = self._aggregates.get(student_id, {})
+            if not terms:
+                continue
+            ordered = sorted(terms)
+            latest = terms[ordered[-1]]
+            if latest[SESSIONS]:
+                columns["AvgAttendance_LatestTerm"][i] = 100 * latest[PRESENT] / latest[SESSIONS]
+            if latest[MARKS_COUNT]:
+                average = latest[MARKS_SUM] / latest[MARKS_COUNT]
+                columns["AvgMarks_LatestTerm"][i] = average
+                columns["FailureRate_LatestTerm"][i] = latest[FAILURES] / latest[MARKS_COUNT]
+                previous = terms[ordered[0]] if len(ordered) > 1 else None
+                if previous and previous[MARKS_COUNT]:
+                    columns["MarksTrend"][i] = average - previous[MARKS_SUM] / previous[MARKS_COUNT]
+        return columns
+
+    def flush(self) -> Dict[str, Any]:
+        """
+        Write derived features for every student touched since the last flush
+
+        Students without a stored base vector stay pending until one is upserted.
+
+        Returns:
+            Updated student IDs and the IDs still waiting for base features
+        """
+        with self._lock:
+            dirty = sorted(self._dirty)
+            if not dirty:
+                return {"updated_student_ids": [], "pending_student_ids": []}
+
+            found, X, missing = self.store.get_matrix(dirty)
+            if found:
+                X = X.copy()
+                for name, values in self.derived_features(found).items():
+                    X[name] = np.where(np.isnan(values), X[name], values)
+                self.store.upsert_matrix(found, X)
+
+            self.conn.executemany(
+                "DELETE FROM student_term_aggregates WHERE student_id = ?", [(s,) for s in dirty]
+            )
+            self.conn.executemany(
+                "INSERT INTO student_term_aggregates VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (student_id, term, *totals)
+                    for student_id in dirty
+                    for term, totals in self._aggregates[student_id].items()
+                ]
+            )
+            self.conn.commit()
+            self._dirty = set(missing)
+            return {"updated_student_ids": found, "pending_student_ids": missing}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "students": len(self._aggregates),
+            "pending_students": len(self._dirty),
+            "events_applied": self.events_applied,
+            "events_rejected": self.events_rejected
+        }
+
+
+def main():
+    """Apply an events file (NDJSON or CSV) to the feature store"""
+    from ml_model import EduAnalyticsMLModel
+
+    if len(sys.argv) < 2:
+        print("Usage: python ml_feature_pipeline.py <events.ndjson|events.csv> [feature_store.db]")
+        return
+    events_path = sys.argv[1]
+    db_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_STORE_PATH
+
+    print("🚀 EduAnalytics Feature Pipeline")
+    print("=" * 50)
+
+    if not os.path.exists(events_path):
+        print(f"❌ Events file not found: {events_path}")
+        return
+
+    pipeline = FeaturePipeline(FeatureStore(EduAnalyticsMLModel("eduanalytics_model.pkl"), db_path))
+    with open(events_path, newline="") as f:
+        events = iter_csv_events(f) if events_path.endswith(".csv") else iter_ndjson_events(f)
+        report = pipeline.apply_events(events)
+    result = pipeline.flush()
+
+    print(f"✅ Applied {report['applied']} events ({report['rejected']} rejected)")
+    for error in report["errors"]:
+        print(f"   ⚠️  {error}")
+    print(f"📦 Updated {len(result['updated_student_ids'])} students in {db_path}")
+    if result["pending_student_ids"]:
+        print(f"⚠️  {len(result['pending_student_ids'])} students have no stored features yet")
+    pipeline.store.close()
+
+if __name__ == "__main__":
+    main()
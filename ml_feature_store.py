@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+EduAnalytics Feature Store
+Keeps already-encoded float32 feature vectors per StudentID in SQLite so the
+API can score students by ID without re-shipping and re-encoding raw features
+"""
+
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_STORE_PATH = os.environ.get("ML_FEATURE_STORE", "eduanalytics_features.db")
+
+# SQLite's default limit on bound parameters per statement
+SQLITE_MAX_VARIABLES = 900
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS student_features (
+    student_id TEXT PRIMARY KEY,
+    vector BLOB NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class FeatureStore:
+    """Encoded feature vectors keyed by StudentID"""
+
+    def __init__(self, ml_model, db_path: str = DEFAULT_STORE_PATH):
+        """
+        Args:
+            ml_model: EduAnalyticsMLModel whose build_feature_matrix encodes the vectors
+            db_path: SQLite database file
+        """
+        self.ml_model = ml_model
+        self.feature_columns = list(ml_model.feature_columns)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+
+        stored = self.conn.execute(
+            "SELECT value FROM store_meta WHERE key = 'feature_columns'"
+        ).fetchone()
+        if stored is None:
+            self.conn.execute(
+                "INSERT INTO store_meta VALUES ('feature_columns', ?)",
+                (json.dumps(self.feature_columns),)
+            )
+            self.conn.commit()
+        elif json.loads(stored[0]) != self.feature_columns:
+            raise ValueError(
+                f"Feature store {db_path} was built for different feature columns; "
+                "rebuild it for the current model"
+            )
+
+    def upsert_frame(self, df: pd.DataFrame) -> int:
+        """
+        Encode raw student records and store their vectors
+
+        Args:
+            df: Raw student records with StudentID and every model feature column
+
+        Returns:
+            Number of students written
+        """
+        missing = [c for c in ["StudentID"] + self.feature_columns if c not in df.columns]
+        if missing:
+            raise ValueError(f"Missing student columns: {', '.join(missing)}")
+        if len(df) == 0:
+            return 0
+
+        return self.upsert_matrix(df["StudentID"], self.ml_model.build_feature_matrix(df))
+
+    def upsert_matrix(self, student_ids, X: pd.DataFrame) -> int:
+        """
+        Store already-encoded vectors
+
+        Args:
+            student_ids: One StudentID per row of X
+            X: Encoded feature matrix in feature_columns order
+
+        Returns:
+            Number of students written
+        """
+        vectors = np.ascontiguousarray(X[self.feature_columns].to_numpy(dtype=np.float32))
+        updated_at = datetime.now().isoformat()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO student_features VALUES (?, ?, ?)",
+            [
+                (str(student_id), vector.tobytes(), updated_at)
+                for student_id, vector in zip(student_ids, vectors)
+            ]
+        )
+        self.conn.commit()
+        return len(vectors)
+
+    def load_csv(self, csv_path: str, chunksize: int = 5000) -> int:
+        """Bulk-load a cohort CSV in chunks"""
+        total = 0
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            total += self.upsert_frame(chunk.drop(columns=["IsDropout"], errors="ignore"))
+        return total
+
+    def get_matrix(self, student_ids: List[str]) -> Tuple[List[str], pd.DataFrame, List[str]]:
+        """
+        Assemble the feature matrix for a list of students
+
+        Args:
+            student_ids: Students to fetch (duplicates are returned once)
+
+        Returns:
+            Tuple of (found student IDs in request order, float32 feature matrix,
+            IDs with no stored vector)
+        """
+        requested = list(dict.fromkeys(str(s) for s in student_ids))
+        blobs = {}
+        for start in range(0, len(requested), SQLITE_MAX_VARIABLES):
+            chunk = requested[start:start + SQLITE_MAX_VARIABLES]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT student_id, vector FROM student_features WHERE student_id IN ({placeholders})",
+                chunk
+            )
+            blobs.update(rows)
+
+        found = [s for s in requested if s in blobs]
+        missing = [s for s in requested if s not in blobs]
+        matrix = np.frombuffer(b"".join(blobs[s] for s in found), dtype=np.float32)
+        X = pd.DataFrame(matrix.reshape(len(found), len(self.feature_columns)),
+                         columns=self.feature_columns)
+        return found, X, missing
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM student_features").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+def main():
+    """Bulk-load a cohort CSV into the feature store"""
+    from ml_model import EduAnalyticsMLModel
+
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else "final_synthetic_dropout_data_rajasthan.csv"
+    db_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_STORE_PATH
+
+    print("🚀 EduAnalytics Feature Store Load")
+    print("=" * 50)
+
+    if not os.path.exists(csv_path):
+        print(f"❌ CSV file not found: {csv_path}")
+        return
+
+    store = FeatureStore(EduAnalyticsMLModel("eduanalytics_model.pkl"), db_path)
+    loaded = store.load_csv(csv_path)
+    print(f"✅ Loaded {loaded} students into {db_path}")
+    print(f"📦 Students in store: {store.count()}")
+    store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,565 @@
+#!/usr/bin/env python3
+"""
+Flat array representation of the EduAnalytics RandomForest
+Stores every tree's nodes in a few contiguous .npy files that worker processes
+can open with mmap_mode='r', so N workers on one host share one physical copy.
+An optional compact variant (float32 thresholds/values, int16 feature indices)
+cuts the node arrays to ~18 bytes per node.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+ARRAY_FORMAT_VERSION = 1
+
+# Rows scored per traversal step; bounds the (rows x trees) node-index matrix
+PREDICT_CHUNK_ROWS = 4096
+
+NODE_ARRAYS = ["children_left", "children_right", "feature", "threshold", "value", "roots"]
+
+# A compact forest must match the original within this probability tolerance
+COMPACT_PROBA_TOLERANCE = 1e-6
+
+
+def arrays_dir_for(model_path: str) -> str:
+    """Directory holding the flat arrays exported next to a pickled model"""
+    stem, _ = os.path.splitext(model_path)
+    return f"{stem}_arrays"
+
+
+def compact_arrays_dir_for(model_path: str) -> str:
+    """Directory holding the verified compact arrays exported next to a pickled model"""
+    return f"{arrays_dir_for(model_path)}_compact"
+
+
+def _replace_file(path: str, mode: str, write):
+    """
+    Write a file through a uniquely named temporary next to it, then rename it into place
+
+    Concurrent writers (e.g. several workers exporting the same model) each get
+    their own temporary, so none can truncate a file another is still writing.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        os.fchmod(fd, 0o644)
+        with os.fdopen(fd, mode) as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class FlatForest:
+    """
+    RandomForest inference over concatenated node arrays
+
+    Implements the parts of the sklearn classifier API the services use
+    (predict_proba, predict, classes_, feature_importances_) so it can stand in
+    for the unpickled estimator.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]):
+        self.children_left = arrays["children_left"]
+        self.children_right = arrays["children_right"]
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        # Dropout-class probability at every node (leaves used for prediction)
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.classes_ = np.asarray(meta["classes"])
+        self.feature_importances_ = np.asarray(meta["feature_importances"], dtype=np.float64)
+        self.n_features_in_ = meta["n_features"]
+        self.n_estimators = len(self.roots)
+        self.max_depth = meta["max_depth"]
+        self.meta = meta
+
+    @classmethod
+    def from_sklearn(cls, forest) -> "FlatForest":
+        """Flatten a fitted binary RandomForestClassifier"""
+        lefts, rights, features, thresholds, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            left = tree.children_left.astype(np.int32)
+            right = tree.children_right.astype(np.int32)
+            is_leaf = left == -1
+
+            lefts.append(np.where(is_leaf, -1, left + offset))
+            rights.append(np.where(is_leaf, -1, right + offset))
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(tree.threshold.astype(np.float64))
+
+            node_values = tree.value[:, 0, :]
+            totals = node_values.sum(axis=1)
+            values.append(node_values[:, -1] / np.where(totals > 0, totals, 1.0))
+
+            roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        arrays = {
+            "children_left": np.concatenate(lefts),
+            "children_right": np.concatenate(rights),
+            "feature": np.concatenate(features),
+            "threshold": np.concatenate(thresholds),
+            "value": np.concatenate(values),
+            "roots": np.asarray(roots, dtype=np.int32),
+        }
+        meta = {
+            "format_version": ARRAY_FORMAT_VERSION,
+            "classes": forest.classes_.tolist(),
+            "feature_importances": forest.feature_importances_.tolist(),
+            "n_features": int(forest.n_features_in_),
+            "max_depth": int(max_depth),
+        }
+        return cls(arrays, meta)
+
+    def save(self, directory: str):
+        """
+        Write each node array as its own .npy file so it can be memory-mapped
+
+        Files are written next to their target and renamed into place, so workers
+        that still map the previous model keep reading the old (unlinked) file
+        instead of seeing it rewritten underneath them.
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name in NODE_ARRAYS:
+            array = np.ascontiguousarray(getattr(self, name))
+            _replace_file(os.path.join(directory, f"{name}.npy"), "wb", lambda f: np.save(f, array))
+        # Written last: meta.json only describes the new arrays once they are all in place
+        _replace_file(os.path.join(directory, "meta.json"), "w", lambda f: json.dump(self.meta, f, indent=2))
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: Optional[str] = "r") -> "FlatForest":
+        """
+        Open exported node arrays
+
+        Args:
+            directory: Directory written by save()
+            mmap_mode: 'r' maps the files read-only so every process shares the
+                same page-cache pages; None reads private copies into memory
+        """
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("format_version") != ARRAY_FORMAT_VERSION:
+            raise ValueError(f"Unsupported forest array format: {meta.get('format_version')}")
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in NODE_ARRAYS
+        }
+        return cls(arrays, meta)
+
+    def _leaf_indices(self, X: np.ndarray) -> np.ndarray:
+        """Leaf node reached by every row in every tree, shape (rows, trees)"""
+        n_rows = X.shape[0]
+        rows = np.arange(n_rows)[:, None]
+        nodes = np.broadcast_to(self.roots, (n_rows, self.n_estimators)).copy()
+
+        for _ in range(self.max_depth + 1):
+            left = self.children_left[nodes]
+            is_leaf = left == -1
+            if is_leaf.all():
+                break
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(is_leaf, nodes, np.where(go_left, left, self.children_right[nodes]))
+        return nodes
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Class probabilities with the same semantics as RandomForestClassifier"""
+        # sklearn trees compare float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        positive = np.empty(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], PREDICT_CHUNK_ROWS):
+            chunk = X[start:start + PREDICT_CHUNK_ROWS]
+            positive[start:start + len(chunk)] = self.value[self._leaf_indices(chunk)].mean(axis=1)
+        return np.column_stack([1.0 - positive, positive])
+
+    def path_contributions(self, X) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Per-feature contributions to the dropout probability (Saabas method)
+
+        Walks every row down every tree at once; each split credits its feature
+        with the change in node probability between parent and child, averaged
+        over trees. Cheap approximation of TreeSHAP: additive (bias plus the row
+        sum equals predict_proba[:, 1]) but not consistent across feature order.
+
+        Returns:
+            Tuple of (bias per row, contribution matrix of shape (rows, n_features))
+        """
+        X = np.asarray(X, dtype=np.float32)
+        n_features = self.n_features_in_
+        contributions = np.empty((X.shape[0], n_features), dtype=np.float64)
+
+        for start in range(0, X.shape[0], PREDICT_CHUNK_ROWS):
+            chunk = X[start:start + PREDICT_CHUNK_ROWS]
+            n_rows = len(chunk)
+            rows = np.arange(n_rows)[:, None]
+            # Flat (row, feature) slot per node visit, summed with bincount
+            row_offsets = rows * n_features
+            totals = np.zeros(n_rows * n_features, dtype=np.float64)
+            nodes = np.broadcast_to(self.roots, (n_rows, self.n_estimators)).copy()
+
+            for _ in range(self.max_depth + 1):
+                left = self.children_left[nodes]
+                is_leaf = left == -1
+                if is_leaf.all():
+                    break
+                features = self.feature[nodes]
+                go_left = chunk[rows, features] <= self.threshold[nodes]
+                next_nodes = np.where(is_leaf, nodes, np.where(go_left, left, self.children_right[nodes]))
+                delta = self.value[next_nodes].astype(np.float64) - self.value[nodes]
+                totals += np.bincount(
+                    (row_offsets + features).ravel(), weights=delta.ravel(), minlength=totals.size
+                )
+                nodes = next_nodes
+
+            contributions[start:start + n_rows] = totals.reshape(n_rows, n_features) / self.n_estimators
+
+        bias = np.full(X.shape[0], float(np.mean(self.value[self.roots], dtype=np.float64)))
+        return bias, contributions
+
+    def predict(self, X) -> np.ndarray:
+        """Predicted class labels"""
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def nbytes(self) -> int:
+        """Total size of the node arrays"""
+        return int(sum(getattr(self, name).nbytes for name in NODE_ARRAYS))
+
+    def compact(self) -> "FlatForest":
+        """
+        Build a smaller inference representation of this forest
+
+        Thresholds and node probabilities become float32 and feature indices
+        int16. Each float32 threshold is rounded down to the largest float32
+        not above the float64 one; for a float32 input v, ``v <= t`` holds
+        exactly when ``v <= round_down(t)``, so every row still reaches the same
+        leaf. Only node probabilities lose precision (~1e-7).
+        """
+        threshold = self.threshold.astype(np.float32)
+        rounded_up = threshold.astype(np.float64) > self.threshold
+        threshold[rounded_up] = np.nextafter(threshold[rounded_up], np.float32(-np.inf))
+
+        arrays = {
+            "children_left": np.asarray(self.children_left, dtype=np.int32),
+            "children_right": np.asarray(self.children_right, dtype=np.int32),
+            "feature": np.asarray(self.feature, dtype=np.int16),
+            "threshold": threshold,
+            "value": np.asarray(self.value, dtype=np.float32),
+            "roots": np.asarray(self.roots, dtype=np.int32),
+        }
+        meta = dict(self.meta, compact=True)
+        return FlatForest(arrays, meta)
+
+    def probe_rows(self, n_rows: int = 2000, seed: int = 42) -> np.ndarray:
+        """
+        Synthetic rows whose values sit on and next to this forest's split points
+
+        Exercises exactly the comparisons a reduced-precision threshold could
+        flip, so equivalence can be checked without any training data.
+        """
+        rng = np.random.default_rng(seed)
+        internal = self.children_left != -1
+        features = np.asarray(self.feature)[internal]
+        thresholds = np.asarray(self.threshold, dtype=np.float64)[internal]
+
+        X = np.zeros((n_rows, self.n_features_in_), dtype=np.float32)
+        for f in range(self.n_features_in_):
+            splits = np.unique(thresholds[features == f]).astype(np.float32)
+            if len(splits) == 0:
+                continue
+            candidates = np.concatenate([
+                splits,
+                np.nextafter(splits, np.float32(np.inf)),
+                np.nextafter(splits, np.float32(-np.inf)),
+            ])
+            X[:, f] = rng.choice(candidates, size=n_rows)
+        return X
+
+    def verify_against(self, reference, X=None) -> Dict[str, Any]:
+        """
+        Check that this forest makes the same predictions as a reference model
+
+        Args:
+            reference: Original sklearn forest or FlatForest
+            X: Rows to compare on (defaults to probe_rows() of the reference)
+
+        Returns:
+            Report with the largest probability difference and label agreement
+        """
+        if X is None:
+            flat_reference = reference if isinstance(reference, FlatForest) else FlatForest.from_sklearn(reference)
+            X = flat_reference.probe_rows()
+        X = np.asarray(X, dtype=np.float32)
+
+        if isinstance(reference, FlatForest):
+            expected = reference.predict_proba(X)
+        else:
+            import pandas as pd
+            names = getattr(reference, "feature_names_in_", None)
+            expected = reference.predict_proba(pd.DataFrame(X, columns=names) if names is not None else X)
+        actual = self.predict_proba(X)
+
+        max_abs_diff = float(np.abs(actual - expected).max()) if len(X) else 0.0
+        label_agreement = float(np.mean(np.argmax(actual, axis=1) == np.argmax(expected, axis=1))) if len(X) else 1.0
+        return {
+            "rows_checked": int(len(X)),
+            "max_abs_proba_diff": max_abs_diff,
+            "label_agreement": label_agreement,
+            "passed": max_abs_diff <= COMPACT_PROBA_TOLERANCE and label_agreement == 1.0
+        }
+
+
+def process_memory_usage() -> Dict[str, Any]:
+    """
+    Memory of the current process from /proc (Linux)
+
+    rss_file_mb grows with memory-mapped model pages, which are shared between
+    workers; pss_mb splits shared pages between the processes mapping them, so
+    summing pss_mb across workers gives the real host footprint.
+    """
+    usage = {"pid": os.getpid()}
+    fields = {
+        "VmRSS": "rss_mb", "RssAnon": "rss_anon_mb",
+        "RssFile": "rss_file_mb", "RssShmem": "rss_shmem_mb"
+    }
+    try:
+        with open(f"/proc/{os.getpid()}/status") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in fields:
+                    usage[fields[key]] = round(int(rest.split()[0]) / 1024, 2)
+        with open(f"/proc/{os.getpid()}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    usage["pss_mb"] = round(int(line.split()[1]) / 1024, 2)
+    except OSError:
+        usage["available"] = False
+    return usage
+
+
+def _worker_memory(model_path: str, mmap_mode: Optional[str], rows: np.ndarray, queue):
+    """Load the model the way a service worker would, score once and report memory"""
+    import pandas as pd
+    from ml_model import EduAnalyticsMLModel
+    model = EduAnalyticsMLModel(model_path, mmap_mode=mmap_mode)
+    model.model.predict_proba(pd.DataFrame(rows, columns=model.feature_columns))
+    time.sleep(1.0)  # keep every worker alive while the others measure
+    queue.put(process_memory_usage())
+
+
+def _sklearn_tree_nbytes(forest) -> int:
+    """Bytes held by an sklearn forest's node and value arrays"""
+    total = 0
+    for estimator in forest.estimators_:
+        state = estimator.tree_.__getstate__()
+        total += state["nodes"].nbytes + state["values"].nbytes
+    return total
+
+
+def _time_call(fn, repeats: int = 5) -> float:
+    """Best wall time of a few repeated calls, in milliseconds"""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def benchmark_compact(model_path: str, csv_path: str = "final_synthetic_dropout_data_rajasthan.csv"):
+    """Compare memory, batch scoring speed and accuracy of sklearn, flat and compact forests"""
+    import pandas as pd
+    from ml_model import EduAnalyticsMLModel
+
+    print("🚀 EduAnalytics compact forest benchmark")
+    print("=" * 50)
+
+    base = EduAnalyticsMLModel(model_path, mmap_mode=None, compact=False)
+    forest = base.model
+    if forest is None or isinstance(forest, FlatForest):
+        print("❌ Need the pickled RandomForest to compare against")
+        return
+
+    flat = FlatForest.from_sklearn(forest)
+    compact = flat.compact()
+
+    print("\n💾 Node memory")
+    print(f"   sklearn trees: {_sklearn_tree_nbytes(forest) / 1024 / 1024:.2f} MB")
+    print(f"   flat float64:  {flat.nbytes() / 1024 / 1024:.2f} MB")
+    print(f"   compact:       {compact.nbytes() / 1024 / 1024:.2f} MB")
+
+    report = compact.verify_against(forest)
+    print(f"\n🔍 Probe equivalence: {report}")
+
+    if not os.path.exists(csv_path):
+        print(f"⚠️  {csv_path} not found, skipping accuracy and speed on real rows")
+        return
+
+    df = pd.read_csv(csv_path)
+    X64 = base.preprocess_data(df)[base.feature_columns].astype(np.float64)
+    X32 = X64.to_numpy(dtype=np.float32)
+    y = base.preprocess_data(df)["IsDropout"].to_numpy()
+
+    report = compact.verify_against(forest, X32)
+    print(f"🔍 Dataset equivalence ({len(df)} rows): {report}")
+
+    print("\n⏱️  Batch scoring (best of 5)")
+    for label, fn in [
+        ("sklearn float64 frame", lambda: forest.predict_proba(X64)),
+        ("flat float64", lambda: flat.predict_proba(X32)),
+        ("compact", lambda: compact.predict_proba(X32)),
+    ]:
+        print(f"   {label}: {_time_call(fn):.1f} ms")
+
+    for label, model in [("sklearn", forest), ("compact", compact)]:
+        predictions = model.predict(X64 if model is forest else X32)
+        print(f"📊 {label} accuracy: {np.mean(predictions == y):.4f}")
+
+
+def _rank_agreement(reference: np.ndarray, candidate: np.ndarray, top_n: int = 3) -> Dict[str, float]:
+    """How closely two contribution matrices rank features by absolute impact, per row"""
+    reference = np.abs(reference)
+    candidate = np.abs(candidate)
+    reference_ranks = np.argsort(np.argsort(-reference, axis=1), axis=1).astype(np.float64)
+    candidate_ranks = np.argsort(np.argsort(-candidate, axis=1), axis=1).astype(np.float64)
+
+    # Spearman correlation per row = Pearson correlation of the ranks
+    a = reference_ranks - reference_ranks.mean(axis=1, keepdims=True)
+    b = candidate_ranks - candidate_ranks.mean(axis=1, keepdims=True)
+    spearman = (a * b).sum(axis=1) / np.sqrt((a * a).sum(axis=1) * (b * b).sum(axis=1))
+
+    reference_top = np.argsort(-reference, axis=1)[:, :top_n]
+    candidate_top = np.argsort(-candidate, axis=1)[:, :top_n]
+    overlap = np.mean([
+        len(set(r) & set(c)) / top_n for r, c in zip(reference_top, candidate_top)
+    ])
+    return {
+        "top1_agreement": float(np.mean(reference_top[:, 0] == candidate_top[:, 0])),
+        f"top{top_n}_overlap": float(overlap),
+        "mean_spearman": float(np.mean(spearman))
+    }
+
+
+def benchmark_explanations(model_path: str, csv_path: str = "final_synthetic_dropout_data_rajasthan.csv",
+                           rows: int = 1000):
+    """Compare cost and feature-ranking agreement of path contributions against TreeSHAP"""
+    import pandas as pd
+    import shap
+    from ml_model import EduAnalyticsMLModel
+
+    print("🚀 EduAnalytics explanation benchmark")
+    print("=" * 50)
+
+    base = EduAnalyticsMLModel(model_path, mmap_mode=None, compact=False)
+    forest = base.model
+    if forest is None or isinstance(forest, FlatForest):
+        print("❌ Need the pickled RandomForest to compare against")
+        return
+    if not os.path.exists(csv_path):
+        print(f"❌ CSV file not found: {csv_path}")
+        return
+
+    X = base.build_feature_matrix(pd.read_csv(csv_path).head(rows))
+    flat = FlatForest.from_sklearn(forest)
+    explainer = shap.TreeExplainer(forest)
+
+    def tree_shap():
+        values = explainer.shap_values(X)
+        if isinstance(values, list):
+            return np.asarray(values[-1])
+        values = np.asarray(values)
+        return values[:, :, -1] if values.ndim == 3 else values
+
+    start = time.perf_counter()
+    shap_matrix = tree_shap()
+    shap_ms = (time.perf_counter() - start) * 1000
+    path_ms = _time_call(lambda: flat.path_contributions(X), repeats=3)
+    bias, path_matrix = flat.path_contributions(X)
+
+    additivity = np.max(np.abs(bias + path_matrix.sum(axis=1) - forest.predict_proba(X)[:, 1]))
+
+    print(f"\n⏱️  {len(X)} rows")
+    print(f"   shap.TreeExplainer: {shap_ms:.1f} ms")
+    print(f"   path contributions: {path_ms:.1f} ms ({shap_ms / path_ms:.0f}x faster)")
+    print(f"\n➕ Additivity error (bias + contributions vs predict_proba): {additivity:.2e}")
+    print(f"📊 Rank agreement with TreeSHAP: {_rank_agreement(shap_matrix, path_matrix)}")
+
+
+def benchmark_shared_memory(model_path: str, workers: int = 4):
+    """Compare per-worker memory for pickled vs memory-mapped model loading"""
+    import multiprocessing
+    from ml_model import EduAnalyticsMLModel
+
+    print("🚀 EduAnalytics shared model memory check")
+    print("=" * 50)
+
+    base = EduAnalyticsMLModel(model_path)
+    if base.model is None:
+        print("❌ No model available")
+        return
+    if not os.path.isdir(arrays_dir_for(model_path)):
+        base.save_model(model_path)
+
+    flat = FlatForest.load(arrays_dir_for(model_path))
+    rows = np.zeros((8, flat.n_features_in_), dtype=np.float32)
+    print(f"🌲 {flat.n_estimators} trees, {len(flat.value)} nodes, {flat.nbytes() / 1024 / 1024:.2f} MB of node arrays")
+
+    context = multiprocessing.get_context("spawn")
+    for label, mmap_mode in [("pickle", None), ("mmap", "r")]:
+        queue = context.Queue()
+        processes = [
+            context.Process(target=_worker_memory, args=(model_path, mmap_mode, rows, queue))
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        results = [queue.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+        total_pss = sum(r.get("pss_mb", 0) for r in results)
+        print(f"\n📊 {label}: {workers} workers")
+        for r in results:
+            print(f"   pid {r['pid']}: rss={r.get('rss_mb')} MB anon={r.get('rss_anon_mb')} MB "
+                  f"file={r.get('rss_file_mb')} MB pss={r.get('pss_mb')} MB")
+        print(f"   total PSS: {total_pss:.2f} MB")
+
+
+def main():
+    """
+    Usage:
+        python ml_forest_arrays.py memory [model_path] [workers]
+        python ml_forest_arrays.py compact [model_path] [csv_path]
+        python ml_forest_arrays.py explain [model_path] [csv_path]
+    """
+    command = sys.argv[1] if len(sys.argv) > 1 else "memory"
+    model_path = sys.argv[2] if len(sys.argv) > 2 else "eduanalytics_model.pkl"
+
+    if command == "memory":
+        benchmark_shared_memory(model_path, int(sys.argv[3]) if len(sys.argv) > 3 else 4)
+    elif command == "compact":
+        if len(sys.argv) > 3:
+            benchmark_compact(model_path, sys.argv[3])
+        else:
+            benchmark_compact(model_path)
+    elif command == "explain":
+        if len(sys.argv) > 3:
+            benchmark_explanations(model_path, sys.argv[3])
+        else:
+            benchmark_explanations(model_path)
+    else:
+        print(main.__doc__)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Background bulk-scoring jobs for EduAnalytics
+Runs large scoring requests in chunks on a worker pool so callers can submit,
+poll progress and partial results, cancel, and download the finished output
+"""
+
+import io
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from ml_logging import get_logger
+from ml_wire_formats import RESULT_COLUMNS, iter_ndjson_predictions
+
+logger = get_logger("jobs")
+
+JOB_WORKERS = int(os.environ.get("ML_JOB_WORKERS", "2"))
+JOB_CHUNK_ROWS = int(os.environ.get("ML_JOB_CHUNK_ROWS", "1000"))
+# Finished jobs kept for polling/download before the oldest are dropped
+MAX_RETAINED_JOBS = int(os.environ.get("ML_MAX_RETAINED_JOBS", "100"))
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+
+class ScoringJob:
+    """State of one bulk-scoring job; result columns accumulate chunk by chunk"""
+
+    def __init__(self, total: int, source: str):
+        self.job_id = uuid.uuid4().hex
+        self.source = source
+        self.status = QUEUED
+        self.total = total
+        self.processed = 0
+        self.error = None
+        self.missing_student_ids: List[str] = []
+        self.feature_importance: Dict[str, float] = {}
+        self.model_version = "v1.0"
+        self.created_at = datetime.now().isoformat()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_requested = threading.Event()
+        self._chunks: List[Dict[str, list]] = []
+        self._lock = threading.Lock()
+
+    def add_chunk(self, columns: Dict[str, Any]):
+        chunk = {name: np.asarray(columns[name]).tolist() for name in RESULT_COLUMNS}
+        with self._lock:
+            self._chunks.append(chunk)
+            self.processed += len(chunk["student_id"])
+
+    def result_columns(self, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Results scored so far, as columns
+
+        Args:
+            offset: First result row to return
+            limit: Maximum rows to return (all remaining when None)
+        """
+        with self._lock:
+            chunks = list(self._chunks)
+        columns = {name: [v for chunk in chunks for v in chunk[name]] for name in RESULT_COLUMNS}
+        end = None if limit is None else offset + limit
+        columns = {name: values[offset:end] for name, values in columns.items()}
+        columns["feature_importance"] = self.feature_importance
+        columns["model_version"] = self.model_version
+        return columns
+
+    def status_dict(self) -> Dict[str, Any]:
+        elapsed = None
+        if self.started_at:
+            end = self.finished_at or datetime.now().isoformat()
+            elapsed = round(
+                (datetime.fromisoformat(end) - datetime.fromisoformat(self.started_at)).total_seconds(), 3
+            )
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "cancel_requested": self.cancel_requested.is_set(),
+            "source": self.source,
+            "total_students": self.total,
+            "processed_students": self.processed,
+            "progress": round(self.processed / self.total, 4) if self.total else 1.0,
+            "missing_student_ids": len(self.missing_student_ids),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_seconds": elapsed
+        }
+
+    def iter_csv(self) -> Iterator[bytes]:
+        """Finished results as CSV, one chunk at a time"""
+        with self._lock:
+            chunks = list(self._chunks)
+        yield (",".join(RESULT_COLUMNS) + "\n").encode("utf-8")
+        for chunk in chunks:
+            buffer = io.StringIO()
+            pd.DataFrame(chunk, columns=RESULT_COLUMNS).to_csv(buffer, header=False, index=False)
+            yield buffer.getvalue().encode("utf-8")
+
+    def iter_ndjson(self) -> Iterator[bytes]:
+        """Finished results as NDJSON, one chunk at a time"""
+        with self._lock:
+            chunks = list(self._chunks)
+        for chunk in chunks:
+            columns = dict(chunk)
+            columns["feature_importance"] = self.feature_importance
+            columns["model_version"] = self.model_version
+            yield from iter_ndjson_predictions(columns)
+
+
+class JobManager:
+    """Queue of scoring jobs executed on a thread pool"""
+
+    def __init__(self, max_workers: int = JOB_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scoring-job")
+        self.jobs: Dict[str, ScoringJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, total: int, source: str, chunks: Iterable[Any],
+               score_chunk: Callable[[Any], Dict[str, Any]]) -> ScoringJob:
+        """
+        Queue a scoring job and return immediately
+
+        Args:
+            total: Number of students the job will score (for progress)
+            source: Human-readable description of the input
+            chunks: Iterable of chunk inputs, consumed lazily by the worker
+            score_chunk: Scores one chunk; returns result columns plus
+                feature_importance/model_version and optionally missing_student_ids
+        """
+        job = ScoringJob(total, source)
+        with self._lock:
+            self._evict_finished()
+            self.jobs[job.job_id] = job
+        self.executor.submit(self._run, job, chunks, score_chunk)
+        return job
+
+    def get(self, job_id: str) -> Optional[ScoringJob]:
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[ScoringJob]:
+        """Ask a job to stop after its current chunk"""
+        job = self.get(job_id)
+        if job is not None and job.status not in FINISHED_STATES:
+            job.cancel_requested.set()
+        return job
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            jobs = list(self.jobs.values())
+        return [job.status_dict() for job in jobs]
+
+    def _evict_finished(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in FINISHED_STATES]
+        for job_id in finished[:max(len(finished) - MAX_RETAINED_JOBS + 1, 0)]:
+            del self.jobs[job_id]
+
+    def _run(self, job: ScoringJob, chunks: Iterable[Any], score_chunk: Callable):
+        job.started_at = datetime.now().isoformat()
+        job.status = RUNNING
+        try:
+            for chunk in chunks:
+                if job.cancel_requested.is_set():
+                    break
+                columns = score_chunk(chunk)
+                missing = columns.get("missing_student_ids", [])
+                job.missing_student_ids.extend(missing)
+                # Unknown IDs still count as consumed input for progress
+                job.processed += len(missing)
+                job.feature_importance = columns.get("feature_importance", job.feature_importance)
+                job.model_version = columns.get("model_version", job.model_version)
+                job.add_chunk(columns)
+            job.status = CANCELLED if job.cancel_requested.is_set() else COMPLETED
+        except Exception as e:
+            logger.exception("Scoring job failed: %s", e, extra={"job_id": job.job_id})
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = datetime.now().isoformat()
+
+
+def count_csv_rows(csv_path: str) -> int:
+    """Data rows in a CSV file (header excluded), counted without parsing it"""
+    lines = 0
+    last = b""
+    with open(csv_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            lines += block.count(b"\n")
+            last = block[-1:]
+    if last and last != b"\n":
+        lines += 1
+    return max(lines - 1, 0)
+
+
+def iter_frame_chunks(df: pd.DataFrame, chunk_rows: int = JOB_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def iter_csv_chunks(csv_path: str, chunk_rows: int = JOB_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+        yield chunk.drop(columns=["IsDropout"], errors="ignore")
+
+
+def iter_id_chunks(student_ids: List[str], chunk_rows: int = JOB_CHUNK_ROWS) -> Iterator[List[str]]:
+    for start in range(0, len(student_ids), chunk_rows):
+        yield student_ids[start:start + chunk_rows]
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Shared logging for the EduAnalytics ML services
+Request threads only put records on a bounded in-memory queue; a single
+background listener formats them as JSON lines (with the current request ID
+from ml_tracing) and writes them out, so a slow log pipe never blocks scoring.
+Repeats of the same message are rate-limited, and a full queue drops records
+instead of blocking. Startup banners in the CLIs stay as plain prints.
+Standard library only, so ml_service_simple.py can use it too.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Tuple
+
+from ml_tracing import current_trace
+
+# Minimum level written (DEBUG, INFO, WARNING, ERROR)
+LOG_LEVEL = os.environ.get("ML_LOG_LEVEL", "INFO").upper()
+# Records waiting for the writer thread before new ones are dropped
+LOG_QUEUE_SIZE = int(os.environ.get("ML_LOG_QUEUE_SIZE", "10000"))
+# Seconds during which repeats of one message are suppressed (0 disables)
+LOG_RATE_LIMIT_SECONDS = float(os.environ.get("ML_LOG_RATE_LIMIT_SECONDS", "60"))
+
+# Distinct messages tracked by the rate limiter before it starts over
+RATE_LIMIT_MAX_KEYS = 1000
+
+# Parent of every service logger; kept apart from the root logger uvicorn configures
+ROOT_LOGGER = "eduanalytics"
+
+# Attributes every LogRecord has; anything else came in via extra= and is logged as a field
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id", "suppressed"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, request_id and extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        if getattr(record, "suppressed", 0):
+            entry["suppressed_repeats"] = record.suppressed
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Let each message template through at most once per interval
+
+    The next record let through reports how many repeats were suppressed.
+    Keyed on the unformatted message, so "Error in prediction: %s" counts as
+    one message whatever the error.
+    """
+
+    def __init__(self, interval: float = LOG_RATE_LIMIT_SECONDS):
+        super().__init__()
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._seen: Dict[Tuple[str, int, str], Tuple[float, int]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.interval <= 0:
+            return True
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            last, suppressed = self._seen.get(key, (None, 0))
+            if last is not None and now - last < self.interval:
+                self._seen[key] = (last, suppressed + 1)
+                return False
+            if key not in self._seen and len(self._seen) >= RATE_LIMIT_MAX_KEYS:
+                self._seen.clear()
+            self._seen[key] = (now, 0)
+        record.suppressed = suppressed
+        return True
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that tags records with the request ID and drops them when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Runs on the request thread: resolve everything that depends on it here
+        trace = current_trace()
+        record.request_id = trace.request_id if trace is not None else None
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_configure_lock = threading.Lock()
+_queue_handler = None
+_listener = None
+
+
+def configure_logging(level: str = LOG_LEVEL, stream=None):
+    """
+    Attach the queue handler and start the writer thread (idempotent)
+
+    Args:
+        level: Minimum level name for every service logger
+        stream: Where the JSON lines go (default stdout, like the services' prints)
+    """
+    global _queue_handler, _listener
+    with _configure_lock:
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(level)
+        if _queue_handler is not None:
+            return
+        log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        _queue_handler = _NonBlockingQueueHandler(log_queue)
+        _queue_handler.addFilter(RateLimitFilter())
+        writer = logging.StreamHandler(stream or sys.stdout)
+        writer.setFormatter(JsonFormatter())
+        _listener = logging.handlers.QueueListener(log_queue, writer)
+        _listener.start()
+        root.addHandler(_queue_handler)
+        root.propagate = False
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Service logger under the shared eduanalytics namespace (configures logging on first use)"""
+    if _queue_handler is None:
+        configure_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def logging_stats() -> Dict[str, int]:
+    """Queue depth and records dropped because the queue was full"""
+    if _queue_handler is None:
+        return {"queued": 0, "dropped": 0}
+    return {"queued": _queue_handler.queue.qsize(), "dropped": _queue_handler.dropped}
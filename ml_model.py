@@ -6,24 +6,45 @@ Integrates the Jupyter notebook model with the Next.js application
 
 import pandas as pd
 import numpy as np
+import copy
 import json
 import sys
 import os
-from typing import Dict, List, Any
+import time
+from typing import Dict, List, Any, Optional
 import joblib
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report
+from sklearn.utils.class_weight import compute_class_weight
+from ml_forest_arrays import FlatForest, arrays_dir_for, compact_arrays_dir_for
+from ml_drift_monitor import build_drift_baseline, drift_baseline_path_for, save_drift_baseline
+from ml_tracing import span
+
+# Set to "r" to serve the forest from memory-mapped node arrays shared by all workers
+DEFAULT_MMAP_MODE = os.environ.get("ML_MODEL_MMAP") or None
+# Set to "1" to serve the float32/int16 copy of the forest verified and saved with the model
+DEFAULT_COMPACT = os.environ.get("ML_MODEL_COMPACT", "").lower() in ("1", "true", "yes")
+# Largest holdout accuracy drop an incrementally updated forest may show and still be activated
+INCREMENTAL_MAX_ACCURACY_DROP = float(os.environ.get("ML_INCREMENTAL_MAX_ACCURACY_DROP", "0.01"))
 
 class EduAnalyticsMLModel:
-    def __init__(self, model_path: str = None):
+    def __init__(self, model_path: str = None, mmap_mode: str = DEFAULT_MMAP_MODE,
+                 compact: bool = DEFAULT_COMPACT):
         """
         Initialize the ML model for dropout prediction
         
         Args:
             model_path: Path to saved model file (optional)
+            mmap_mode: When set (e.g. "r"), load the forest's exported node arrays
+                memory-mapped instead of unpickling a private copy
+            compact: Serve a float32/int16 inference copy of the forest when it
+                passes the equivalence check against the original
         """
         self.model = None
+        self.mmap_mode = mmap_mode
+        self.compact = compact
+        self.compact_report = None
         self.feature_columns = [
             'Gender', 'AdmissionQuota', 'AccommodationType', 'IsRural', 'CommuteTimeMinutes',
             'FamilyAnnualIncome', 'NumberOfSiblings', 'FatherEducation', 'IsFatherLiterate', 
@@ -34,9 +55,11 @@ class EduAnalyticsMLModel:
         ]
         
         if model_path and os.path.exists(model_path):
-            self.load_model(model_path)
+            self.load_model(model_path, mmap_mode=mmap_mode)
+            if compact and self.model is not None:
+                self.compact_model(model_path)
         else:
-            self.train_model()
+            self.train_model(model_path=model_path or "eduanalytics_model.pkl")
     
     def preprocess_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -104,12 +127,14 @@ class EduAnalyticsMLModel:
         
         return processed_df
     
-    def train_model(self, csv_path: str = "final_synthetic_dropout_data_rajasthan.csv"):
+    def train_model(self, csv_path: str = "final_synthetic_dropout_data_rajasthan.csv",
+                    model_path: str = "eduanalytics_model.pkl"):
         """
         Train the ML model using the CSV data
         
         Args:
             csv_path: Path to the CSV file
+            model_path: Where to save the trained model and its drift baseline
         """
         try:
             # Load data
@@ -151,12 +176,109 @@ class EduAnalyticsMLModel:
             print(f"📈 Training samples: {len(X_train)}")
             print(f"📉 Test samples: {len(X_test)}")
             
-            # Save model
-            self.save_model("eduanalytics_model.pkl")
+            # Save model, with the training distribution the drift monitor compares against
+            self.save_model(model_path)
+            save_drift_baseline(
+                build_drift_baseline(df.loc[X_train.index], self.feature_columns),
+                drift_baseline_path_for(model_path)
+            )
             
         except Exception as e:
             print(f"❌ Error training model: {str(e)}")
     
+    def update_model(self, csv_path: str, mode: str = "add", n_trees: int = 20,
+                     holdout_path: Optional[str] = None, model_path: str = "eduanalytics_model.pkl",
+                     max_accuracy_drop: float = INCREMENTAL_MAX_ACCURACY_DROP) -> Dict[str, Any]:
+        """
+        Incrementally update the forest with new term data instead of retraining it
+        
+        Trains n_trees new trees on the new records only (warm_start) and either
+        adds them to the forest ("add") or drops the same number of the oldest
+        trees ("replace", keeping the forest size). The updated forest is only
+        activated and saved when its holdout accuracy is within max_accuracy_drop
+        of the current model's.
+        
+        Args:
+            csv_path: CSV with the new term's labelled records
+            mode: "add" or "replace"
+            n_trees: Trees trained on the new data
+            holdout_path: Labelled CSV to validate on; defaults to 20% of the new records
+            model_path: Pickled forest to start from (when serving memory-mapped or
+                compact arrays) and to save the activated model to
+            max_accuracy_drop: Accepted holdout accuracy loss against the current model
+            
+        Returns:
+            Report with tree counts, holdout accuracies and whether the update was activated
+        """
+        if mode not in ("add", "replace"):
+            raise ValueError(f"mode must be 'add' or 'replace', got {mode}")
+        
+        base = self.model
+        if not isinstance(base, RandomForestClassifier):
+            # Memory-mapped and compact forests cannot grow trees; start from the pickle
+            base = joblib.load(model_path)
+        
+        df = self.preprocess_data(pd.read_csv(csv_path))
+        X_new, y_new = df[self.feature_columns], df['IsDropout']
+        if holdout_path:
+            holdout_df = self.preprocess_data(pd.read_csv(holdout_path))
+            X_holdout, y_holdout = holdout_df[self.feature_columns], holdout_df['IsDropout']
+        else:
+            X_new, X_holdout, y_new, y_holdout = train_test_split(
+                X_new, y_new, test_size=0.2, random_state=42, stratify=y_new
+            )
+        
+        start_time = time.perf_counter()
+        candidate = copy.deepcopy(base)
+        trees_before = len(candidate.estimators_)
+        # warm_start fits only the trees beyond the ones already in estimators_; the
+        # "balanced" preset is replaced by the same weights computed from the new records
+        params = {"warm_start": True, "n_estimators": trees_before + n_trees}
+        if candidate.class_weight == "balanced":
+            params["class_weight"] = dict(zip(
+                candidate.classes_,
+                compute_class_weight("balanced", classes=candidate.classes_, y=y_new)
+            ))
+        candidate.set_params(**params)
+        candidate.fit(X_new, y_new)
+        if mode == "replace":
+            candidate.estimators_ = candidate.estimators_[n_trees:]
+            candidate.n_estimators = len(candidate.estimators_)
+        candidate.set_params(warm_start=False, class_weight=base.class_weight)
+        train_seconds = time.perf_counter() - start_time
+        
+        baseline_accuracy = accuracy_score(y_holdout, base.predict(X_holdout))
+        candidate_accuracy = accuracy_score(y_holdout, candidate.predict(X_holdout))
+        activated = candidate_accuracy >= baseline_accuracy - max_accuracy_drop
+        
+        report = {
+            "mode": mode,
+            "activated": bool(activated),
+            "new_records": int(len(X_new)),
+            "holdout_records": int(len(X_holdout)),
+            "trees_before": trees_before,
+            "trees_after": len(candidate.estimators_),
+            "baseline_accuracy": float(baseline_accuracy),
+            "candidate_accuracy": float(candidate_accuracy),
+            "train_seconds": round(train_seconds, 3)
+        }
+        
+        if not activated:
+            print(f"⚠️  Incremental update rejected: holdout accuracy {candidate_accuracy:.3f} "
+                  f"vs {baseline_accuracy:.3f} for the current model")
+            return report
+        
+        self.model = candidate
+        self.save_model(model_path)
+        # Serve the updated forest the same way the previous one was served
+        if self.mmap_mode:
+            self.load_model(model_path, mmap_mode=self.mmap_mode)
+        if self.compact:
+            self.compact_model(model_path)
+        print(f"✅ Incremental update activated ({mode}, {report['trees_before']} -> "
+              f"{report['trees_after']} trees, holdout accuracy {candidate_accuracy:.3f})")
+        return report
+    
     def predict_dropout_risk(self, student_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Predict dropout risk for a single student
@@ -171,18 +293,20 @@ class EduAnalyticsMLModel:
             return {"error": "Model not trained or loaded"}
         
         try:
-            # Convert to DataFrame
-            df = pd.DataFrame([student_data])
-            
-            # Preprocess
-            processed_df = self.preprocess_data(df)
-            
-            # Get features
-            X = processed_df[self.feature_columns]
+            with span("preprocess"):
+                # Convert to DataFrame
+                df = pd.DataFrame([student_data])
+                
+                # Preprocess
+                processed_df = self.preprocess_data(df)
+                
+                # Get features
+                X = processed_df[self.feature_columns]
             
             # Make prediction
-            dropout_probability = self.model.predict_proba(X)[0][1]
-            dropout_prediction = self.model.predict(X)[0]
+            with span("predict_proba"):
+                dropout_probability = self.model.predict_proba(X)[0][1]
+                dropout_prediction = self.model.predict(X)[0]
             
             # Get feature importance
             feature_importance = dict(zip(
@@ -215,6 +339,80 @@ class EduAnalyticsMLModel:
         except Exception as e:
             return {"error": f"Prediction failed: {str(e)}"}
     
+    def build_feature_matrix(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Preprocess a batch of raw student records into the model's feature matrix
+        
+        Args:
+            df: Raw dataframe with one row per student
+            
+        Returns:
+            Float32 dataframe containing only the model feature columns, in order
+        """
+        processed_df = self.preprocess_data(df)
+        for col in self.feature_columns:
+            if col not in processed_df.columns:
+                processed_df[col] = 0
+        # Trees compare in float32 anyway, so skip the float64 copy
+        return processed_df[self.feature_columns].astype(np.float32)
+    
+    def predict_columns(self, X: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """
+        Score an already-encoded feature matrix in a single model call
+        
+        Args:
+            X: Feature matrix as returned by build_feature_matrix
+            
+        Returns:
+            Dictionary of result columns (one array entry per row)
+        """
+        probabilities = self.model.predict_proba(X)
+        dropout_probability = probabilities[:, 1]
+        dropout_prediction = self.model.classes_[np.argmax(probabilities, axis=1)].astype(bool)
+        
+        risk_level = np.select(
+            [dropout_probability >= 0.8, dropout_probability >= 0.6, dropout_probability >= 0.4],
+            ["Critical", "High", "Medium"],
+            default="Low"
+        )
+        
+        return {
+            "dropout_probability": dropout_probability.astype(float),
+            "dropout_prediction": dropout_prediction,
+            "risk_level": risk_level,
+            "risk_score": (dropout_probability * 100).astype(int)
+        }
+    
+    def batch_predict_columns(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Predict dropout risk for a dataframe of students, column-wise
+        
+        Args:
+            df: Raw dataframe with one row per student
+            
+        Returns:
+            Dictionary of result columns plus the shared feature importance
+        """
+        if self.model is None:
+            raise RuntimeError("Model not trained or loaded")
+        
+        with span("preprocess"):
+            X = self.build_feature_matrix(df)
+        with span("predict_proba"):
+            columns = self.predict_columns(X)
+        
+        if "StudentID" in df.columns:
+            student_ids = df["StudentID"].fillna("unknown").astype(str).to_numpy()
+        else:
+            student_ids = np.full(len(df), "unknown", dtype=object)
+        columns["student_id"] = student_ids
+        columns["feature_importance"] = dict(zip(
+            self.feature_columns,
+            self.model.feature_importances_.astype(float)
+        ))
+        columns["model_version"] = "v1.0"
+        return columns
+    
     def batch_predict(self, students_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Predict dropout risk for multiple students
@@ -225,24 +423,132 @@ class EduAnalyticsMLModel:
         Returns:
             List of prediction results
         """
+        if not students_data:
+            return []
+        
+        try:
+            columns = self.batch_predict_columns(pd.DataFrame(students_data))
+        except Exception:
+            # Fall back to per-student scoring so one bad row does not fail the batch
+            results = []
+            for student_data in students_data:
+                result = self.predict_dropout_risk(student_data)
+                result["student_id"] = student_data.get("StudentID", "unknown")
+                results.append(result)
+            return results
+        
+        feature_importance = columns["feature_importance"]
         results = []
-        for student_data in students_data:
-            result = self.predict_dropout_risk(student_data)
-            result["student_id"] = student_data.get("StudentID", "unknown")
-            results.append(result)
+        for i in range(len(students_data)):
+            results.append({
+                "dropout_probability": float(columns["dropout_probability"][i]),
+                "dropout_prediction": bool(columns["dropout_prediction"][i]),
+                "risk_level": str(columns["risk_level"][i]),
+                "risk_score": int(columns["risk_score"][i]),
+                "feature_importance": dict(feature_importance),
+                "model_version": columns["model_version"],
+                "student_id": students_data[i].get("StudentID", "unknown")
+            })
         
         return results
     
     def save_model(self, filepath: str):
-        """Save the trained model to file"""
+        """
+        Save the trained model to file, plus its node arrays for memory-mapped
+        loading and, when it verifies, the compact copy workers load at startup
+        """
         try:
             joblib.dump(self.model, filepath)
+            if isinstance(self.model, RandomForestClassifier):
+                flat = FlatForest.from_sklearn(self.model)
+                flat.save(arrays_dir_for(filepath))
+                compact = flat.compact()
+                report = compact.verify_against(self.model)
+                if report["passed"]:
+                    self._save_compact(compact, report, filepath)
+                else:
+                    print(f"⚠️  Compact model differs from the original, not saving it: {report}")
             print(f"✅ Model saved to {filepath}")
         except Exception as e:
             print(f"❌ Error saving model: {str(e)}")
     
-    def load_model(self, filepath: str):
-        """Load a trained model from file"""
+    @staticmethod
+    def _model_file_stamp(filepath: str) -> Dict[str, int]:
+        """Size and modification time of the pickle, recorded with the compact arrays built from it"""
+        stat = os.stat(filepath)
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    
+    def _save_compact(self, compact: FlatForest, report: Dict[str, Any], filepath: str):
+        """Store a verified compact forest next to the model, tagged with the model file it came from"""
+        compact.meta = dict(compact.meta, compact_report=report, model_file=self._model_file_stamp(filepath))
+        compact.save(compact_arrays_dir_for(filepath))
+    
+    def _load_saved_compact(self, filepath: str) -> Optional[FlatForest]:
+        """Compact arrays saved for this exact model file, or None when missing or stale"""
+        compact_dir = compact_arrays_dir_for(filepath)
+        try:
+            with open(os.path.join(compact_dir, "meta.json")) as f:
+                meta = json.load(f)
+            if meta.get("model_file") != self._model_file_stamp(filepath):
+                return None
+            return FlatForest.load(compact_dir, mmap_mode=self.mmap_mode)
+        except (OSError, ValueError, KeyError):
+            return None
+    
+    def compact_model(self, filepath: str):
+        """
+        Swap the loaded forest for its compact representation if it is equivalent
+        
+        The compact arrays saved with the model are loaded as they are, so every
+        memory-mapped worker shares the same files. They are only rebuilt (and,
+        when memory-mapped, saved once) if missing or older than the model file.
+        
+        Args:
+            filepath: Path of the loaded model
+        """
+        try:
+            compact = self._load_saved_compact(filepath)
+            if compact is not None:
+                self.compact_report = compact.meta["compact_report"]
+            else:
+                reference = self.model
+                flat = reference if isinstance(reference, FlatForest) else FlatForest.from_sklearn(reference)
+                compact = flat.compact()
+                self.compact_report = compact.verify_against(reference)
+                if not self.compact_report["passed"]:
+                    print(f"⚠️  Compact model differs from the original, keeping it: {self.compact_report}")
+                    return
+                if self.mmap_mode:
+                    self._save_compact(compact, self.compact_report, filepath)
+                    compact = FlatForest.load(compact_arrays_dir_for(filepath), mmap_mode=self.mmap_mode)
+            
+            self.model = compact
+            print(f"✅ Compact model active ({compact.nbytes() / 1024:.0f} KB of nodes, "
+                  f"max proba diff {self.compact_report['max_abs_proba_diff']:.2e})")
+        except Exception as e:
+            print(f"❌ Error building compact model: {str(e)}")
+    
+    def load_model(self, filepath: str, mmap_mode: str = None):
+        """
+        Load a trained model from file
+        
+        Args:
+            filepath: Path to the pickled model
+            mmap_mode: When set, serve the exported node arrays memory-mapped
+                (shared between processes) instead of the pickled estimator
+        """
+        arrays_dir = arrays_dir_for(filepath)
+        if mmap_mode:
+            if os.path.isdir(arrays_dir):
+                try:
+                    self.model = FlatForest.load(arrays_dir, mmap_mode=mmap_mode)
+                    print(f"✅ Model memory-mapped from {arrays_dir}")
+                    return
+                except Exception as e:
+                    print(f"❌ Error memory-mapping model, loading pickle instead: {str(e)}")
+            else:
+                print(f"⚠️  {arrays_dir} not found, re-save the model to enable memory-mapped loading")
+        
         try:
             self.model = joblib.load(filepath)
             print(f"✅ Model loaded from {filepath}")
@@ -254,6 +560,14 @@ def main():
     print("🚀 EduAnalytics ML Model Integration")
     print("=" * 50)
     
+    # python ml_model.py update <new_term.csv> [add|replace] [n_trees]
+    if len(sys.argv) > 2 and sys.argv[1] == "update":
+        ml_model = EduAnalyticsMLModel("eduanalytics_model.pkl")
+        mode = sys.argv[3] if len(sys.argv) > 3 else "add"
+        n_trees = int(sys.argv[4]) if len(sys.argv) > 4 else 20
+        print(json.dumps(ml_model.update_model(sys.argv[2], mode=mode, n_trees=n_trees), indent=2))
+        return
+    
     # Initialize model
     ml_model = EduAnalyticsMLModel()
     
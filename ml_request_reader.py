@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Bounded request body reading for the stdlib (http.server) ML services
+Bodies are read in fixed-size pieces from either a Content-Length or a
+chunked transfer-encoded request, and anything over ML_MAX_BODY_BYTES is
+rejected before it is buffered. Batch bodies can be parsed incrementally:
+the students array is decoded one element at a time and handed out in
+fixed-size scoring chunks, so the raw bytes, the decoded text and the full
+object tree never have to coexist.
+Standard library only, so ml_service_simple.py can use it too.
+"""
+
+import codecs
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Largest request body accepted, in bytes
+MAX_BODY_BYTES = int(os.environ.get("ML_MAX_BODY_BYTES", str(16 * 1024 * 1024)))
+# Students scored per model call when a batch body is streamed
+SCORING_CHUNK_ROWS = int(os.environ.get("ML_SCORING_CHUNK_ROWS", "1000"))
+# Bytes pulled from the socket per read
+READ_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\r\n"
+# Characters that can continue a JSON number
+_NUMBER_CHARS = "0123456789.eE+-"
+
+
+class RequestTooLarge(Exception):
+    """The request body exceeds the configured limit (HTTP 413)"""
+
+    def __init__(self, limit: int):
+        super().__init__(f"Request body exceeds {limit} bytes")
+        self.limit = limit
+
+
+class BadRequestBody(ValueError):
+    """The request body is malformed (HTTP 400)"""
+
+
+def iter_body(headers, rfile, max_bytes: int = MAX_BODY_BYTES) -> Iterator[bytes]:
+    """
+    Request body in pieces of at most READ_SIZE bytes
+
+    Args:
+        headers: Request headers (http.server message)
+        rfile: Request input stream
+        max_bytes: Body size limit; a larger Content-Length is rejected before reading
+
+    Raises:
+        RequestTooLarge: The body is (or grows) larger than max_bytes
+        BadRequestBody: Malformed Content-Length or chunk framing
+    """
+    if "chunked" in (headers.get("Transfer-Encoding") or "").lower():
+        yield from _iter_chunked(rfile, max_bytes)
+        return
+
+    try:
+        remaining = int(headers.get("Content-Length") or 0)
+    except ValueError:
+        raise BadRequestBody("Invalid Content-Length")
+    if remaining < 0:
+        raise BadRequestBody("Invalid Content-Length")
+    if remaining > max_bytes:
+        raise RequestTooLarge(max_bytes)
+    while remaining:
+        piece = rfile.read(min(READ_SIZE, remaining))
+        if not piece:
+            raise BadRequestBody("Request body ended early")
+        remaining -= len(piece)
+        yield piece
+
+
+def _iter_chunked(rfile, max_bytes: int) -> Iterator[bytes]:
+    """Decode Transfer-Encoding: chunked, enforcing max_bytes on the decoded size"""
+    total = 0
+    while True:
+        size_line = rfile.readline(1024)
+        try:
+            size = int(size_line.split(b";", 1)[0].strip(), 16)
+        except ValueError:
+            raise BadRequestBody("Invalid chunk size")
+        if size == 0:
+            # Skip trailers up to the blank line that ends the body
+            while rfile.readline(1024).strip():
+                pass
+            return
+        total += size
+        if total > max_bytes:
+            raise RequestTooLarge(max_bytes)
+        while size:
+            piece = rfile.read(min(READ_SIZE, size))
+            if not piece:
+                raise BadRequestBody("Request body ended early")
+            size -= len(piece)
+            yield piece
+        rfile.readline(1024)
+
+
+def read_body(headers, rfile, max_bytes: int = MAX_BODY_BYTES) -> bytes:
+    """Whole request body, bounded by max_bytes"""
+    return b"".join(iter_body(headers, rfile, max_bytes))
+
+
+def read_json(headers, rfile, max_bytes: int = MAX_BODY_BYTES) -> Any:
+    """Request body parsed as JSON, bounded by max_bytes"""
+    body = read_body(headers, rfile, max_bytes)
+    try:
+        return json.loads(body.decode("utf-8")) if body else {}
+    except ValueError as e:
+        raise BadRequestBody(f"Invalid JSON: {e}")
+
+
+def discard_body(headers, rfile, max_bytes: int = MAX_BODY_BYTES) -> bool:
+    """
+    Read and drop the body so an early error response reaches the client
+
+    Returns:
+        False when the body was too large or malformed to drain (close the connection instead)
+    """
+    try:
+        for _ in iter_body(headers, rfile, max_bytes):
+            pass
+    except (RequestTooLarge, BadRequestBody):
+        return False
+    return True
+
+
+class JSONArrayStream:
+    """
+    Elements of one array in a JSON request body, decoded as they arrive
+
+    The body may be the array itself or an object holding it under array_key.
+    Other top-level fields are small and decoded whole into .fields; fields
+    after the array are only available once iteration has finished.
+    """
+
+    def __init__(self, pieces: Iterator[bytes], array_key: Optional[str] = None):
+        """
+        Args:
+            pieces: Body bytes, e.g. from iter_body
+            array_key: Key of the array when the body is an object
+        """
+        self._pieces = iter(pieces)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self.array_key = array_key
+        self.fields: Dict[str, Any] = {}
+
+    def _read_more(self, at_least: int = 1) -> bool:
+        """Append at least at_least more characters (or up to EOF); False at EOF"""
+        if self._eof:
+            return False
+        # Drop consumed text so the buffer only holds the value being decoded
+        self._buffer = self._buffer[self._pos:]
+        self._pos = 0
+        added = 0
+        while added < at_least:
+            try:
+                text = self._decoder.decode(next(self._pieces))
+            except StopIteration:
+                self._buffer += self._decoder.decode(b"", final=True)
+                self._eof = True
+                return added > 0
+            except UnicodeDecodeError as e:
+                raise BadRequestBody(f"Invalid UTF-8: {e}")
+            self._buffer += text
+            added += len(text)
+        return True
+
+    def _peek(self) -> str:
+        """Next non-whitespace character without consuming it ('' at EOF)"""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read_more():
+                return ""
+
+    def _expect(self, char: str):
+        if self._peek() != char:
+            raise BadRequestBody(f"Invalid JSON: expected '{char}'")
+        self._pos += 1
+
+    def _value(self) -> Any:
+        """Decode one complete JSON value at the current position"""
+        self._peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buffer, self._pos)
+            except ValueError as e:
+                if self._read_more(max(len(self._buffer) - self._pos, READ_SIZE)):
+                    continue
+                raise BadRequestBody(f"Invalid JSON: {e}")
+            # A number cut at a piece boundary ("12." or "1e") decodes short; only
+            # number characters left up to the end of the buffer means read on
+            if self._buffer[end:].strip(_NUMBER_CHARS) == "" and self._read_more():
+                continue
+            self._pos = end
+            return value
+
+    def __iter__(self) -> Iterator[Any]:
+        first = self._peek()
+        if first == "[":
+            yield from self._elements()
+        elif first == "{":
+            yield from self._object()
+        else:
+            raise BadRequestBody("Expected a JSON array or object body")
+        if self._peek():
+            raise BadRequestBody("Unexpected data after the JSON body")
+
+    def _object(self) -> Iterator[Any]:
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self._value()
+            if not isinstance(key, str):
+                raise BadRequestBody("Invalid JSON: object keys must be strings")
+            self._expect(":")
+            if key == self.array_key and self._peek() == "[":
+                yield from self._elements()
+            else:
+                self.fields[key] = self._value()
+            if self._peek() == ",":
+                self._pos += 1
+                continue
+            self._expect("}")
+            return
+
+    def _elements(self) -> Iterator[Any]:
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self._value()
+            if self._peek() == ",":
+                self._pos += 1
+                continue
+            self._expect("]")
+            return
+
+
+def iter_objects(items: Iterable[Any], name: str) -> Iterator[Dict[str, Any]]:
+    """
+    Pass array elements through, rejecting any that is not a JSON object
+
+    Raises:
+        BadRequestBody: An element is not an object (reported as name[index])
+    """
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise BadRequestBody(f"{name}[{index}] must be a JSON object")
+        yield item
+
+
+def iter_chunks(items, chunk_size: int = SCORING_CHUNK_ROWS) -> Iterator[List[Any]]:
+    """Group an iterable into lists of chunk_size items (the last may be shorter)"""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+EduAnalytics At-Risk Index
+Latest dropout probability per StudentID kept in ranked order (overall and per
+segment), so "most at-risk" dashboards read a slice instead of rescoring and
+sorting the whole cohort
+"""
+
+import bisect
+import itertools
+import math
+import os
+import sys
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, Any, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Columns students can be filtered by (one ranked list per value)
+FILTER_COLUMNS = ("IsRural", "AdmissionQuota", "AccommodationType")
+
+# Bulk updates touching more than this share of the index re-sort everything
+# instead of inserting row by row
+REBUILD_FRACTION = 0.05
+
+
+def _normalize(value) -> str:
+    """Segment values as the CSVs spell them (booleans as TRUE/FALSE)"""
+    if isinstance(value, (bool, np.bool_)):
+        return "TRUE" if value else "FALSE"
+    value = str(value)
+    return value.upper() if value.lower() in ("true", "false") else value
+
+
+def segments_from_frame(df: pd.DataFrame) -> List[Dict[str, str]]:
+    """Per-row segment values from raw student records (only the columns present)"""
+    columns = [c for c in FILTER_COLUMNS if c in df.columns]
+    values = [[_normalize(v) for v in df[c].tolist()] for c in columns]
+    return [dict(zip(columns, row)) for row in zip(*values)] if columns else [{} for _ in range(len(df))]
+
+
+class RiskIndex:
+    """
+    Ranked index of the latest risk score per student
+
+    Every ranked list holds (-probability, student_id) keys in ascending order,
+    so the highest risk comes first and bisect answers threshold and rank
+    queries. Top-K reads are O(K), threshold counts O(log n).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[float, str, Dict[str, str]]] = {}
+        self._ranked: List[Tuple[float, str]] = []
+        self._segments: Dict[Tuple[str, str], List[Tuple[float, str]]] = {}
+        self.model_version = None
+        self.updates = 0
+        self.last_updated = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def update(self, student_ids: Sequence, probabilities: Sequence[float], risk_levels: Sequence[str],
+               segments: Optional[List[Dict[str, str]]] = None, model_version: Optional[str] = None):
+        """
+        Record the latest scores for a batch of students
+
+        Args:
+            student_ids: Scored students
+            probabilities: Dropout probability per student
+            risk_levels: Risk level per student
+            segments: Filter column values per student; when None, students keep
+                the segments they were last indexed with
+            model_version: Version of the model that produced the scores
+        """
+        with self._lock:
+            changed = {}
+            for i, student_id in enumerate(student_ids):
+                student_id = str(student_id)
+                if segments is not None:
+                    segment = segments[i]
+                else:
+                    previous = changed.get(student_id) or self._entries.get(student_id)
+                    segment = previous[2] if previous else {}
+                changed[student_id] = (float(probabilities[i]), str(risk_levels[i]), segment)
+
+            if len(changed) > len(self._entries) * REBUILD_FRACTION:
+                self._entries.update(changed)
+                self._rebuild()
+            else:
+                for student_id, entry in changed.items():
+                    previous = self._entries.get(student_id)
+                    if previous is not None:
+                        self._remove(student_id, previous)
+                    self._entries[student_id] = entry
+                    self._insert(student_id, entry)
+
+            if model_version is not None:
+                self.model_version = model_version
+            self.updates += len(changed)
+            self.last_updated = datetime.now().isoformat()
+
+    def update_columns(self, columns: Dict[str, Any], segments: Optional[List[Dict[str, str]]] = None):
+        """Record batch result columns (as returned by batch_predict_columns)"""
+        self.update(columns["student_id"], columns["dropout_probability"], columns["risk_level"],
+                    segments, columns.get("model_version"))
+
+    def clear(self):
+        """Drop every score, e.g. after the model is retrained"""
+        with self._lock:
+            self._entries.clear()
+            self._ranked = []
+            self._segments = {}
+            self.model_version = None
+
+    def _insert(self, student_id: str, entry):
+        key = (-entry[0], student_id)
+        bisect.insort(self._ranked, key)
+        for segment_key in entry[2].items():
+            bisect.insort(self._segments.setdefault(segment_key, []), key)
+
+    def _remove(self, student_id: str, entry):
+        key = (-entry[0], student_id)
+        for ranked in [self._ranked] + [self._segments[k] for k in entry[2].items()]:
+            del ranked[bisect.bisect_left(ranked, key)]
+
+    def _rebuild(self):
+        self._ranked = sorted((-probability, student_id)
+                              for student_id, (probability, _, _) in self._entries.items())
+        self._segments = {}
+        # Walking the ranked list keeps every segment list sorted without another sort
+        for key in self._ranked:
+            for segment_key in self._entries[key[1]][2].items():
+                self._segments.setdefault(segment_key, []).append(key)
+
+    def _candidates(self, filters: Optional[Dict[str, Any]]):
+        """
+        Smallest ranked list covering the filters, plus the filters still to check per row
+        """
+        filters = {column: _normalize(value) for column, value in (filters or {}).items()
+                   if value is not None}
+        unknown = set(filters) - set(FILTER_COLUMNS)
+        if unknown:
+            raise ValueError(f"Cannot filter by {', '.join(sorted(unknown))}; use {', '.join(FILTER_COLUMNS)}")
+        if not filters:
+            return self._ranked, {}
+        column = min(filters, key=lambda c: len(self._segments.get((c, filters[c]), [])))
+        remaining = {c: v for c, v in filters.items() if c != column}
+        return self._segments.get((column, filters[column]), []), remaining
+
+    def _iter_matches(self, ranked, remaining, stop: Optional[int] = None) -> Iterator[Tuple[float, str]]:
+        keys = ranked if stop is None else itertools.islice(ranked, stop)
+        for key in keys:
+            segment = self._entries[key[1]][2]
+            if all(segment.get(c) == v for c, v in remaining.items()):
+                yield key
+
+    def _row(self, key: Tuple[float, str]) -> Dict[str, Any]:
+        probability, risk_level, segment = self._entries[key[1]]
+        return {"student_id": key[1], "dropout_probability": probability,
+                "risk_level": risk_level, **segment}
+
+    def top(self, k: int, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """The k highest-risk students, optionally within a segment"""
+        with self._lock:
+            ranked, remaining = self._candidates(filters)
+            return [self._row(key) for key in itertools.islice(self._iter_matches(ranked, remaining), k)]
+
+    def above(self, threshold: float, filters: Optional[Dict[str, Any]] = None,
+              limit: int = 1000) -> Dict[str, Any]:
+        """
+        Students whose dropout probability is at least threshold
+
+        Returns:
+            Total count plus up to limit students, highest risk first
+        """
+        with self._lock:
+            ranked, remaining = self._candidates(filters)
+            # Keys sort below (nextafter(-threshold),) exactly when probability >= threshold
+            end = bisect.bisect_left(ranked, (math.nextafter(-threshold, math.inf),))
+            if remaining:
+                matches = list(self._iter_matches(ranked, remaining, end))
+                count, keys = len(matches), matches[:limit]
+            else:
+                count, keys = end, ranked[:min(end, limit)]
+            return {"threshold": threshold, "count": count, "students": [self._row(key) for key in keys]}
+
+    def percentile(self, percentile: float, filters: Optional[Dict[str, Any]] = None,
+                   limit: int = 1000) -> Dict[str, Any]:
+        """
+        Students at or above the given percentile of the (filtered) risk distribution
+
+        percentile=90 returns the riskiest 10%, with the probability cutoff.
+        """
+        if not 0 <= percentile <= 100:
+            raise ValueError("percentile must be between 0 and 100")
+        with self._lock:
+            ranked, remaining = self._candidates(filters)
+            population = list(self._iter_matches(ranked, remaining)) if remaining else ranked
+            count = math.ceil(len(population) * (100 - percentile) / 100)
+            keys = population[:count]
+            return {
+                "percentile": percentile,
+                "population": len(population),
+                "count": count,
+                "cutoff_probability": -keys[-1][0] if keys else None,
+                "students": [self._row(key) for key in keys[:limit]]
+            }
+
+    def rank(self, student_id: str) -> Optional[Dict[str, Any]]:
+        """A student's latest score with their rank (1 = highest risk) and percentile"""
+        with self._lock:
+            entry = self._entries.get(str(student_id))
+            if entry is None:
+                return None
+            key = (-entry[0], str(student_id))
+            position = bisect.bisect_left(self._ranked, key)
+            row = self._row(key)
+            row.update({
+                "rank": position + 1,
+                "percentile": round(100 * (len(self._ranked) - position - 1) / len(self._ranked), 2)
+            })
+            return row
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "students": len(self._entries),
+            "segments": {f"{c}={v}": len(ranked) for (c, v), ranked in sorted(self._segments.items())},
+            "model_version": self.model_version,
+            "updates": self.updates,
+            "last_updated": self.last_updated
+        }
+
+
+def main():
+    """Score a cohort CSV, index it and print the top of each query"""
+    from ml_model import EduAnalyticsMLModel
+    import time
+
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else "final_synthetic_dropout_data_rajasthan.csv"
+    model_path = sys.argv[2] if len(sys.argv) > 2 else "eduanalytics_model.pkl"
+
+    print("🚀 EduAnalytics At-Risk Index")
+    print("=" * 50)
+
+    if not os.path.exists(csv_path):
+        print(f"❌ CSV file not found: {csv_path}")
+        return
+    if not os.path.exists(model_path):
+        print(f"❌ Model file not found: {model_path}")
+        return
+
+    model = EduAnalyticsMLModel(model_path)
+    if model.model is None:
+        print("❌ No model loaded")
+        return
+
+    df = pd.read_csv(csv_path).drop(columns=["IsDropout"], errors="ignore")
+    columns = model.batch_predict_columns(df)
+
+    index = RiskIndex()
+    start = time.perf_counter()
+    index.update_columns(columns, segments_from_frame(df))
+    print(f"✅ Indexed {len(index)} students in {time.perf_counter() - start:.3f}s")
+
+    start = time.perf_counter()
+    top = index.top(10)
+    rural = index.top(10, {"IsRural": "TRUE"})
+    above = index.above(0.5)
+    print(f"⚡ Top-10 / rural top-10 / threshold queries in {(time.perf_counter() - start) * 1000:.2f}ms")
+
+    print(f"📊 Students with dropout probability >= 0.5: {above['count']}")
+    for row in top[:5]:
+        print(f"   {row['student_id']}: {row['dropout_probability']:.3f} ({row['risk_level']})")
+    print(f"📊 Riskiest rural student: {rural[0]['student_id'] if rural else 'none'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+EduAnalytics Student Risk Report
+Vectorized red/green flag extraction from SHAP contributions (the report built in
+"Generate student risk report.ipynb"), written as streaming CSV or HTML
+"""
+
+import csv
+import html
+import os
+import sys
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# "Common sense" overrides from the notebook: protective features are always
+# green flags, risk features always red flags, whatever sign SHAP gives them
+KNOWN_PROTECTIVE_FEATURES = [
+    'IsPreparingCompetitiveExam', 'HasReliableInternet', 'HasOwnLaptop',
+    'FamilyEconomicStatus_General_Tier'
+]
+KNOWN_RISK_FEATURES = ['WorksPartTime', 'MediumChanged', 'IsFirstGenerationLearner']
+
+REPORT_CHUNK_ROWS = 5000
+REPORT_COLUMNS = ['StudentID', 'DropoutChance', 'RiskLevel', 'RedFlags', 'GreenFlags']
+
+
+def override_signs(feature_names: Sequence[str]) -> np.ndarray:
+    """
+    Precompute the override for every feature column
+
+    Uses the notebook's matching rule (known name contained in the feature name
+    with underscores shown as spaces), evaluated once per column instead of per row.
+
+    Returns:
+        int8 array: -1 forces protective, +1 forces risk, 0 keeps the SHAP sign
+    """
+    signs = np.zeros(len(feature_names), dtype=np.int8)
+    for i, feature in enumerate(feature_names):
+        clean_feature = feature.replace('_', ' ')
+        if any(known in clean_feature for known in KNOWN_PROTECTIVE_FEATURES):
+            signs[i] = -1
+        elif any(known in clean_feature for known in KNOWN_RISK_FEATURES):
+            signs[i] = 1
+    return signs
+
+
+def apply_overrides(shap_matrix: np.ndarray, signs: np.ndarray) -> np.ndarray:
+    """Apply the override sign mask to a whole SHAP matrix at once"""
+    magnitudes = np.abs(shap_matrix)
+    return np.where(signs < 0, -magnitudes, np.where(signs > 0, magnitudes, shap_matrix))
+
+
+def _top_positive(scores: np.ndarray, top_n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Column indices of the top_n largest positive scores per row, largest first
+
+    Returns:
+        Tuple of (index matrix, validity mask); rows with fewer than top_n
+        positive scores have trailing invalid slots
+    """
+    n = min(top_n, scores.shape[1])
+    candidates = np.where(scores > 0, scores, -np.inf)
+    top = np.argpartition(-candidates, n - 1, axis=1)[:, :n]
+    values = np.take_along_axis(candidates, top, axis=1)
+    order = np.argsort(-values, axis=1, kind='stable')
+    top = np.take_along_axis(top, order, axis=1)
+    values = np.take_along_axis(values, order, axis=1)
+    return top, np.isfinite(values)
+
+
+def flag_indices(shap_matrix: np.ndarray, feature_names: Sequence[str],
+                 top_n: int = 3) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Top red (risk-increasing) and green (risk-decreasing) flags for every row
+
+    Args:
+        shap_matrix: SHAP contributions, shape (n_students, n_features)
+        feature_names: Column names of the SHAP matrix
+        top_n: Flags of each colour per student
+
+    Returns:
+        Tuple of (red indices, red valid mask, green indices, green valid mask)
+    """
+    impacts = apply_overrides(np.asarray(shap_matrix, dtype=np.float64), override_signs(feature_names))
+    red, red_valid = _top_positive(impacts, top_n)
+    green, green_valid = _top_positive(-impacts, top_n)
+    return red, red_valid, green, green_valid
+
+
+def flag_labels(shap_matrix: np.ndarray, feature_names: Sequence[str],
+                top_n: int = 3) -> Tuple[List[List[str]], List[List[str]]]:
+    """
+    Readable red and green flag lists per student ("FailureRate LatestTerm")
+
+    Returns:
+        Tuple of (red flag lists, green flag lists), one list per row
+    """
+    labels = np.array([name.replace('_', ' ') for name in feature_names], dtype=object)
+    red, red_valid, green, green_valid = flag_indices(shap_matrix, feature_names, top_n)
+    red_labels = [labels[idx[valid]].tolist() for idx, valid in zip(red, red_valid)]
+    green_labels = [labels[idx[valid]].tolist() for idx, valid in zip(green, green_valid)]
+    return red_labels, green_labels
+
+
+def assign_risk_levels(chances: np.ndarray) -> np.ndarray:
+    """Notebook risk levels (>50% Critical, >30% High, >10% Medium) for a whole column"""
+    chances = np.asarray(chances)
+    return np.select(
+        [chances > 0.5, chances > 0.3, chances > 0.1],
+        ['Critical', 'High', 'Medium'],
+        default='Low'
+    )
+
+
+def iter_report_chunks(student_ids: Sequence, dropout_chances: np.ndarray,
+                       shap_matrix: np.ndarray, feature_names: Sequence[str],
+                       top_n: int = 3, chunk_rows: int = REPORT_CHUNK_ROWS,
+                       flags: Optional[Tuple[List[List[str]], List[List[str]]]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Build the report a chunk of students at a time
+
+    Args:
+        flags: flag_labels() output for every student when the caller already has
+            it; otherwise flags are extracted from shap_matrix chunk by chunk
+
+    Yields:
+        Dataframes with REPORT_COLUMNS; flag columns hold lists of labels
+    """
+    student_ids = np.asarray(student_ids)
+    dropout_chances = np.asarray(dropout_chances, dtype=float)
+    for start in range(0, len(student_ids), chunk_rows):
+        end = start + chunk_rows
+        if flags is not None:
+            red, green = flags[0][start:end], flags[1][start:end]
+        else:
+            red, green = flag_labels(shap_matrix[start:end], feature_names, top_n)
+        yield pd.DataFrame({
+            'StudentID': student_ids[start:end],
+            'DropoutChance': dropout_chances[start:end],
+            'RiskLevel': assign_risk_levels(dropout_chances[start:end]),
+            'RedFlags': red,
+            'GreenFlags': green
+        })
+
+
+def write_report_csv(chunks: Iterator[pd.DataFrame], path: str) -> int:
+    """
+    Stream report chunks to CSV (flags joined with "; ")
+
+    Returns:
+        Number of students written
+    """
+    rows = 0
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(REPORT_COLUMNS)
+        for chunk in chunks:
+            writer.writerows(zip(
+                chunk['StudentID'],
+                chunk['DropoutChance'].round(4),
+                chunk['RiskLevel'],
+                ('; '.join(flags) for flags in chunk['RedFlags']),
+                ('; '.join(flags) for flags in chunk['GreenFlags'])
+            ))
+            rows += len(chunk)
+    return rows
+
+
+def write_report_html(chunks: Iterator[pd.DataFrame], path: str,
+                      title: str = "Student Risk Report") -> int:
+    """
+    Stream report chunks to a standalone HTML table
+
+    Returns:
+        Number of students written
+    """
+    rows = 0
+    with open(path, 'w') as f:
+        f.write(
+            f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{html.escape(title)}</title>\n"
+            "<style>body{font-family:sans-serif}table{border-collapse:collapse}"
+            "td,th{border:1px solid #ccc;padding:4px 8px;vertical-align:top}"
+            ".red{color:#b91c1c}.green{color:#15803d}</style></head><body>\n"
+            f"<h1>{html.escape(title)}</h1>\n<table>\n<tr><th>StudentID</th><th>Dropout Chance</th>"
+            "<th>Risk Level</th><th>Red Flags</th><th>Green Flags</th></tr>\n"
+        )
+        for chunk in chunks:
+            lines = []
+            for student_id, chance, level, red, green in zip(
+                chunk['StudentID'], chunk['DropoutChance'], chunk['RiskLevel'],
+                chunk['RedFlags'], chunk['GreenFlags']
+            ):
+                lines.append(
+                    f"<tr><td>{html.escape(str(student_id))}</td><td>{chance:.2%}</td>"
+                    f"<td>{html.escape(level)}</td>"
+                    f"<td class=\"red\">{'<br>'.join(html.escape(flag) for flag in red)}</td>"
+                    f"<td class=\"green\">{'<br>'.join(html.escape(flag) for flag in green)}</td></tr>\n"
+                )
+            f.write(''.join(lines))
+            rows += len(chunk)
+        f.write("</table>\n</body></html>\n")
+    return rows
+
+
+def main():
+    """Write the full-cohort risk report using the exported XGBoost model's contributions"""
+    from ml_xgboost_model import EduAnalyticsXGBoostModel, DEFAULT_MODEL_PATH
+
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else "final_synthetic_dropout_data_rajasthan.csv"
+    output_stem = sys.argv[2] if len(sys.argv) > 2 else "student_risk_report"
+
+    print("🚀 EduAnalytics Student Risk Report")
+    print("=" * 50)
+
+    if not os.path.exists(csv_path):
+        print(f"❌ CSV file not found: {csv_path}")
+        return
+
+    xgb_model = EduAnalyticsXGBoostModel(DEFAULT_MODEL_PATH)
+    if xgb_model.model is None:
+        print("❌ Export the XGBoost model first: python ml_xgboost_model.py")
+        return
+
+    df = pd.read_csv(csv_path)
+    X = xgb_model.encode_frame(df.drop(columns=["IsDropout", "StudentID"], errors="ignore"))
+    chances = xgb_model.predict_proba(X)
+    # pred_contribs gives exact TreeSHAP values for XGBoost; drop the bias column
+    shap_matrix = xgb_model.contributions(X)[:, :-1]
+    feature_names = xgb_model.schema["encoded_columns"]
+
+    for writer, extension in [(write_report_csv, "csv"), (write_report_html, "html")]:
+        path = f"{output_stem}.{extension}"
+        rows = writer(iter_report_chunks(df["StudentID"], chances, shap_matrix, feature_names), path)
+        print(f"✅ Wrote {rows} students to {path}")
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """
 REAL ML Service for EduAnalytics Dashboard
-Uses actual XGBoost model and SHAP analysis from Jupyter notebook
+Serves the notebook's XGBoost model (native pred_contribs explanations) or the
+RandomForest from ml_model.py (SHAP explanations)
 """
 
 import pandas as pd
@@ -12,7 +13,7 @@ import sys
 import joblib
 import shap
 from datetime import datetime
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 import threading
 import time
@@ -21,6 +22,23 @@ from typing import Dict, List, Any, Optional
 # Add the current directory to Python path for imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from ml_cascade import CascadeScorer, DEFAULT_BAND as CASCADE_BAND
+from ml_compression import compress_body, negotiate_encoding, should_compress
+from ml_delta_scoring import feature_fingerprints, model_fingerprint
+from ml_explanation_store import (
+    EXPLANATION_COHORT_CSV, ExplanationStore, build_explanation_store, store_dir_for
+)
+from ml_forest_arrays import FlatForest, process_memory_usage
+from ml_single_flight import SingleFlight
+from ml_logging import get_logger, logging_stats
+from ml_request_reader import (
+    BadRequestBody, JSONArrayStream, RequestTooLarge, discard_body, iter_body, iter_chunks, iter_objects,
+    read_json
+)
+from ml_tracing import current_trace, end_trace, request_id_from_headers, span, start_trace, trace_headers
+from ml_admission import BULK, INTERACTIVE, AdmissionController, Overloaded
+from ml_what_if import simulate as simulate_what_if
+
 try:
     from ml_model import EduAnalyticsMLModel
     ML_MODEL_AVAILABLE = True
@@ -28,12 +46,44 @@ except ImportError:
     ML_MODEL_AVAILABLE = False
     print("Warning: ml_model.py not available, using fallback")
 
+try:
+    from ml_xgboost_model import EduAnalyticsXGBoostModel, DEFAULT_MODEL_PATH as XGB_MODEL_PATH
+    XGBOOST_AVAILABLE = True
+except ImportError:
+    XGBOOST_AVAILABLE = False
+
+# Model backing the service: "xgboost", "random_forest" or "auto" (XGBoost when exported)
+ML_BACKEND = os.environ.get('ML_BACKEND', 'auto')
+RF_MODEL_PATH = os.environ.get('ML_RF_MODEL_PATH', 'eduanalytics_model.pkl')
+
+# Per-feature explanations: "shap" (exact TreeSHAP / pred_contribs, falling back to
+# path contributions when no explainer is available), "path" (Saabas decision-path
+# contributions, much cheaper) or "heuristic" (fixed weights, ignores the model)
+EXPLANATION_MODE = os.environ.get('ML_EXPLANATION_MODE', 'shap')
+
+logger = get_logger("service_real")
+
+MODEL_VERSIONS = {
+    'xgboost': 'xgboost_real_v1.0',
+    'random_forest': 'random_forest_real_v1.0'
+}
+
 class RealMLService:
-    """Real ML service using actual XGBoost model and SHAP analysis"""
+    """Real ML service using the exported XGBoost model or the RandomForest with SHAP"""
     
     def __init__(self):
         self.model = None
         self.explainer = None
+        # Flat node arrays of the RandomForest for path contributions
+        self.path_forest = None
+        self.explanation_mode = EXPLANATION_MODE
+        self.backend = None
+        self.model_path = None
+        self._model_fingerprint = None
+        # Precomputed cohort explanations for the active model (None until built)
+        self.explanation_store = None
+        # Coalesces concurrent single-student requests with identical features
+        self.single_flight = SingleFlight()
         self.feature_columns = [
             'Gender', 'AdmissionQuota', 'AccommodationType', 'IsRural', 'CommuteTimeMinutes',
             'FamilyAnnualIncome', 'NumberOfSiblings', 'FatherEducation', 'IsFatherLiterate', 
@@ -48,17 +98,34 @@ class RealMLService:
         
         # Initialize the model
         self.initialize_model()
+        self._open_explanation_store()
     
     def initialize_model(self):
         """Initialize the real ML model"""
         try:
+            if ML_BACKEND in ('auto', 'xgboost') and self._initialize_xgboost():
+                return
+            
             if ML_MODEL_AVAILABLE:
                 print("Loading real ML model...")
-                self.ml_model = EduAnalyticsMLModel()
+                self.ml_model = EduAnalyticsMLModel(RF_MODEL_PATH)
                 self.model = self.ml_model.model
                 
                 # Create SHAP explainer if model is available
                 if self.model is not None:
+                    self.backend = 'random_forest'
+                    self.model_path = RF_MODEL_PATH
+                    self.path_forest = (
+                        self.model if isinstance(self.model, FlatForest)
+                        else FlatForest.from_sklearn(self.model)
+                    )
+                    if self.explanation_mode != 'shap':
+                        print(f"Using {self.explanation_mode} explanations")
+                        return
+                    if self.ml_model.mmap_mode:
+                        # TreeExplainer would keep a private copy of every tree per worker
+                        print("SHAP explainer disabled for the memory-mapped model; using path contributions")
+                        return
                     try:
                         self.explainer = shap.TreeExplainer(self.model)
                         print("✅ SHAP explainer initialized successfully")
@@ -75,6 +142,89 @@ class RealMLService:
             print(f"Error initializing ML model: {e}")
             self.model = None
             self.explainer = None
+            self.backend = None
+    
+    def _initialize_xgboost(self) -> bool:
+        """Load the exported XGBoost artifact; returns False when it is unavailable"""
+        if not XGBOOST_AVAILABLE or not os.path.exists(XGB_MODEL_PATH):
+            if ML_BACKEND == 'xgboost':
+                print(f"Warning: XGBoost backend requested but {XGB_MODEL_PATH} or xgboost is missing; "
+                      "run ml_xgboost_model.py to export it")
+            return False
+        
+        print("Loading exported XGBoost model...")
+        self.xgb_model = EduAnalyticsXGBoostModel(XGB_MODEL_PATH)
+        if self.xgb_model.model is None:
+            return False
+        
+        self.model = self.xgb_model.model
+        self.backend = 'xgboost'
+        self.model_path = XGB_MODEL_PATH
+        # Explanations come from XGBoost's native pred_contribs, no SHAP explainer needed
+        self.explainer = None
+        print("✅ XGBoost model ready (pred_contribs explanations)")
+        return True
+    
+    @property
+    def explanation_method(self) -> str:
+        """How per-feature importance is computed: tree_shap, path or heuristic"""
+        if self.explanation_mode == 'heuristic' or self.backend is None:
+            return 'heuristic'
+        if self.backend == 'xgboost':
+            return 'path' if self.explanation_mode == 'path' else 'tree_shap'
+        if self.explanation_mode == 'shap' and self.explainer is not None:
+            return 'tree_shap'
+        return 'path' if self.path_forest is not None else 'heuristic'
+    
+    @property
+    def shap_available(self) -> bool:
+        """Whether predictions carry exact SHAP per-feature contributions"""
+        return self.explanation_method == 'tree_shap'
+    
+    @property
+    def model_version(self) -> str:
+        return MODEL_VERSIONS.get(self.backend, 'fallback_v1.0')
+    
+    @property
+    def model_fingerprint(self) -> str:
+        """Content hash of the loaded model artifact"""
+        if self._model_fingerprint is None and self.model_path:
+            self._model_fingerprint = model_fingerprint(self.model_path)
+        return self._model_fingerprint
+    
+    def _open_explanation_store(self):
+        """
+        Serve precomputed explanations for the active model when a store exists
+        
+        With ML_EXPLANATION_COHORT set and no store for this model yet, the store
+        is built in the background and swapped in once complete.
+        """
+        if self.model is None or not self.model_path:
+            return
+        
+        directory = store_dir_for(self.model_version, self.explanation_method, self.model_fingerprint)
+        if os.path.exists(os.path.join(directory, 'meta.json')):
+            try:
+                self.explanation_store = ExplanationStore.load(directory)
+                print(f"✅ Explanation store loaded ({len(self.explanation_store.rows)} students)")
+            except Exception as e:
+                print(f"Warning: Could not load explanation store {directory}: {e}")
+        elif EXPLANATION_COHORT_CSV and os.path.exists(EXPLANATION_COHORT_CSV):
+            threading.Thread(
+                target=self._refresh_explanation_store,
+                args=(EXPLANATION_COHORT_CSV, directory),
+                daemon=True
+            ).start()
+    
+    def _refresh_explanation_store(self, csv_path: str, directory: str):
+        """Precompute the cohort's explanations for the active model"""
+        try:
+            print(f"Precomputing explanations for {csv_path}...")
+            df = pd.read_csv(csv_path).drop(columns=['IsDropout'], errors='ignore')
+            self.explanation_store = build_explanation_store(self, df, directory)
+            print(f"✅ Explanation store ready ({len(self.explanation_store.rows)} students)")
+        except Exception as e:
+            print(f"Warning: Could not precompute explanations: {e}")
     
     def preprocess_student_data(self, student_data: Dict) -> pd.DataFrame:
         """Preprocess student data for prediction"""
@@ -127,82 +277,212 @@ class RealMLService:
             return df
             
         except Exception as e:
-            print(f"Error preprocessing student data: {e}")
+            logger.error("Error preprocessing student data: %s", e)
             # Return minimal DataFrame if preprocessing fails
             return pd.DataFrame({col: [0] for col in self.feature_columns})
     
+    def _with_defaults(self, student_data: Dict) -> Dict:
+        """Fill features missing from a request with the service defaults"""
+        student = dict(student_data)
+        for feature in self.feature_columns:
+            if feature not in student:
+                if feature in ['Gender', 'AdmissionQuota', 'AccommodationType']:
+                    student[feature] = 'Unknown'
+                elif feature in ['FatherEducation', 'MotherEducation']:
+                    student[feature] = 'Primary'
+                elif feature in ['IsRural', 'IsFatherLiterate', 'IsMotherLiterate', 
+                               'IsFirstGenerationLearner', 'MediumChanged', 'WorksPartTime',
+                               'IsPreparingCompetitiveExam', 'HasOwnLaptop', 'HasReliableInternet']:
+                    student[feature] = False
+                else:
+                    student[feature] = 0
+        return student
+    
+    def _encode_students(self, students_data: List[Dict]) -> pd.DataFrame:
+        """Encode raw student records into the active backend's feature matrix"""
+        if self.backend == 'xgboost':
+            # XGBoost routes missing values natively, so no imputation here
+            return self.xgb_model.encode_frame(pd.DataFrame(students_data))
+        return self.ml_model.build_feature_matrix(
+            pd.DataFrame([self._with_defaults(s) for s in students_data])
+        )
+    
+    def _predict_matrix(self, X: pd.DataFrame) -> np.ndarray:
+        """Dropout probabilities for an encoded matrix, without explanations"""
+        if self.backend == 'xgboost':
+            return self.xgb_model.predict_proba(X)
+        return self.model.predict_proba(X)[:, 1]
+    
+    def _contribution_matrix(self, X: pd.DataFrame):
+        """
+        Probabilities and per-feature contributions for an encoded matrix
+        
+        Returns:
+            Tuple of (dropout probabilities, contribution matrix or None when no
+            explainer is available, feature names of the matrix columns)
+        """
+        method = self.explanation_method
+        with span('predict_proba'):
+            probabilities = self._predict_matrix(X)
+        
+        if method == 'heuristic':
+            return probabilities, None, list(X.columns)
+        with span('shap'):
+            return self._contributions(X, probabilities, method)
+    
+    def _contributions(self, X: pd.DataFrame, probabilities: np.ndarray, method: str):
+        """Per-feature contributions for the configured (non-heuristic) explanation method"""
+        if self.backend == 'xgboost':
+            contributions = self.xgb_model.raw_feature_contributions(
+                self.xgb_model.contributions(X, approximate=(method == 'path'))
+            )
+            names = list(contributions.keys())
+            return probabilities, np.column_stack([contributions[name] for name in names]), names
+        
+        if method == 'tree_shap':
+            try:
+                matrix = self._positive_class_shap(self.explainer.shap_values(X))
+                return probabilities, matrix, list(X.columns)
+            except Exception as e:
+                logger.warning("Could not generate SHAP explanation: %s", e)
+        
+        if self.path_forest is not None:
+            _, matrix = self.path_forest.path_contributions(X.to_numpy(dtype=np.float32))
+            return probabilities, matrix, list(X.columns)
+        
+        return probabilities, None, list(X.columns)
+    
+    def _score_matrix(self, X: pd.DataFrame):
+        """
+        Score an encoded matrix in one model call
+        
+        Returns:
+            Tuple of (dropout probabilities, per-row feature importance dicts)
+        """
+        probabilities, matrix, names = self._contribution_matrix(X)
+        with span('explanation'):
+            if matrix is not None:
+                return probabilities, [self._extract_feature_importance(row, names) for row in matrix]
+            
+            return probabilities, [
+                self._generate_feature_importance_fallback(X.iloc[[i]]) for i in range(len(X))
+            ]
+    
+    def _prediction_result(self, student_data: Dict, dropout_probability: float,
+                           feature_importance: Dict[str, float]) -> Dict[str, Any]:
+        """Assemble the response for one scored student"""
+        # Determine risk level
+        risk_level = self._determine_risk_level(dropout_probability)
+        
+        # Generate risk explanation
+        with span('explanation'):
+            risk_explanation = self._generate_risk_explanation(
+                student_data, dropout_probability, feature_importance
+            )
+        
+        return {
+            'dropout_probability': float(dropout_probability),
+            'risk_level': risk_level,
+            'risk_score': int(dropout_probability * 100),
+            'dropout_prediction': bool(dropout_probability > 0.5),
+            'feature_importance': feature_importance,
+            'risk_explanation': risk_explanation,
+            'model_version': self.model_version,
+            'shap_available': self.shap_available,
+            'prediction_timestamp': datetime.now().isoformat(),
+            'data_source': 'REAL_ML_MODEL'
+        }
+    
     def predict_dropout_risk(self, student_data: Dict) -> Dict[str, Any]:
         """Make real dropout risk prediction using trained model"""
         try:
             if self.model is None:
                 return self._fallback_prediction(student_data)
             
-            # Preprocess the data
-            processed_data = self.preprocess_student_data(student_data)
-            
-            # Make prediction
-            if hasattr(self.ml_model, 'predict_proba'):
-                dropout_probability = self.ml_model.predict_proba(processed_data)[0][1]
+            with span('preprocess'):
+                X = self._encode_students([student_data])
+                feature_key = self._feature_key(X)
+            with span('explanation_store'):
+                stored = self._stored_explanation(student_data, feature_key)
+            if stored is not None:
+                probability, importance = stored
             else:
-                dropout_probability = self.model.predict_proba(processed_data)[0][1]
-            
-            # Generate SHAP explanation if available
-            shap_values = None
-            feature_importance = None
-            
-            if self.explainer is not None:
-                try:
-                    shap_values = self.explainer.shap_values(processed_data)
-                    feature_importance = self._extract_feature_importance(shap_values, processed_data)
-                except Exception as e:
-                    print(f"Warning: Could not generate SHAP explanation: {e}")
-                    feature_importance = self._generate_feature_importance_fallback(processed_data)
-            else:
-                feature_importance = self._generate_feature_importance_fallback(processed_data)
-            
-            # Determine risk level
-            risk_level = self._determine_risk_level(dropout_probability)
-            
-            # Generate risk explanation
-            risk_explanation = self._generate_risk_explanation(
-                student_data, dropout_probability, feature_importance
-            )
-            
-            return {
-                'dropout_probability': float(dropout_probability),
-                'risk_level': risk_level,
-                'risk_score': int(dropout_probability * 100),
-                'dropout_prediction': dropout_probability > 0.5,
-                'feature_importance': feature_importance,
-                'risk_explanation': risk_explanation,
-                'model_version': 'xgboost_real_v1.0',
-                'shap_available': self.explainer is not None,
-                'prediction_timestamp': datetime.now().isoformat(),
-                'data_source': 'REAL_ML_MODEL'
-            }
+                probability, importance = self.single_flight.do(
+                    feature_key, lambda: self._score_single(X)
+                )
+            return self._prediction_result(student_data, probability, dict(importance))
             
         except Exception as e:
-            print(f"Error in real prediction: {e}")
+            logger.error("Error in real prediction: %s", e)
             return self._fallback_prediction(student_data)
     
-    def _extract_feature_importance(self, shap_values: np.ndarray, processed_data: pd.DataFrame) -> Dict[str, float]:
-        """Extract feature importance from SHAP values"""
+    def _feature_key(self, X: pd.DataFrame) -> str:
+        """Identity of a one-row encoded feature vector under the active model"""
+        return feature_fingerprints(X, self.model_version)[0]
+    
+    def _stored_explanation(self, student_data: Dict, feature_key: str):
+        """Precomputed (probability, importance) for an unchanged student, else None"""
+        store = self.explanation_store
+        if store is None or 'StudentID' not in student_data:
+            return None
+        stored = store.lookup(student_data['StudentID'], feature_key)
+        if stored is None:
+            return None
+        probability, contributions = stored
+        return probability, self._extract_feature_importance(contributions, store.feature_names)
+    
+    def _score_single(self, X: pd.DataFrame):
+        """Probability and feature importance for a one-row matrix"""
+        probabilities, importances = self._score_matrix(X)
+        return float(probabilities[0]), importances[0]
+    
+    def predict_batch(self, students_data: List[Dict]) -> List[Dict[str, Any]]:
+        """
+        Score many students with one encode, one predict and one explanation call
+        
+        Falls back to per-student scoring if the batch as a whole fails.
+        """
+        if not students_data:
+            return []
+        
         try:
-            if len(shap_values.shape) > 1:
-                shap_values = shap_values[0]  # Get first sample
-            
-            importance_dict = {}
-            for i, feature in enumerate(processed_data.columns):
-                if i < len(shap_values):
-                    importance_dict[feature] = float(abs(shap_values[i]))
-            
-            # Sort by importance
-            sorted_importance = dict(sorted(importance_dict.items(), key=lambda x: x[1], reverse=True))
-            return sorted_importance
+            if self.model is None:
+                raise RuntimeError("Model not loaded")
             
+            with span('preprocess'):
+                X = self._encode_students(students_data)
+            probabilities, importances = self._score_matrix(X)
         except Exception as e:
-            print(f"Error extracting feature importance: {e}")
-            return self._generate_feature_importance_fallback(processed_data)
+            logger.error("Error in batch prediction, scoring students individually: %s", e)
+            results = [self.predict_dropout_risk(s) for s in students_data]
+        else:
+            results = [
+                self._prediction_result(student, probability, importance)
+                for student, probability, importance in zip(students_data, probabilities, importances)
+            ]
+        
+        for student, result in zip(students_data, results):
+            result['student_id'] = student.get('StudentID', 'unknown')
+        return results
+    
+    @staticmethod
+    def _positive_class_shap(shap_values) -> np.ndarray:
+        """Normalize TreeExplainer output to a (rows, features) matrix for the dropout class"""
+        if isinstance(shap_values, list):
+            return np.asarray(shap_values[-1])
+        shap_values = np.asarray(shap_values)
+        if shap_values.ndim == 3:
+            return shap_values[:, :, -1]
+        return shap_values
+    
+    def _extract_feature_importance(self, contributions: np.ndarray, feature_names: List[str]) -> Dict[str, float]:
+        """Turn one row of SHAP / pred_contribs values into a sorted importance dict"""
+        importance_dict = {
+            feature: float(abs(value)) for feature, value in zip(feature_names, contributions)
+        }
+        
+        # Sort by importance
+        return dict(sorted(importance_dict.items(), key=lambda x: x[1], reverse=True))
     
     def _generate_feature_importance_fallback(self, processed_data: pd.DataFrame) -> Dict[str, float]:
         """Generate feature importance when SHAP is not available"""
@@ -250,7 +530,10 @@ class RealMLService:
         
         for feature in top_features:
             importance = feature_importance[feature]
-            value = student_data.get(feature, 'Unknown')
+            if feature not in student_data:
+                # Feature was not sent (the model saw it as missing), nothing to explain
+                continue
+            value = student_data[feature]
             
             if feature == 'AvgAttendance_LatestTerm':
                 if float(value) < 75:
@@ -292,7 +575,7 @@ class RealMLService:
     
     def _fallback_prediction(self, student_data: Dict) -> Dict[str, Any]:
         """Fallback prediction when real model is not available"""
-        print("Using fallback prediction - real model not available")
+        logger.warning("Using fallback prediction - real model not available")
         
         # Simple heuristic-based prediction
         attendance = float(student_data.get('AvgAttendance_LatestTerm', 85))
@@ -330,59 +613,112 @@ class RealMLService:
             'data_source': 'FALLBACK_ALGORITHM'
         }
 
+# Admission priority per POST route; other routes are not queued
+ADMISSION_CLASSES = {
+    '/risk-assessment': INTERACTIVE,
+    '/predict': INTERACTIVE,
+    '/predict/batch': BULK,
+    '/predict/cascade': BULK,
+    '/what-if': BULK
+}
+
 class MLServiceHTTPHandler(BaseHTTPRequestHandler):
     """HTTP handler for the real ML service"""
     
-    def __init__(self, *args, **kwargs):
-        self.ml_service = RealMLService()
-        super().__init__(*args, **kwargs)
+    # One service per process, shared by every request thread
+    ml_service = None
+    admission = AdmissionController()
     
     def do_GET(self):
         """Handle GET requests"""
         parsed_path = urlparse(self.path)
         
         if parsed_path.path == '/health':
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            
             response = {
                 'status': 'healthy',
                 'service': 'EduAnalytics Real ML Service',
                 'model_loaded': self.ml_service.model is not None,
-                'shap_available': self.ml_service.explainer is not None,
+                'backend': self.ml_service.backend or 'fallback',
+                'shap_available': self.ml_service.shap_available,
+                'explanation_method': self.ml_service.explanation_method,
+                'single_flight': self.ml_service.single_flight.stats(),
+                'admission': self.admission.stats(),
+                'logging': logging_stats(),
+                'explanation_store': (
+                    self.ml_service.explanation_store.stats()
+                    if self.ml_service.explanation_store is not None else None
+                ),
+                'memory': process_memory_usage(),
                 'timestamp': datetime.now().isoformat()
             }
             
-            self.wfile.write(json.dumps(response).encode())
+            self._send_json_response(response)
         
         elif parsed_path.path == '/model-info':
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            
             response = {
-                'model_type': 'XGBoost' if self.ml_service.model is not None else 'Fallback',
+                'model_type': {
+                    'xgboost': 'XGBoost',
+                    'random_forest': 'RandomForest'
+                }.get(self.ml_service.backend, 'Fallback'),
+                'model_version': self.ml_service.model_version,
                 'features': self.ml_service.feature_columns,
-                'shap_available': self.ml_service.explainer is not None,
+                'shap_available': self.ml_service.shap_available,
+                'explanation_method': self.ml_service.explanation_method,
                 'version': 'real_v1.0'
             }
             
-            self.wfile.write(json.dumps(response).encode())
+            self._send_json_response(response)
         
         else:
             self.send_response(404)
             self.end_headers()
     
     def do_POST(self):
-        """Handle POST requests"""
+        """
+        Handle POST requests, admitted by priority (503 + Retry-After when saturated)
+        
+        Every request is traced under the caller's X-Request-ID; stage timings are
+        returned in Server-Timing and written to ML_TRACE_FILE when set.
+        """
+        trace = start_trace(request_id_from_headers(self.headers), self.path)
+        self._status_code = None
+        try:
+            self._admit_post()
+        finally:
+            end_trace(trace, self._status_code)
+    
+    def _admit_post(self):
+        priority = ADMISSION_CLASSES.get(self.path)
+        if priority is None:
+            self._route_post()
+            return
+        try:
+            with span('admission'):
+                self.admission.acquire(priority)
+        except Overloaded as e:
+            # Drain the upload so the client reads the 503 instead of a reset connection
+            if not discard_body(self.headers, self.rfile):
+                self.close_connection = True
+            self._send_json_response({'error': 'Service overloaded', 'message': str(e)}, status_code=503,
+                                     headers={'Retry-After': str(e.retry_after)})
+            return
+        try:
+            self._route_post()
+        finally:
+            self.admission.release(priority)
+    
+    def _route_post(self):
         if self.path == '/risk-assessment':
             self.handle_risk_assessment()
         elif self.path == '/predict':
             # Redirect /predict to /risk-assessment for compatibility
             self.handle_risk_assessment()
+        elif self.path == '/predict/batch':
+            self.handle_batch_prediction()
+        elif self.path == '/predict/cascade':
+            self.handle_cascade_prediction()
+        elif self.path == '/what-if':
+            self.handle_what_if()
         else:
             self.send_response(404)
             self.end_headers()
@@ -390,9 +726,7 @@ class MLServiceHTTPHandler(BaseHTTPRequestHandler):
     def handle_risk_assessment(self):
         """Handle risk assessment requests"""
         try:
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            request_data = json.loads(post_data.decode('utf-8'))
+            request_data = read_json(self.headers, self.rfile)
             
             # Extract student data
             if 'student_data' in request_data:
@@ -404,49 +738,176 @@ class MLServiceHTTPHandler(BaseHTTPRequestHandler):
             prediction_result = self.ml_service.predict_dropout_risk(student_data)
             
             # Send response
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            
-            self.wfile.write(json.dumps(prediction_result).encode())
+            self._send_json_response(prediction_result)
             
+        except (RequestTooLarge, BadRequestBody) as e:
+            self._send_request_error(e)
         except Exception as e:
-            print(f"Error handling risk assessment: {e}")
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
+            logger.exception("Error handling risk assessment: %s", e)
+            error_response = {
+                'error': 'Internal server error',
+                'message': str(e)
+            }
+            self._send_json_response(error_response, status_code=500)
+    
+    def handle_batch_prediction(self):
+        """Handle batch prediction requests ({"students_data": [...]})"""
+        try:
+            # Decode and score the students a chunk at a time instead of holding the whole body
+            students = JSONArrayStream(iter_body(self.headers, self.rfile), 'students_data')
+            predictions = []
+            for chunk in iter_chunks(iter_objects(students, 'students_data')):
+                predictions.extend(self.ml_service.predict_batch(chunk))
+            if 'students_data' in students.fields:
+                raise BadRequestBody("students_data must be an array")
+            
+            self._send_json_response({
+                'predictions': predictions,
+                'total_students': len(predictions),
+                'model_version': self.ml_service.model_version
+            })
+            
+        except (RequestTooLarge, BadRequestBody) as e:
+            self._send_request_error(e)
+        except Exception as e:
+            logger.exception("Error handling batch prediction: %s", e)
+            error_response = {
+                'error': 'Internal server error',
+                'message': str(e)
+            }
+            self._send_json_response(error_response, status_code=500)
+    
+    def handle_cascade_prediction(self):
+        """Handle cascade batch requests ({"students_data": [...], "band": [low, high]})"""
+        try:
+            request_data = read_json(self.headers, self.rfile)
+            if not isinstance(request_data, dict):
+                raise BadRequestBody("Expected a JSON object body")
+            
+            students_data = request_data.get('students_data', [])
+            if not isinstance(students_data, list):
+                raise BadRequestBody("students_data must be an array")
+            students_data = list(iter_objects(students_data, 'students_data'))
+            try:
+                low, high = (float(v) for v in request_data.get('band', CASCADE_BAND))
+            except (TypeError, ValueError):
+                raise BadRequestBody("band must be a [low, high] pair of numbers")
+            result = CascadeScorer(self.ml_service, (low, high)).score(students_data)
+            
+            self._send_json_response({
+                'predictions': result['predictions'],
+                'total_students': len(result['predictions']),
+                'cascade': result['stages'],
+                'model_version': self.ml_service.model_version
+            })
+            
+        except (RequestTooLarge, BadRequestBody) as e:
+            self._send_request_error(e)
+        except Exception as e:
+            logger.exception("Error handling cascade prediction: %s", e)
+            error_response = {
+                'error': 'Internal server error',
+                'message': str(e)
+            }
+            self._send_json_response(error_response, status_code=500)
+    
+    def handle_what_if(self):
+        """
+        Handle what-if requests
+        ({"students_data": [...] or "student_data": {...}, "interventions": [...], "grid": {...}})
+        """
+        try:
+            request_data = read_json(self.headers, self.rfile)
+            
+            if 'students_data' in request_data:
+                students_data = request_data['students_data']
+            else:
+                students_data = [request_data.get('student_data', {})]
             
+            result = simulate_what_if(
+                self.ml_service, students_data,
+                interventions=request_data.get('interventions'),
+                grid=request_data.get('grid')
+            )
+            self._send_json_response(result)
+            
+        except (RequestTooLarge, BadRequestBody) as e:
+            self._send_request_error(e)
+        except ValueError as e:
+            self._send_json_response({'error': 'Invalid what-if request', 'message': str(e)}, status_code=400)
+        except Exception as e:
+            logger.exception("Error handling what-if request: %s", e)
             error_response = {
                 'error': 'Internal server error',
                 'message': str(e)
             }
-            self.wfile.write(json.dumps(error_response).encode())
+            self._send_json_response(error_response, status_code=500)
+    
+    def _send_request_error(self, error):
+        """413 for oversized bodies, 400 for malformed ones"""
+        if isinstance(error, RequestTooLarge):
+            # The rest of the body was never read, so the connection cannot be reused
+            self.close_connection = True
+            self._send_json_response({'error': 'Request body too large', 'message': str(error)},
+                                     status_code=413, headers={'Connection': 'close'})
+        else:
+            self._send_json_response({'error': 'Invalid request body', 'message': str(error)}, status_code=400)
+    
+    def _send_json_response(self, data, status_code=200, headers=None):
+        """Send JSON response, compressed when the client accepts it and it is large enough"""
+        with span('serialize'):
+            body = json.dumps(data).encode()
+        encoding = negotiate_encoding(self.headers.get('Accept-Encoding'))
+        
+        self._status_code = status_code
+        self.send_response(status_code)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Expose-Headers', 'Server-Timing, X-Request-ID')
+        self.send_header('Vary', 'Accept-Encoding')
+        trace = current_trace()
+        if trace is not None:
+            for name, value in trace_headers(trace).items():
+                self.send_header(name, value)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if should_compress(len(body), encoding):
+            body = compress_body(body, encoding)
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        
+        self.wfile.write(body)
     
     def do_OPTIONS(self):
         """Handle CORS preflight requests"""
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, X-Request-ID, traceparent')
         self.end_headers()
 
 def start_real_ml_service(port=8001):
     """Start the real ML service"""
     try:
-        server = HTTPServer(('localhost', port), MLServiceHTTPHandler)
+        MLServiceHTTPHandler.ml_service = RealMLService()
+        server = ThreadingHTTPServer(('localhost', port), MLServiceHTTPHandler)
         print(f"🚀 Real ML Service starting on http://localhost:{port}")
         print("✅ Features:")
-        print("   - Real XGBoost model integration")
-        print("   - SHAP analysis for explanations")
+        print("   - Real XGBoost model integration (native pred_contribs)")
+        print("   - SHAP analysis for the RandomForest fallback")
         print("   - Feature importance extraction")
         print("   - Detailed risk explanations")
         print("   - Fallback for missing dependencies")
+        print("   - Concurrent identical requests share one computation")
         print("\n📡 Available endpoints:")
         print(f"   - GET  http://localhost:{port}/health")
         print(f"   - GET  http://localhost:{port}/model-info")
         print(f"   - POST http://localhost:{port}/risk-assessment")
         print(f"   - POST http://localhost:{port}/predict (redirects to risk-assessment)")
+        print(f"   - POST http://localhost:{port}/predict/batch")
+        print(f"   - POST http://localhost:{port}/predict/cascade")
+        print(f"   - POST http://localhost:{port}/what-if")
         print("\n🔄 Starting server...")
         
         server.serve_forever()
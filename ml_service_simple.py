@@ -2,17 +2,77 @@
 """
 Simplified ML Service for EduAnalytics Dashboard
 No external dependencies required - uses only Python standard library
+(ml_compression.py is a sibling stdlib-only module)
 """
 
 import json
 import math
 import random
 from datetime import datetime, timedelta
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 import threading
 import time
 
+from ml_compression import compress_body, negotiate_encoding, should_compress
+from ml_admission import BULK, INTERACTIVE, AdmissionController, Overloaded
+from ml_request_reader import RequestTooLarge, discard_body, read_json
+from ml_tracing import current_trace, end_trace, request_id_from_headers, span, start_trace, trace_headers
+
+# Share of the current dropout probability expected to materialise within each horizon
+TIMEFRAME_MULTIPLIERS = {
+    '1month': 0.1,
+    '3months': 0.3,
+    '6months': 0.6,
+    '1year': 1.0
+}
+DEFAULT_TIMEFRAME_MULTIPLIER = 0.6
+
+# (minimum risk score, risk level, dropout probability range)
+RISK_BANDS = [
+    (80, 'Critical', (0.7, 0.95)),
+    (60, 'High', (0.4, 0.7)),
+    (40, 'Medium', (0.2, 0.4)),
+    (0, 'Low', (0.05, 0.2))
+]
+
+def _risk_band(risk_score):
+    """Risk level and dropout probability range for a 0-100 risk score"""
+    for minimum, risk_level, probability_range in RISK_BANDS:
+        if risk_score >= minimum:
+            return risk_level, probability_range
+    return RISK_BANDS[-1][1], RISK_BANDS[-1][2]
+
+# Interventions by type, recommended according to _recommendation_types
+RECOMMENDATIONS = {
+    'attendance_intervention': {
+        'priority': 'high',
+        'description': 'Implement attendance tracking and parental notifications',
+        'estimated_effectiveness': 0.8
+    },
+    'academic_support': {
+        'priority': 'high',
+        'description': 'Provide tutoring and study resources',
+        'estimated_effectiveness': 0.75
+    },
+    'counseling': {
+        'priority': 'critical',
+        'description': 'Individual counseling and mentorship',
+        'estimated_effectiveness': 0.85
+    }
+}
+
+def _recommendation_types(risk_level, attendance, performance):
+    """Intervention types a student's risk level and scores call for"""
+    types = []
+    if attendance < 75:
+        types.append('attendance_intervention')
+    if performance < 60:
+        types.append('academic_support')
+    if risk_level in ('High', 'Critical'):
+        types.append('counseling')
+    return types
+
 class MLService:
     """Simplified ML service for risk assessment and predictions"""
     
@@ -25,50 +85,46 @@ class MLService:
             'family': 0.1
         }
     
+    def _assess(self, attendance, performance):
+        """
+        Weighted risk of one student, shared by calculate_risk_score and assess_batch
+        
+        Returns:
+            Tuple of (risk_score 0-100, risk_level, dropout_probability 0-1,
+            (attendance, performance, behavior, socioeconomic, family) risks 0-1)
+        """
+        weights = self.risk_weights
+        
+        # Normalize scores (higher is better) and invert them into risks
+        attendance_risk = (100 - max(0, min(100, attendance))) / 100
+        performance_risk = (100 - max(0, min(100, performance))) / 100
+        
+        # Add some randomness for realistic variation
+        behavior_risk = random.uniform(0.1, 0.4)
+        socioeconomic_risk = random.uniform(0.2, 0.6)
+        family_risk = random.uniform(0.1, 0.3)
+        
+        # Weighted risk calculation, converted to a 0-100 scale
+        total_risk = (
+            attendance_risk * weights['attendance'] +
+            performance_risk * weights['performance'] +
+            behavior_risk * weights['behavior'] +
+            socioeconomic_risk * weights['socioeconomic'] +
+            family_risk * weights['family']
+        )
+        risk_score = min(100, max(0, total_risk * 100))
+        
+        risk_level, probability_range = _risk_band(risk_score)
+        factors = (attendance_risk, performance_risk, behavior_risk, socioeconomic_risk, family_risk)
+        return risk_score, risk_level, random.uniform(*probability_range), factors
+    
     def calculate_risk_score(self, student_data):
         """Calculate risk score based on student data"""
         try:
             attendance = float(student_data.get('attendance', 85))
             performance = float(student_data.get('performance', 70))
-            
-            # Normalize scores (higher is better)
-            attendance_score = max(0, min(100, attendance))
-            performance_score = max(0, min(100, performance))
-            
-            # Calculate base risk (inverted scores)
-            attendance_risk = (100 - attendance_score) / 100
-            performance_risk = (100 - performance_score) / 100
-            
-            # Add some randomness for realistic variation
-            behavior_risk = random.uniform(0.1, 0.4)
-            socioeconomic_risk = random.uniform(0.2, 0.6)
-            family_risk = random.uniform(0.1, 0.3)
-            
-            # Weighted risk calculation
-            total_risk = (
-                attendance_risk * self.risk_weights['attendance'] +
-                performance_risk * self.risk_weights['performance'] +
-                behavior_risk * self.risk_weights['behavior'] +
-                socioeconomic_risk * self.risk_weights['socioeconomic'] +
-                family_risk * self.risk_weights['family']
-            )
-            
-            # Convert to 0-100 scale
-            risk_score = min(100, max(0, total_risk * 100))
-            
-            # Determine risk level
-            if risk_score >= 80:
-                risk_level = 'Critical'
-                dropout_probability = random.uniform(0.7, 0.95)
-            elif risk_score >= 60:
-                risk_level = 'High'
-                dropout_probability = random.uniform(0.4, 0.7)
-            elif risk_score >= 40:
-                risk_level = 'Medium'
-                dropout_probability = random.uniform(0.2, 0.4)
-            else:
-                risk_level = 'Low'
-                dropout_probability = random.uniform(0.05, 0.2)
+            risk_score, risk_level, dropout_probability, factors = self._assess(attendance, performance)
+            attendance_risk, performance_risk, behavior_risk, socioeconomic_risk, family_risk = factors
             
             return {
                 'risk_score': round(risk_score, 1),
@@ -93,60 +149,87 @@ class MLService:
     
     def _get_recommendations(self, risk_level, attendance, performance):
         """Generate intervention recommendations"""
-        recommendations = []
-        
-        if attendance < 75:
-            recommendations.append({
-                'type': 'attendance_intervention',
-                'priority': 'high',
-                'description': 'Implement attendance tracking and parental notifications',
-                'estimated_effectiveness': 0.8
-            })
-        
-        if performance < 60:
-            recommendations.append({
-                'type': 'academic_support',
-                'priority': 'high',
-                'description': 'Provide tutoring and study resources',
-                'estimated_effectiveness': 0.75
-            })
+        return [
+            {'type': kind, **RECOMMENDATIONS[kind]}
+            for kind in _recommendation_types(risk_level, attendance, performance)
+        ]
+    
+    def assess_batch(self, students_data):
+        """
+        Columnar risk assessment for a whole cohort
+
+        Computes only what dropout predictions need, once per student, so every
+        requested timeframe can be derived from the same pass.
+
+        Returns:
+            Dict of equal-length lists: risk_score, risk_level, dropout_probability
+            (0-100) and interventions_needed
+        """
+        assess = self._assess
+        recommendation_types = _recommendation_types
+        columns = {'risk_score': [], 'risk_level': [], 'dropout_probability': [], 'interventions_needed': []}
         
-        if risk_level in ['High', 'Critical']:
-            recommendations.append({
-                'type': 'counseling',
-                'priority': 'critical',
-                'description': 'Individual counseling and mentorship',
-                'estimated_effectiveness': 0.85
-            })
+        for student in students_data:
+            try:
+                attendance = float(student.get('attendance', 85))
+                performance = float(student.get('performance', 70))
+            except (TypeError, ValueError):
+                # Same fallback calculate_risk_score reports for unreadable records
+                columns['risk_score'].append(50)
+                columns['risk_level'].append('Medium')
+                columns['dropout_probability'].append(25)
+                columns['interventions_needed'].append(0)
+                continue
+            
+            risk_score, risk_level, dropout_probability, _ = assess(attendance, performance)
+            columns['risk_score'].append(round(risk_score, 1))
+            columns['risk_level'].append(risk_level)
+            columns['dropout_probability'].append(round(dropout_probability * 100, 1))
+            columns['interventions_needed'].append(len(recommendation_types(risk_level, attendance, performance)))
         
-        return recommendations
+        return columns
     
     def predict_dropouts(self, students_data, timeframe='6months'):
-        """Predict dropout probability for multiple students"""
-        predictions = []
+        """
+        Predict dropout probability for multiple students
         
-        for student in students_data:
-            risk_assessment = self.calculate_risk_score(student)
-            
-            # Adjust prediction based on timeframe
-            timeframe_multiplier = {
-                '1month': 0.1,
-                '3months': 0.3,
-                '6months': 0.6,
-                '1year': 1.0
-            }.get(timeframe, 0.6)
-            
-            predicted_dropout = risk_assessment['dropout_probability'] * timeframe_multiplier
-            
-            predictions.append({
+        Args:
+            students_data: List of student records
+            timeframe: A single timeframe ('6months') or a list of timeframes,
+                all derived from one assessment per student
+        
+        Returns:
+            One prediction per student; with a list of timeframes each prediction
+            has a 'horizons' dict of timeframe -> predicted dropout probability
+        """
+        single = isinstance(timeframe, str)
+        timeframes = [timeframe] if single else list(timeframe)
+        assessment = self.assess_batch(students_data)
+        
+        horizons = {
+            tf: [
+                round(probability * TIMEFRAME_MULTIPLIERS.get(tf, DEFAULT_TIMEFRAME_MULTIPLIER), 1)
+                for probability in assessment['dropout_probability']
+            ]
+            for tf in timeframes
+        }
+        
+        predictions = []
+        for i, student in enumerate(students_data):
+            prediction = {
                 'student_id': student.get('id', 'unknown'),
                 'student_name': student.get('name', 'Unknown'),
-                'current_risk_level': risk_assessment['risk_level'],
-                'predicted_dropout_probability': round(predicted_dropout, 1),
-                'confidence': random.uniform(0.7, 0.95),
-                'timeframe': timeframe,
-                'interventions_needed': len(risk_assessment['recommendations'])
-            })
+                'current_risk_level': assessment['risk_level'][i]
+            }
+            if single:
+                prediction['predicted_dropout_probability'] = horizons[timeframe][i]
+                prediction['confidence'] = random.uniform(0.7, 0.95)
+                prediction['timeframe'] = timeframe
+            else:
+                prediction['horizons'] = {tf: horizons[tf][i] for tf in timeframes}
+                prediction['confidence'] = random.uniform(0.7, 0.95)
+            prediction['interventions_needed'] = assessment['interventions_needed'][i]
+            predictions.append(prediction)
         
         return predictions
     
@@ -214,9 +297,19 @@ class MLService:
         
         return recommendations
 
+# Admission priority per POST route
+ADMISSION_CLASSES = {
+    '/risk-assessment': INTERACTIVE,
+    '/predict-dropouts': BULK,
+    '/generate-insights': BULK
+}
+
 class MLRequestHandler(BaseHTTPRequestHandler):
     """HTTP request handler for ML service"""
     
+    # Shared by every request thread
+    admission = AdmissionController()
+    
     def __init__(self, *args, **kwargs):
         self.ml_service = MLService()
         super().__init__(*args, **kwargs)
@@ -228,7 +321,11 @@ class MLRequestHandler(BaseHTTPRequestHandler):
         query_params = parse_qs(parsed_path.query)
         
         if path == '/health':
-            self._send_json_response({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
+            self._send_json_response({
+                'status': 'healthy',
+                'admission': self.admission.stats(),
+                'timestamp': datetime.now().isoformat()
+            })
         elif path == '/predictions':
             self._handle_predictions(query_params)
         elif path == '/insights':
@@ -237,10 +334,38 @@ class MLRequestHandler(BaseHTTPRequestHandler):
             self._send_error(404, 'Endpoint not found')
     
     def do_POST(self):
-        """Handle POST requests"""
-        parsed_path = urlparse(self.path)
-        path = parsed_path.path
-        
+        """
+        Handle POST requests, admitted by priority (503 + Retry-After when saturated)
+        and traced under the caller's X-Request-ID (see ml_tracing.py)
+        """
+        path = urlparse(self.path).path
+        trace = start_trace(request_id_from_headers(self.headers), path)
+        self._status_code = None
+        try:
+            self._admit_post(path)
+        finally:
+            end_trace(trace, self._status_code)
+    
+    def _admit_post(self, path):
+        priority = ADMISSION_CLASSES.get(path)
+        if priority is None:
+            self._route_post(path)
+            return
+        try:
+            with span('admission'):
+                self.admission.acquire(priority)
+        except Overloaded as e:
+            # Drain the upload so the client reads the 503 instead of a reset connection
+            if not discard_body(self.headers, self.rfile):
+                self.close_connection = True
+            self._send_error(503, str(e), headers={'Retry-After': str(e.retry_after)})
+            return
+        try:
+            self._route_post(path)
+        finally:
+            self.admission.release(priority)
+    
+    def _route_post(self, path):
         if path == '/risk-assessment':
             self._handle_risk_assessment()
         elif path == '/predict-dropouts':
@@ -251,8 +376,11 @@ class MLRequestHandler(BaseHTTPRequestHandler):
             self._send_error(404, 'Endpoint not found')
     
     def _handle_predictions(self, query_params):
-        """Handle predictions endpoint"""
-        timeframe = query_params.get('timeframe', ['6months'])[0]
+        """Handle predictions endpoint (?timeframe=6months or ?timeframes=1month,3months,6months,1year)"""
+        if 'timeframes' in query_params:
+            timeframe = [tf for tf in query_params['timeframes'][0].split(',') if tf]
+        else:
+            timeframe = query_params.get('timeframe', ['6months'])[0]
         
         # Mock student data for demonstration
         mock_students = [
@@ -265,7 +393,7 @@ class MLRequestHandler(BaseHTTPRequestHandler):
         self._send_json_response({
             'success': True,
             'data': predictions,
-            'timeframe': timeframe,
+            self._timeframe_key(timeframe): timeframe,
             'timestamp': datetime.now().isoformat()
         })
     
@@ -290,74 +418,95 @@ class MLRequestHandler(BaseHTTPRequestHandler):
     def _handle_risk_assessment(self):
         """Handle risk assessment POST request"""
         try:
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            student_data = json.loads(post_data.decode('utf-8'))
+            student_data = read_json(self.headers, self.rfile)
             
-            risk_assessment = self.ml_service.calculate_risk_score(student_data)
+            with span('scoring'):
+                risk_assessment = self.ml_service.calculate_risk_score(student_data)
             
             self._send_json_response({
                 'success': True,
                 'data': risk_assessment,
                 'timestamp': datetime.now().isoformat()
             })
+        except RequestTooLarge as e:
+            self._send_too_large(e)
         except Exception as e:
             self._send_error(400, f'Invalid request: {str(e)}')
     
     def _handle_predict_dropouts(self):
         """Handle predict dropouts POST request"""
         try:
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            request_data = json.loads(post_data.decode('utf-8'))
+            request_data = read_json(self.headers, self.rfile)
             
             students_data = request_data.get('students', [])
-            timeframe = request_data.get('timeframe', '6months')
+            # "timeframes": [...] scores every horizon in one pass
+            timeframe = request_data.get('timeframes') or request_data.get('timeframe', '6months')
             
-            predictions = self.ml_service.predict_dropouts(students_data, timeframe)
+            with span('scoring'):
+                predictions = self.ml_service.predict_dropouts(students_data, timeframe)
             
             self._send_json_response({
                 'success': True,
                 'data': predictions,
-                'timeframe': timeframe,
+                self._timeframe_key(timeframe): timeframe,
                 'timestamp': datetime.now().isoformat()
             })
+        except RequestTooLarge as e:
+            self._send_too_large(e)
         except Exception as e:
             self._send_error(400, f'Invalid request: {str(e)}')
     
     def _handle_generate_insights(self):
         """Handle generate insights POST request"""
         try:
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            request_data = json.loads(post_data.decode('utf-8'))
+            request_data = read_json(self.headers, self.rfile)
             
             students_data = request_data.get('students', [])
-            insights = self.ml_service.generate_insights(students_data)
+            with span('scoring'):
+                insights = self.ml_service.generate_insights(students_data)
             
             self._send_json_response({
                 'success': True,
                 'data': insights,
                 'timestamp': datetime.now().isoformat()
             })
+        except RequestTooLarge as e:
+            self._send_too_large(e)
         except Exception as e:
             self._send_error(400, f'Invalid request: {str(e)}')
     
+    @staticmethod
+    def _timeframe_key(timeframe):
+        return 'timeframe' if isinstance(timeframe, str) else 'timeframes'
+    
     def _send_json_response(self, data):
-        """Send JSON response"""
+        """Send JSON response, compressed when the client accepts it and it is large enough"""
+        with span('serialize'):
+            body = json.dumps(data, indent=2).encode('utf-8')
+        encoding = negotiate_encoding(self.headers.get('Accept-Encoding'))
+        
         self.send_response(200)
         self.send_header('Content-Type', 'application/json')
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, X-Request-ID, traceparent')
+        self.send_header('Vary', 'Accept-Encoding')
+        self._send_trace_headers(200)
+        if should_compress(len(body), encoding):
+            body = compress_body(body, encoding)
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
         self.end_headers()
-        self.wfile.write(json.dumps(data, indent=2).encode('utf-8'))
+        self.wfile.write(body)
     
-    def _send_error(self, status_code, message):
+    def _send_error(self, status_code, message, headers=None):
         """Send error response"""
         self.send_response(status_code)
         self.send_header('Content-Type', 'application/json')
         self.send_header('Access-Control-Allow-Origin', '*')
+        self._send_trace_headers(status_code)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
         self.end_headers()
         error_response = {
             'success': False,
@@ -366,18 +515,33 @@ class MLRequestHandler(BaseHTTPRequestHandler):
         }
         self.wfile.write(json.dumps(error_response).encode('utf-8'))
     
+    def _send_too_large(self, error):
+        """413 for an oversized body; its unread remainder means the connection cannot be reused"""
+        self.close_connection = True
+        self._send_error(413, str(error), headers={'Connection': 'close'})
+    
+    def _send_trace_headers(self, status_code):
+        """Request ID and Server-Timing for traced (POST) requests"""
+        self._status_code = status_code
+        trace = current_trace()
+        if trace is not None:
+            self.send_header('Access-Control-Expose-Headers', 'Server-Timing, X-Request-ID')
+            for name, value in trace_headers(trace).items():
+                self.send_header(name, value)
+    
     def do_OPTIONS(self):
         """Handle CORS preflight requests"""
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, X-Request-ID, traceparent')
         self.end_headers()
 
 def start_ml_service(port=8001):
     """Start the ML service server"""
     server_address = ('', port)
-    httpd = HTTPServer(server_address, MLRequestHandler)
+    # One thread per request; ml_admission bounds how many actually run
+    httpd = ThreadingHTTPServer(server_address, MLRequestHandler)
     
     print(f"🚀 Starting Simplified ML Service on http://localhost:{port}")
     print(f"📊 Health Check: http://localhost:{port}/health")
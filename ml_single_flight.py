@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Single-flight request coalescing for EduAnalytics
+Concurrent callers asking for the same key wait on one computation and share its result
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    """One in-flight computation and the callers waiting on it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Deduplicate identical in-flight work across threads
+
+    The first caller for a key runs the function; callers arriving while it runs
+    block until it finishes and receive the same result (or exception). Nothing
+    is cached afterwards, so the next call for the key computes again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn for key unless an identical call is already in flight
+
+        Args:
+            key: Identity of the computation
+            fn: Zero-argument function producing the result
+
+        Returns:
+            fn's result, shared with every concurrent caller for key
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+            else:
+                call.waiters += 1
+                leader = False
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                self.executed += 1
+                self.coalesced += call.waiters
+            call.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for health endpoints"""
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'executed': self.executed,
+                'coalesced': self.coalesced
+            }
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Per-request tracing for the EduAnalytics ML services
+Each request carries a request ID (taken from the caller's X-Request-ID or
+W3C traceparent header, generated otherwise) and records timed spans for its
+internal stages. Spans are returned to the caller as a Server-Timing header
+and, when ML_TRACE_FILE is set, appended to that file as one NDJSON line per
+request for offline analysis.
+Standard library only, so ml_service_simple.py can use it too.
+"""
+
+import contextvars
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+REQUEST_ID_HEADER = "X-Request-ID"
+TRACEPARENT_HEADER = "traceparent"
+SERVER_TIMING_HEADER = "Server-Timing"
+
+# NDJSON span log; unset disables it
+TRACE_FILE = os.environ.get("ML_TRACE_FILE")
+
+# Spans kept per request; batch stages repeat per row, so later ones only count toward totals
+MAX_SPANS = int(os.environ.get("ML_TRACE_MAX_SPANS", "256"))
+
+# Caller-supplied IDs are echoed back in headers and logs, so only accept tame ones
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+_TRACEPARENT_PATTERN = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-[0-9a-f]{16}-[0-9a-f]{2}$")
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("ml_trace", default=None)
+
+
+def request_id_from_headers(headers) -> str:
+    """
+    Request ID for an incoming request
+
+    Args:
+        headers: Any mapping with a case-insensitive get (http.server or Starlette headers)
+
+    Returns:
+        The caller's X-Request-ID, else the trace ID of its traceparent, else a new ID
+    """
+    request_id = (headers.get(REQUEST_ID_HEADER) or "").strip()
+    if _REQUEST_ID_PATTERN.match(request_id):
+        return request_id
+    match = _TRACEPARENT_PATTERN.match((headers.get(TRACEPARENT_HEADER) or "").strip().lower())
+    if match:
+        return match.group(1)
+    return uuid.uuid4().hex
+
+
+class Trace:
+    """Timed spans of one request"""
+
+    def __init__(self, request_id: str, route: str):
+        self.request_id = request_id
+        self.route = route
+        self.started_at = datetime.now().isoformat()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.spans: List[Dict[str, Any]] = []
+        self.dropped_spans = 0
+        # Summed milliseconds per span name, in first-seen order
+        self.totals: Dict[str, float] = {}
+        self.duration_ms: Optional[float] = None
+
+    @contextmanager
+    def span(self, name: str):
+        """Time the enclosed block as a span called name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            duration_ms = (end - start) * 1000
+            with self._lock:
+                self.totals[name] = self.totals.get(name, 0.0) + duration_ms
+                if len(self.spans) < MAX_SPANS:
+                    self.spans.append({
+                        "name": name,
+                        "start_ms": round((start - self._start) * 1000, 3),
+                        "duration_ms": round(duration_ms, 3)
+                    })
+                else:
+                    self.dropped_spans += 1
+
+    def finish(self) -> float:
+        """Stop the request clock; returns the total duration in milliseconds"""
+        if self.duration_ms is None:
+            self.duration_ms = round((time.perf_counter() - self._start) * 1000, 3)
+        return self.duration_ms
+
+    def server_timing(self) -> str:
+        """
+        Server-Timing header value: one metric per span name (repeated spans
+        are summed) followed by the request total
+        """
+        with self._lock:
+            metrics = [f"{name};dur={duration:.3f}" for name, duration in self.totals.items()]
+        metrics.append(f"total;dur={self.finish():.3f}")
+        return ", ".join(metrics)
+
+    def to_record(self, status_code: int) -> Dict[str, Any]:
+        return {
+            "request_id": self.request_id,
+            "route": self.route,
+            "status": status_code,
+            "started_at": self.started_at,
+            "duration_ms": self.finish(),
+            "totals_ms": {name: round(duration, 3) for name, duration in self.totals.items()},
+            "spans": list(self.spans),
+            "dropped_spans": self.dropped_spans
+        }
+
+
+class SpanWriter:
+    """Appends finished traces to an NDJSON file, one line per request"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, trace: Trace, status_code: int):
+        line = json.dumps(trace.to_record(status_code)) + "\n"
+        try:
+            with self._lock, open(self.path, "a") as f:
+                f.write(line)
+        except OSError as e:
+            # Imported here: ml_logging tags records using this module
+            from ml_logging import get_logger
+            get_logger("tracing").warning("Could not write trace to %s: %s", self.path, e)
+
+
+span_writer = SpanWriter(TRACE_FILE) if TRACE_FILE else None
+
+
+def start_trace(request_id: str, route: str) -> Trace:
+    """Begin tracing a request in the current context"""
+    trace = Trace(request_id, route)
+    _current_trace.set(trace)
+    return trace
+
+
+def end_trace(trace: Trace, status_code: int):
+    """Stop the request clock and write the trace when a span file is configured"""
+    trace.finish()
+    _current_trace.set(None)
+    if span_writer is not None:
+        span_writer.write(trace, status_code)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str):
+    """Time the enclosed block on the current request's trace (no-op outside a request)"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    with trace.span(name):
+        yield
+
+
+def trace_headers(trace: Trace) -> Dict[str, str]:
+    """Response headers that hand the request ID and stage timings back to the caller"""
+    return {
+        REQUEST_ID_HEADER: trace.request_id,
+        SERVER_TIMING_HEADER: trace.server_timing()
+    }
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+What-if simulation for EduAnalytics
+Expands students x interventions into one feature matrix, scores it in a single
+model call and reports how each intervention moves every student's risk
+"""
+
+import itertools
+import os
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+# Upper bound on students x scenarios rows scored per request
+WHAT_IF_MAX_ROWS = int(os.environ.get("ML_WHAT_IF_MAX_ROWS", "100000"))
+
+# Valid ranges perturbed numeric features are clipped to
+FEATURE_BOUNDS = {
+    "AvgAttendance_LatestTerm": (0, 100),
+    "AvgMarks_LatestTerm": (0, 100),
+    "AvgPastPerformance": (0, 100),
+    "FailureRate_LatestTerm": (0, 1),
+    "CommuteTimeMinutes": (0, None),
+    "FamilyAnnualIncome": (0, None),
+    "NumberOfSiblings": (0, None),
+}
+
+# The interventions _generate_risk_explanation recommends, used when none are given
+DEFAULT_INTERVENTIONS = [
+    {"name": "Attendance +10 points", "changes": {"AvgAttendance_LatestTerm": {"add": 10}}},
+    {"name": "Marks +10 points", "changes": {"AvgMarks_LatestTerm": {"add": 10}}},
+    {"name": "Stop part-time work", "changes": {"WorksPartTime": {"set": "FALSE"}}},
+    {"name": "Provide a laptop", "changes": {"HasOwnLaptop": {"set": "TRUE"}}},
+    {"name": "Provide reliable internet", "changes": {"HasReliableInternet": {"set": "TRUE"}}},
+]
+
+OPERATIONS = ("set", "add", "multiply")
+
+
+def _normalize_change(feature: str, change) -> Dict[str, Any]:
+    """Accept {"add": 10} style changes or a bare value meaning "set" """
+    if not isinstance(change, dict):
+        return {"set": change}
+    if len(change) != 1 or next(iter(change)) not in OPERATIONS:
+        raise ValueError(f"Change for {feature} must be one of {OPERATIONS}, got {change}")
+    return change
+
+
+def _describe(feature: str, change: Dict[str, Any]) -> str:
+    operation, value = next(iter(change.items()))
+    if operation == "add":
+        return f"{feature} {value:+g}"
+    if operation == "multiply":
+        return f"{feature} x{value:g}"
+    return f"{feature} = {value}"
+
+
+def expand_grid(grid: Dict[str, Dict[str, list]]) -> List[Dict[str, Any]]:
+    """
+    Turn a perturbation grid into interventions
+
+    Every feature may stay unchanged or take one of its options, so
+    ``{"AvgAttendance_LatestTerm": {"add": [10, 20]}, "WorksPartTime": {"set": ["FALSE"]}}``
+    yields 3 x 2 - 1 = 5 interventions (all combinations except "nothing changes").
+    """
+    per_feature = []
+    for feature, options in grid.items():
+        if not isinstance(options, dict):
+            options = {"set": options}
+        choices = [None]
+        for operation, values in options.items():
+            for value in (values if isinstance(values, list) else [values]):
+                choices.append(_normalize_change(feature, {operation: value}))
+        per_feature.append([(feature, choice) for choice in choices])
+
+    interventions = []
+    for combination in itertools.product(*per_feature):
+        changes = {feature: change for feature, change in combination if change is not None}
+        if changes:
+            interventions.append({
+                "name": ", ".join(_describe(f, c) for f, c in changes.items()),
+                "changes": changes
+            })
+    return interventions
+
+
+def build_scenario_frame(students: pd.DataFrame, interventions: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Repeat every student once per scenario (baseline first) and apply the changes column-wise
+
+    Returns:
+        Dataframe of len(students) * (len(interventions) + 1) rows, student-major
+    """
+    n_scenarios = len(interventions) + 1
+    frame = students.loc[students.index.repeat(n_scenarios)].reset_index(drop=True)
+    scenario = np.tile(np.arange(n_scenarios), len(students))
+
+    for i, intervention in enumerate(interventions, start=1):
+        rows = scenario == i
+        for feature, change in intervention["changes"].items():
+            operation, value = next(iter(change.items()))
+            if operation == "set":
+                frame[feature] = frame[feature].astype(object) if feature in frame.columns else None
+                frame.loc[rows, feature] = value
+                continue
+
+            # Missing numeric values stay missing whatever the change
+            frame[feature] = pd.to_numeric(frame[feature], errors="coerce") if feature in frame.columns \
+                else np.nan
+            current = frame.loc[rows, feature]
+            updated = current + value if operation == "add" else current * value
+            low, high = FEATURE_BOUNDS.get(feature, (None, None))
+            frame.loc[rows, feature] = updated.clip(lower=low, upper=high)
+
+    return frame
+
+
+def simulate(ml_service, students_data: List[Dict[str, Any]],
+             interventions: Optional[List[Dict[str, Any]]] = None,
+             grid: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Score every student under every intervention in one model call
+
+    Args:
+        ml_service: RealMLService with a loaded model
+        students_data: Raw student records
+        interventions: [{"name": ..., "changes": {feature: {"set"|"add"|"multiply": value}}}]
+        grid: Perturbation grid expanded with expand_grid (combined with interventions)
+
+    Returns:
+        Per-student baseline and scenario results plus a per-intervention summary
+    """
+    if ml_service.model is None:
+        raise RuntimeError("What-if simulation needs a loaded model")
+
+    scenarios = [dict(intervention) for intervention in (interventions or [])]
+    if grid:
+        scenarios.extend(expand_grid(grid))
+    if not scenarios:
+        scenarios = [dict(intervention) for intervention in DEFAULT_INTERVENTIONS]
+
+    allowed = set(ml_service.feature_columns)
+    if ml_service.backend == "xgboost":
+        allowed |= set(ml_service.xgb_model.schema["raw_columns"])
+    for i, scenario in enumerate(scenarios):
+        scenario.setdefault("name", f"scenario_{i + 1}")
+        scenario["changes"] = {
+            feature: _normalize_change(feature, change)
+            for feature, change in scenario.get("changes", {}).items()
+        }
+        unknown = set(scenario["changes"]) - allowed
+        if unknown:
+            raise ValueError(f"Unknown features in {scenario['name']}: {', '.join(sorted(unknown))}")
+
+    n_scenarios = len(scenarios) + 1
+    total_rows = len(students_data) * n_scenarios
+    if total_rows > WHAT_IF_MAX_ROWS:
+        raise ValueError(f"{total_rows} scenario rows exceeds the limit of {WHAT_IF_MAX_ROWS}")
+    if not students_data:
+        return {"students": [], "interventions": [], "scenario_rows": 0}
+
+    frame = build_scenario_frame(pd.DataFrame(students_data), scenarios)
+    X = ml_service._encode_students(frame.to_dict(orient="records"))
+    probabilities = ml_service._predict_matrix(X).reshape(len(students_data), n_scenarios)
+
+    baseline = probabilities[:, :1]
+    deltas = probabilities[:, 1:] - baseline
+
+    students = []
+    for s, student in enumerate(students_data):
+        base_probability = float(baseline[s, 0])
+        base_level = ml_service._determine_risk_level(base_probability)
+        results = []
+        for i, scenario in enumerate(scenarios):
+            probability = float(probabilities[s, i + 1])
+            risk_level = ml_service._determine_risk_level(probability)
+            results.append({
+                "name": scenario["name"],
+                "dropout_probability": probability,
+                "risk_level": risk_level,
+                "delta": float(deltas[s, i]),
+                "risk_level_changed": risk_level != base_level
+            })
+        students.append({
+            "student_id": student.get("StudentID", "unknown"),
+            "baseline": {"dropout_probability": base_probability, "risk_level": base_level},
+            # Biggest risk reduction first
+            "scenarios": sorted(results, key=lambda r: r["delta"])
+        })
+
+    summary = [
+        {
+            "name": scenario["name"],
+            "changes": scenario["changes"],
+            "mean_delta": float(deltas[:, i].mean()),
+            "min_delta": float(deltas[:, i].min()),
+            "students_improved": int((deltas[:, i] < 0).sum())
+        }
+        for i, scenario in enumerate(scenarios)
+    ]
+
+    return {
+        "students": students,
+        "interventions": sorted(summary, key=lambda r: r["mean_delta"]),
+        "scenario_rows": int(total_rows),
+        "model_version": ml_service.model_version
+    }
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Wire formats for EduAnalytics batch scoring
+Content negotiation between JSON, NDJSON, MessagePack and Arrow IPC for cohort-level calls
+"""
+
+import io
+import json
+from typing import Dict, Any, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Media types clients commonly send for the same formats
+MEDIA_TYPE_ALIASES = {
+    "application/json": JSON_MEDIA_TYPE,
+    "application/msgpack": MSGPACK_MEDIA_TYPE,
+    "application/x-msgpack": MSGPACK_MEDIA_TYPE,
+    "application/vnd.msgpack": MSGPACK_MEDIA_TYPE,
+    "application/vnd.apache.arrow.stream": ARROW_MEDIA_TYPE,
+    "application/vnd.apache.arrow.file": ARROW_MEDIA_TYPE,
+    "application/x-ndjson": NDJSON_MEDIA_TYPE,
+    "application/ndjson": NDJSON_MEDIA_TYPE,
+    "application/jsonl": NDJSON_MEDIA_TYPE,
+}
+
+# Result columns shipped per row; feature_importance is model-wide and sent once
+RESULT_COLUMNS = [
+    "student_id", "dropout_probability", "dropout_prediction", "risk_level", "risk_score"
+]
+
+
+class UnsupportedMediaType(Exception):
+    """Raised when a request body uses a format this service cannot decode"""
+
+
+def available_media_types() -> list:
+    """List the request media types usable in this environment"""
+    media_types = [JSON_MEDIA_TYPE]
+    if MSGPACK_AVAILABLE:
+        media_types.append(MSGPACK_MEDIA_TYPE)
+    if ARROW_AVAILABLE:
+        media_types.append(ARROW_MEDIA_TYPE)
+    return media_types
+
+
+def normalize_media_type(content_type: Optional[str]) -> str:
+    """Strip parameters and map aliases to a canonical media type"""
+    if not content_type:
+        return JSON_MEDIA_TYPE
+    media_type = content_type.split(";")[0].strip().lower()
+    return MEDIA_TYPE_ALIASES.get(media_type, media_type)
+
+
+def negotiate_response_format(accept: Optional[str]) -> str:
+    """
+    Pick the response media type from an Accept header
+
+    Args:
+        accept: Raw Accept header value
+
+    Returns:
+        Canonical media type; JSON unless the client prefers an available binary format
+    """
+    if not accept:
+        return JSON_MEDIA_TYPE
+
+    candidates = []
+    for position, part in enumerate(accept.split(",")):
+        pieces = part.split(";")
+        media_type = pieces[0].strip().lower()
+        quality = 1.0
+        for param in pieces[1:]:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        candidates.append((-quality, position, MEDIA_TYPE_ALIASES.get(media_type, media_type)))
+
+    supported = available_media_types() + [NDJSON_MEDIA_TYPE]
+    for neg_quality, _, media_type in sorted(candidates):
+        if neg_quality < 0 and media_type in supported:
+            return media_type
+    return JSON_MEDIA_TYPE
+
+
+def decode_students_frame(body: bytes, content_type: Optional[str]) -> pd.DataFrame:
+    """
+    Decode a binary batch request straight into a columnar dataframe
+
+    MessagePack bodies may be row-wise (``{"students_data": [{...}, ...]}``) or
+    column-wise (``{"students_data": {"StudentID": [...], ...}}``). Arrow bodies are
+    an IPC stream or file of record batches with one column per feature.
+
+    Args:
+        body: Raw request body
+        content_type: Content-Type header value
+
+    Returns:
+        Dataframe with one row per student
+    """
+    media_type = normalize_media_type(content_type)
+
+    if media_type == MSGPACK_MEDIA_TYPE:
+        if not MSGPACK_AVAILABLE:
+            raise UnsupportedMediaType("msgpack is not installed on this server")
+        payload = msgpack.unpackb(body, raw=False)
+        students = payload.get("students_data", payload) if isinstance(payload, dict) else payload
+        return pd.DataFrame(students)
+
+    if media_type == ARROW_MEDIA_TYPE:
+        if not ARROW_AVAILABLE:
+            raise UnsupportedMediaType("pyarrow is not installed on this server")
+        try:
+            table = pa_ipc.open_stream(pa.py_buffer(body)).read_all()
+        except pa.ArrowInvalid:
+            table = pa_ipc.open_file(pa.py_buffer(body)).read_all()
+        return table.to_pandas()
+
+    if media_type == JSON_MEDIA_TYPE:
+        payload = json.loads(body.decode("utf-8"))
+        students = payload.get("students_data", payload) if isinstance(payload, dict) else payload
+        return pd.DataFrame(students)
+
+    raise UnsupportedMediaType(f"Unsupported content type: {content_type}")
+
+
+def encode_prediction_columns(columns: Dict[str, Any], media_type: str) -> bytes:
+    """
+    Encode batch results column-wise
+
+    Args:
+        columns: Result columns as returned by EduAnalyticsMLModel.batch_predict_columns
+        media_type: Canonical media type from negotiate_response_format
+
+    Returns:
+        Encoded response body
+    """
+    feature_importance = {k: float(v) for k, v in columns["feature_importance"].items()}
+    total_students = len(columns["student_id"])
+
+    if media_type == MSGPACK_MEDIA_TYPE:
+        payload = {
+            "predictions": {name: np.asarray(columns[name]).tolist() for name in RESULT_COLUMNS},
+            "feature_importance": feature_importance,
+            "total_students": total_students,
+            "model_version": columns["model_version"]
+        }
+        return msgpack.packb(payload, use_bin_type=True)
+
+    if media_type == ARROW_MEDIA_TYPE:
+        table = pa.table({
+            "student_id": pa.array(np.asarray(columns["student_id"], dtype=object), type=pa.string()),
+            "dropout_probability": pa.array(columns["dropout_probability"], type=pa.float64()),
+            "dropout_prediction": pa.array(columns["dropout_prediction"], type=pa.bool_()),
+            "risk_level": pa.array(np.asarray(columns["risk_level"], dtype=object), type=pa.string()),
+            "risk_score": pa.array(columns["risk_score"], type=pa.int32()),
+        })
+        table = table.replace_schema_metadata({
+            "feature_importance": json.dumps(feature_importance),
+            "model_version": columns["model_version"],
+            "total_students": str(total_students)
+        })
+        sink = io.BytesIO()
+        with pa_ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue()
+
+    raise UnsupportedMediaType(f"Cannot encode response as {media_type}")
+
+
+def iter_ndjson_predictions(columns: Dict[str, Any], chunk_size: int = 500) -> Iterator[bytes]:
+    """
+    Encode batch results as NDJSON, one prediction per line
+
+    Lines are grouped into chunks of ``chunk_size`` rows so streaming compression
+    flushes per chunk rather than per line.
+
+    Args:
+        columns: Result columns as returned by EduAnalyticsMLModel.batch_predict_columns
+        chunk_size: Number of rows per yielded chunk
+
+    Yields:
+        UTF-8 encoded NDJSON chunks
+    """
+    feature_importance = {k: float(v) for k, v in columns["feature_importance"].items()}
+    student_ids = np.asarray(columns["student_id"]).tolist()
+    probabilities = np.asarray(columns["dropout_probability"], dtype=float).tolist()
+    predictions = np.asarray(columns["dropout_prediction"], dtype=bool).tolist()
+    risk_levels = np.asarray(columns["risk_level"]).tolist()
+    risk_scores = np.asarray(columns["risk_score"], dtype=int).tolist()
+
+    # Every row shares the same feature importance, so encode it once
+    importance_json = json.dumps(feature_importance)
+    model_version_json = json.dumps(columns["model_version"])
+
+    for start in range(0, len(student_ids), chunk_size):
+        lines = []
+        for i in range(start, min(start + chunk_size, len(student_ids))):
+            lines.append(
+                '{"student_id": %s, "dropout_probability": %s, "dropout_prediction": %s, '
+                '"risk_level": %s, "risk_score": %d, "feature_importance": %s, "model_version": %s}\n' % (
+                    json.dumps(str(student_ids[i])), json.dumps(probabilities[i]),
+                    "true" if predictions[i] else "false", json.dumps(str(risk_levels[i])),
+                    risk_scores[i], importance_json, model_version_json
+                )
+            )
+        yield "".join(lines).encode("utf-8")
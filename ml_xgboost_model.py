@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+EduAnalytics XGBoost Model
+Exports and serves the XGBoost pipeline from "Generate student risk report.ipynb"
+"""
+
+import json
+import os
+from typing import Dict, Any
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from xgboost import XGBClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import accuracy_score
+
+DEFAULT_MODEL_PATH = "eduanalytics_xgb_model.json"
+DEFAULT_SCHEMA_PATH = "eduanalytics_xgb_schema.json"
+
+# Threads for batch predict / pred_contribs; unset lets XGBoost use every core
+XGB_NTHREAD = int(os.environ["ML_XGB_NTHREAD"]) if os.environ.get("ML_XGB_NTHREAD") else None
+
+
+def schema_path_for(model_path: str) -> str:
+    """Derive the one-hot schema path stored next to a model artifact"""
+    if model_path == DEFAULT_MODEL_PATH:
+        return DEFAULT_SCHEMA_PATH
+    stem, _ = os.path.splitext(model_path)
+    return f"{stem}_schema.json"
+
+
+def _to_boolean(series: pd.Series) -> pd.Series:
+    """Map TRUE/FALSE strings, Python bools and 0/1 to 0/1 (NaN when unknown)"""
+    if series.dtype == bool:
+        return series.astype(float)
+    mapped = series.astype(str).str.upper().map({"TRUE": 1.0, "FALSE": 0.0, "1": 1.0, "0": 0.0})
+    return mapped
+
+
+class EduAnalyticsXGBoostModel:
+    def __init__(self, model_path: str = None, schema_path: str = None):
+        """
+        Initialize the XGBoost dropout model
+
+        Args:
+            model_path: Path to an exported XGBoost model (optional)
+            schema_path: Path to its one-hot schema (defaults to the file next to the model)
+        """
+        self.model = None
+        self.schema = None
+
+        if model_path and os.path.exists(model_path):
+            self.load_model(model_path, schema_path)
+
+    @staticmethod
+    def build_schema(raw_features: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Capture the notebook's encoding as a persistable schema
+
+        Object/category columns are one-hot encoded with drop_first, exactly like
+        ``pd.get_dummies(X, columns=categorical_features, drop_first=True)``;
+        boolean columns become 0/1 and everything else is numeric.
+
+        Args:
+            raw_features: Training features before encoding (no StudentID / IsDropout)
+
+        Returns:
+            Schema dictionary
+        """
+        categorical_columns = {}
+        boolean_columns = []
+        numeric_columns = []
+
+        for col in raw_features.columns:
+            series = raw_features[col]
+            if pd.api.types.is_bool_dtype(series):
+                boolean_columns.append(col)
+            elif pd.api.types.is_numeric_dtype(series):
+                numeric_columns.append(col)
+            else:
+                # object / string / category columns, the ones pd.get_dummies expands
+                categorical_columns[col] = sorted(series.dropna().astype(str).unique().tolist())
+
+        # Same column order pd.get_dummies produces: untouched columns, then dummies
+        encoded_columns = [c for c in raw_features.columns if c not in categorical_columns]
+        encoded_to_raw = {c: c for c in encoded_columns}
+        for col, categories in categorical_columns.items():
+            for category in categories[1:]:
+                encoded_columns.append(f"{col}_{category}")
+                encoded_to_raw[f"{col}_{category}"] = col
+
+        return {
+            "raw_columns": list(raw_features.columns),
+            "categorical_columns": categorical_columns,
+            "boolean_columns": boolean_columns,
+            "numeric_columns": numeric_columns,
+            "encoded_columns": encoded_columns,
+            "encoded_to_raw": encoded_to_raw,
+            "drop_first": True
+        }
+
+    @staticmethod
+    def prepare_raw_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """Apply the notebook's row-level cleanup before encoding"""
+        raw_df = df.copy()
+        if "FamilyEconomicStatus" in raw_df.columns:
+            # Simplify Economic Categories as decided in the notebook
+            obc_mask = raw_df["FamilyEconomicStatus"].astype(str).str.contains("OBC", na=False)
+            raw_df.loc[obc_mask, "FamilyEconomicStatus"] = "General_Tier"
+        return raw_df
+
+    def encode_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Encode raw student records with the persisted one-hot schema
+
+        Unknown categories encode as all-zero dummies and missing numeric values
+        stay NaN, which XGBoost routes down its learned default branches.
+
+        Args:
+            df: Raw dataframe with one row per student
+
+        Returns:
+            Float32 dataframe with the model's encoded columns, in order
+        """
+        schema = self.schema
+        raw_df = self.prepare_raw_frame(df)
+        encoded = {}
+
+        for col in schema["numeric_columns"]:
+            if col in raw_df.columns:
+                encoded[col] = pd.to_numeric(raw_df[col], errors="coerce").to_numpy(dtype=np.float32)
+            else:
+                encoded[col] = np.full(len(raw_df), np.nan, dtype=np.float32)
+
+        for col in schema["boolean_columns"]:
+            if col in raw_df.columns:
+                encoded[col] = _to_boolean(raw_df[col]).to_numpy(dtype=np.float32)
+            else:
+                encoded[col] = np.full(len(raw_df), np.nan, dtype=np.float32)
+
+        for col, categories in schema["categorical_columns"].items():
+            values = raw_df[col].astype(str).to_numpy() if col in raw_df.columns else None
+            for category in categories[1:]:
+                name = f"{col}_{category}"
+                if values is None:
+                    encoded[name] = np.zeros(len(raw_df), dtype=np.float32)
+                else:
+                    encoded[name] = (values == category).astype(np.float32)
+
+        return pd.DataFrame(encoded, index=raw_df.index)[schema["encoded_columns"]]
+
+    def train_model(self, csv_path: str = "final_synthetic_dropout_data_rajasthan.csv",
+                    model_path: str = DEFAULT_MODEL_PATH):
+        """
+        Train the notebook's XGBoost model and export it with its schema
+
+        Args:
+            csv_path: Path to the CSV file
+            model_path: Where to export the model artifact
+        """
+        try:
+            if os.path.exists(csv_path):
+                df = pd.read_csv(csv_path)
+                print(f"✅ Loaded {len(df)} records from {csv_path}")
+            else:
+                print(f"❌ CSV file not found: {csv_path}")
+                return
+
+            raw_df = self.prepare_raw_frame(df)
+            X = raw_df.drop(["IsDropout", "StudentID"], axis=1, errors="ignore")
+            y = _to_boolean(raw_df["IsDropout"]).fillna(0).astype(int)
+
+            self.schema = self.build_schema(X)
+            X_encoded = self.encode_frame(X)
+
+            X_train, X_test, y_train, y_test = train_test_split(
+                X_encoded, y, test_size=0.2, random_state=42, stratify=y
+            )
+
+            self.model = XGBClassifier(random_state=42, eval_metric="logloss", n_jobs=XGB_NTHREAD)
+            self.model.fit(X_train, y_train)
+
+            accuracy = accuracy_score(y_test, self.model.predict(X_test))
+            print(f"✅ XGBoost model trained successfully!")
+            print(f"📊 Accuracy: {accuracy:.3f}")
+            print(f"📈 Training samples: {len(X_train)}")
+            print(f"📉 Test samples: {len(X_test)}")
+
+            self.save_model(model_path)
+
+        except Exception as e:
+            print(f"❌ Error training XGBoost model: {str(e)}")
+
+    def export_trained(self, model: XGBClassifier, raw_features: pd.DataFrame,
+                       model_path: str = DEFAULT_MODEL_PATH):
+        """
+        Export a model fitted in the notebook together with its one-hot schema
+
+        Args:
+            model: Fitted XGBClassifier (e.g. ``xgb_final_model``)
+            raw_features: The notebook's ``X`` before ``pd.get_dummies``
+            model_path: Where to export the model artifact
+        """
+        schema = self.build_schema(raw_features)
+        fitted_columns = list(model.get_booster().feature_names or [])
+        if fitted_columns and fitted_columns != schema["encoded_columns"]:
+            raise ValueError(
+                "Model columns do not match the schema derived from raw_features; "
+                "pass the notebook's X (before pd.get_dummies)"
+            )
+        self.model = model
+        self.schema = schema
+        self.save_model(model_path)
+
+    def predict_proba(self, X: pd.DataFrame) -> np.ndarray:
+        """Dropout probability for every row of an encoded matrix in one threaded call"""
+        return self.model.predict_proba(X)[:, 1]
+
+    def contributions(self, X: pd.DataFrame, approximate: bool = False) -> np.ndarray:
+        """
+        Per-feature contributions (log-odds) from XGBoost's native pred_contribs
+
+        Args:
+            X: Encoded feature matrix
+            approximate: Use decision-path (Saabas) contributions instead of exact TreeSHAP
+
+        Returns:
+            Array of shape (n_rows, n_encoded_columns + 1); the last column is the bias
+        """
+        booster = self.model.get_booster()
+        dmatrix = xgb.DMatrix(X, feature_names=self.schema["encoded_columns"], nthread=XGB_NTHREAD)
+        return booster.predict(
+            dmatrix, pred_contribs=True, approx_contribs=approximate, validate_features=False
+        )
+
+    def raw_feature_contributions(self, contributions: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Fold one-hot dummy contributions back onto their raw feature names
+
+        Args:
+            contributions: Output of contributions()
+
+        Returns:
+            Mapping of raw feature name to a per-row contribution array
+        """
+        folded = {}
+        for i, name in enumerate(self.schema["encoded_columns"]):
+            raw_name = self.schema["encoded_to_raw"][name]
+            if raw_name in folded:
+                folded[raw_name] = folded[raw_name] + contributions[:, i]
+            else:
+                folded[raw_name] = contributions[:, i].copy()
+        return folded
+
+    def save_model(self, filepath: str):
+        """Save the model in XGBoost's native format plus the schema next to it"""
+        try:
+            self.model.save_model(filepath)
+            with open(schema_path_for(filepath), "w") as f:
+                json.dump(self.schema, f, indent=2)
+            print(f"✅ XGBoost model saved to {filepath}")
+        except Exception as e:
+            print(f"❌ Error saving XGBoost model: {str(e)}")
+
+    def load_model(self, filepath: str, schema_path: str = None):
+        """Load an exported model and its schema"""
+        try:
+            model = XGBClassifier(n_jobs=XGB_NTHREAD)
+            model.load_model(filepath)
+            with open(schema_path or schema_path_for(filepath)) as f:
+                self.schema = json.load(f)
+            self.model = model
+            print(f"✅ XGBoost model loaded from {filepath}")
+        except Exception as e:
+            print(f"❌ Error loading XGBoost model: {str(e)}")
+            self.model = None
+            self.schema = None
+
+
+def main():
+    """Train and export the XGBoost artifact used by ml_service_real.py"""
+    print("🚀 EduAnalytics XGBoost Model Export")
+    print("=" * 50)
+
+    xgb_model = EduAnalyticsXGBoostModel()
+    xgb_model.train_model()
+
+    if xgb_model.model is not None:
+        print(f"📦 Encoded features: {len(xgb_model.schema['encoded_columns'])}")
+        print(f"📄 Schema: {schema_path_for(DEFAULT_MODEL_PATH)}")
+
+if __name__ == "__main__":
+    main()
@@ -41,12 +41,18 @@ if [ ! -f "final_synthetic_dropout_data_rajasthan.csv" ]; then
     echo "The service will use fallback algorithms"
 fi
 
+# Export the notebook's XGBoost model if it has not been exported yet
+if [ ! -f "eduanalytics_xgb_model.json" ] && [ -f "final_synthetic_dropout_data_rajasthan.csv" ]; then
+    echo "🎯 Exporting XGBoost model..."
+    python3 ml_xgboost_model.py
+fi
+
 # Start the real ML service
 echo ""
 echo "🎯 Starting Real ML Service..."
 echo "Features:"
-echo "  ✅ Real XGBoost model integration"
-echo "  ✅ SHAP analysis for explanations"
+echo "  ✅ Real XGBoost model integration (native pred_contribs)"
+echo "  ✅ SHAP analysis for the RandomForest fallback"
 echo "  ✅ Feature importance extraction"
 echo "  ✅ Detailed risk explanations"
 echo "  ✅ Fallback for missing dependencies"
@@ -54,6 +60,9 @@ echo ""
 echo "📡 Service will be available at:"
 echo "  - http://localhost:8001/health"
 echo "  - http://localhost:8001/risk-assessment"
+echo "  - http://localhost:8001/predict/batch"
+echo "  - http://localhost:8001/predict/cascade"
+echo "  - http://localhost:8001/what-if"
 echo "  - http://localhost:8001/model-info"
 echo ""
 echo "Press Ctrl+C to stop the service"
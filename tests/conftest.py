@@ -0,0 +1,28 @@
+"""Shared fixtures for the ML service tests"""
+
+import importlib
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def ml_api_module(tmp_path_factory):
+    """ml_api imported in a scratch directory, so its SQLite files and model lookups stay out of the repo"""
+    workdir = tmp_path_factory.mktemp("ml_api")
+    previous = os.getcwd()
+    os.chdir(workdir)
+    os.environ.setdefault("ML_FEATURE_STORE", str(workdir / "features.db"))
+    try:
+        yield importlib.import_module("ml_api")
+    finally:
+        os.chdir(previous)
+
+
+@pytest.fixture
+def api_client(ml_api_module):
+    from fastapi.testclient import TestClient
+    return TestClient(ml_api_module.app, raise_server_exceptions=False)
@@ -0,0 +1,17 @@
+"""Malformed request bodies get client errors from ml_api.py, never a 500"""
+
+import pytest
+
+MALFORMED_BODIES = [
+    b'{"students_data": [1',
+    b"not json at all",
+]
+
+
+@pytest.mark.parametrize("path", ["/predict/batch", "/features/upsert", "/predict/by-id", "/jobs"])
+@pytest.mark.parametrize("body", MALFORMED_BODIES)
+def test_malformed_json_body_is_rejected_with_422(api_client, path, body):
+    response = api_client.post(path, content=body, headers={"Content-Type": "application/json"})
+
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["type"] == "json_invalid"
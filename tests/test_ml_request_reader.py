@@ -0,0 +1,68 @@
+"""JSONArrayStream decodes the same values wherever the body is split into pieces"""
+
+import json
+
+import pytest
+
+from ml_request_reader import BadRequestBody, JSONArrayStream, iter_objects
+
+BODY = json.dumps({
+    "limit": 12.5,
+    "students_data": [
+        {"StudentID": "S1", "AvgMarks_LatestTerm": 1e-3, "MarksTrend": -2.25E+2, "NumberOfSiblings": 10},
+        {"StudentID": "S2 ü☃", "FamilyAnnualIncome": 123456.789, "flags": [True, None, "a,]}"]},
+    ],
+    "band": [0.3, 7]
+}).encode()
+
+
+def split_at(body: bytes, *points: int):
+    bounds = [0, *points, len(body)]
+    return [body[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+@pytest.mark.parametrize("point", range(1, len(BODY)))
+def test_every_split_point_decodes_the_same_values(point):
+    expected = json.loads(BODY)
+    stream = JSONArrayStream(split_at(BODY, point), "students_data")
+
+    assert list(stream) == expected["students_data"]
+    assert stream.fields == {"limit": 12.5, "band": [0.3, 7]}
+
+
+@pytest.mark.parametrize("number, cut", [
+    (b"12.5", 3),
+    (b"1e3", 2),
+    (b"-2.25E+2", 6),
+    (b"-2.25E+2", 7),
+    (b"-2.25E+2", 1),
+])
+def test_number_cut_inside_its_text(number, cut):
+    body = b'{"limit": ' + number + b', "students_data": [{"a": 1}]}'
+    stream = JSONArrayStream(split_at(body, body.index(number) + cut), "students_data")
+
+    assert list(stream) == [{"a": 1}]
+    assert stream.fields["limit"] == json.loads(number)
+
+
+def test_one_byte_pieces():
+    pieces = [BODY[i:i + 1] for i in range(len(BODY))]
+
+    assert list(JSONArrayStream(pieces, "students_data")) == json.loads(BODY)["students_data"]
+
+
+@pytest.mark.parametrize("body", [
+    b'{"students_data": [{"a": 1},]}',
+    b'{"students_data": [{"a": 1}',
+    b"[1, 2] x",
+    b'"text"',
+    b"\xff",
+])
+def test_malformed_bodies_raise_bad_request(body):
+    with pytest.raises(BadRequestBody):
+        list(JSONArrayStream(split_at(body, len(body) // 2), "students_data"))
+
+
+def test_iter_objects_rejects_non_objects():
+    with pytest.raises(BadRequestBody, match=r"students_data\[1\]"):
+        list(iter_objects([{"a": 1}, 5], "students_data"))